@@ -0,0 +1,15 @@
+"""Нагрузочные замеры Yatube.
+
+    python -m benchmarks run --users 500 --posts 20000 -o bench.json
+    python -m benchmarks compare old.json bench.json
+    python -m benchmarks stress
+
+run создаёт тестовую базу во временном файле (движок из настроек) и
+отдельный кэш, заполняет её генератором из data
+и прогоняет каждый URL из posts/urls.py и posts/api_urls.py через
+тестовый клиент или локальный WSGI-сервер (harness). Результат — JSON с
+p50/p95/p99, числом SQL-запросов, объёмом ответа и пропускной
+способностью по каждому URL; compare сравнивает два таких файла.
+stress нагружает файл SQLite одновременной записью из нескольких
+потоков и считает ошибки «database is locked» (модуль stress).
+"""
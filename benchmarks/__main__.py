@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    import django
+    from django.conf import settings
+
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+
+    from benchmarks import data, harness
+    from yatube.caches import isolated
+
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict["NAME"]
+    try:
+        # база во временном файле с движком из настроек: SQLite в памяти
+        # выключает пул parallel.gather и меняет поведение блокировок;
+        # --cold очищает кэш, поэтому общий кэш рабочей копии не трогаем
+        with tempfile.TemporaryDirectory() as directory, isolated():
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                directory, "bench.sqlite3")
+            connection.creation.create_test_db(verbosity=0)
+            try:
+                # фоновые задачи генератора выполняет data.generate,
+                # задачи измеряемых запросов остаются в очереди, как
+                # без запущенного run_jobs
+                sample = data.generate(
+                    users=args.users, posts=args.posts,
+                    comments=args.comments, groups=args.groups,
+                    follows_per_user=args.follows, alpha=args.alpha,
+                    seed=args.seed,
+                )
+                User = get_user_model()
+                viewers = {}
+                if "guest" in args.viewers:
+                    viewers["guest"] = None
+                if "user" in args.viewers:
+                    viewers["user"] = User.objects.get(
+                        username=sample["viewer"])
+                results = harness.run(
+                    harness.targets(sample,
+                                    include_writes=args.include_writes),
+                    viewers, mode=args.mode, requests=args.requests,
+                    warmup=args.warmup, cold=args.cold,
+                )
+                vendor = connection.vendor
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        teardown_test_environment()
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "params": {key: value for key, value in vars(args).items()
+                       if key not in ("func", "output")},
+        },
+        "totals": harness.totals(results),
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(text + "\n")
+        _print_table(results)
+    return 0
+
+
+def _print_table(results):
+    print(f"{'URL':<24} {'кто':<6} {'код':<5} {'p50':>8} {'p95':>8} "
+          f"{'p99':>8} {'SQL':>6} {'байт':>8} {'rps':>8}")
+    for result in results:
+        status = ",".join(map(str, result["status"]))
+        print(f"{result['name']:<24} {result['viewer']:<6} {status:<5} "
+              f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['queries']:>6.1f} "
+              f"{result['bytes']:>8} {result['rps']:>8.1f}")
+
+
+def compare(args):
+    with open(args.before, encoding="utf-8") as source:
+        before = json.load(source)
+    with open(args.after, encoding="utf-8") as source:
+        after = json.load(source)
+    old = {(r["name"], r["viewer"]): r for r in before["results"]}
+    regressions = 0
+    print(f"{'URL':<24} {'кто':<6} {'p95 было':>9} {'стало':>9} "
+          f"{'Δ%':>7} {'SQL было':>9} {'стало':>6}")
+    for result in after["results"]:
+        previous = old.get((result["name"], result["viewer"]))
+        if previous is None:
+            continue
+        change = ((result["p95_ms"] - previous["p95_ms"])
+                  / max(previous["p95_ms"], 1e-9) * 100)
+        worse = (change > args.threshold
+                 or result["queries"] > previous["queries"])
+        regressions += worse
+        print(f"{result['name']:<24} {result['viewer']:<6} "
+              f"{previous['p95_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{change:>+7.1f} {previous['queries']:>9.1f} "
+              f"{result['queries']:>6.1f}{'  !' if worse else ''}")
+    return 1 if regressions else 0
+
+
+def stress(args):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    import django
+
+    django.setup()
+    from benchmarks import stress as stress_test
+
+    failed = 0
+    print(f"{'бэкенд':<28} {'операций':>9} {'ошибок':>7} {'строк':>6} "
+          f"{'сек':>7}")
+    for engine in args.engines.split(","):
+        result = stress_test.run(
+            engine, threads=args.threads, operations=args.operations,
+            write_every=args.write_every, timeout=args.timeout,
+        )
+        failed += engine == "yatube.sqlite" and bool(result["errors"])
+        print(f"{engine:<28} {result['operations']:>9} "
+              f"{result['errors']:>7} {result['rows']:>6} "
+              f"{result['seconds']:>7.2f}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runner = commands.add_parser("run", help="Сгенерировать данные и замерить")
+    runner.add_argument("--users", type=int, default=200)
+    runner.add_argument("--posts", type=int, default=2000)
+    runner.add_argument("--comments", type=int, default=5000)
+    runner.add_argument("--groups", type=int, default=10)
+    runner.add_argument("--follows", type=int, default=20,
+                        help="Среднее число подписок пользователя")
+    runner.add_argument("--alpha", type=float, default=1.1,
+                        help="Показатель Ципфа для популярности")
+    runner.add_argument("--seed", type=int, default=0)
+    runner.add_argument("--mode", choices=("client", "server"),
+                        default="client")
+    runner.add_argument("--requests", type=int, default=20,
+                        help="Замеров на URL")
+    runner.add_argument("--warmup", type=int, default=2)
+    runner.add_argument("--cold", action="store_true",
+                        help="Очищать кэш перед каждым запросом")
+    runner.add_argument("--viewers", default="guest,user")
+    runner.add_argument("--include-writes", action="store_true",
+                        help="Замерять и URL, меняющие данные")
+    runner.add_argument("-o", "--output", default="bench_output.json")
+    runner.set_defaults(func=run)
+
+    comparer = commands.add_parser("compare", help="Сравнить два прогона")
+    comparer.add_argument("before")
+    comparer.add_argument("after")
+    comparer.add_argument("--threshold", type=float, default=10.0,
+                          help="Допустимый рост p95, %%")
+    comparer.set_defaults(func=compare)
+
+    stresser = commands.add_parser(
+        "stress", help="Блокировки SQLite при одновременной записи")
+    stresser.add_argument(
+        "--engines",
+        default="django.db.backends.sqlite3,yatube.sqlite",
+        help="Бэкенды через запятую")
+    stresser.add_argument("--threads", type=int, default=8)
+    stresser.add_argument("--operations", type=int, default=200,
+                          help="Операций на поток")
+    stresser.add_argument("--write-every", type=int, default=3,
+                          help="Каждая N-я операция — запись")
+    stresser.add_argument("--timeout", type=float, default=1.0,
+                          help="Ожидание блокировки, с")
+    stresser.set_defaults(func=stress)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
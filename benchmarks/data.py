@@ -0,0 +1,131 @@
+"""Генератор пользователей, сообществ, записей, комментариев и подписок.
+
+Популярность пользователей подчиняется закону Ципфа: на первых по
+рангу подписано большинство, они же пишут больше записей, а их записи
+чаще комментируют. Число подписок у пользователя распределено по
+Парето, как в настоящих социальных графах. Данные загружаются через
+posts.transfer.Importer, поэтому счётчики, ленты подписок и поисковый
+индекс заполняются так же, как при обычном импорте.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from posts import jobs, transfer
+from posts.models import Comment, Follow, Post
+
+WORDS = (
+    "сегодня", "вчера", "город", "книга", "музыка", "погода", "дорога",
+    "работа", "кофе", "море", "горы", "фильм", "друзья", "прогулка",
+    "утро", "вечер", "новый", "старый", "красивый", "интересный",
+    "думаю", "читаю", "смотрю", "пишу", "люблю", "помню", "вижу",
+    "очень", "почти", "снова", "наконец", "опять", "вместе", "далеко",
+)
+PARETO_SHAPE = 1.5
+
+
+def _cum_weights(count, alpha):
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+def _text(rng, words):
+    return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
+
+
+def _load(importer, kind, records, batch_size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        importer.load(kind, batch)
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+
+
+def _follows(rng, usernames, weights, per_user):
+    # среднее Парето с xm = 1 равно shape / (shape - 1)
+    mean = PARETO_SHAPE / (PARETO_SHAPE - 1)
+    limit = len(usernames) - 1
+    for user in usernames:
+        count = min(limit, round(rng.paretovariate(PARETO_SHAPE)
+                                 * per_user / mean))
+        authors = set()
+        while len(authors) < count:
+            for author in rng.choices(usernames, cum_weights=weights,
+                                      k=count):
+                if author != user:
+                    authors.add(author)
+        for author in islice(authors, count):
+            yield {"user": user, "author": author}
+
+
+def generate(users=200, posts=2000, comments=5000, groups=10,
+             follows_per_user=20, alpha=1.1, days=365, seed=0,
+             batch_size=transfer.BATCH_SIZE):
+    """Заполняет базу и возвращает образцы для подстановки в URL."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    prefix = f"bench{seed}_"
+    usernames = [f"{prefix}{i}" for i in range(users)]
+    slugs = [f"{prefix}group{i}" for i in range(groups)]
+    weights = _cum_weights(users, alpha)
+    importer = transfer.Importer(create_authors=True)
+
+    _load(importer, "groups", (
+        {"slug": slug, "title": f"Сообщество {i}",
+         "description": _text(rng, 12)}
+        for i, slug in enumerate(slugs)
+    ), batch_size)
+    # подписки раньше записей: записи разойдутся по лентам как при
+    # обычной публикации
+    _load(importer, "follows",
+          _follows(rng, usernames, weights, follows_per_user), batch_size)
+
+    first_post = _next_id(Post)
+    authors = rng.choices(usernames, cum_weights=weights, k=posts)
+    _load(importer, "posts", (
+        {"id": first_post + i, "author": author,
+         "group": rng.choice(slugs) if slugs and rng.random() < 0.5
+         else None,
+         "pub_date": (now - timedelta(
+             seconds=rng.uniform(0, days * 86400))).isoformat(),
+         "text": _text(rng, rng.randint(5, 60)), "image": None}
+        for i, author in enumerate(authors)
+    ), batch_size)
+
+    post_weights = _cum_weights(posts, alpha)
+    first_comment = _next_id(Comment)
+    _load(importer, "comments", (
+        {"id": first_comment + i,
+         "post": first_post + rng.choices(range(posts),
+                                          cum_weights=post_weights)[0],
+         "author": rng.choice(usernames),
+         "created": now.isoformat(),
+         "text": _text(rng, rng.randint(3, 20))}
+        for i in range(comments if posts else 0)
+    ), batch_size)
+
+    # данные замеряются такими, какими их оставит догнавший очередь run_jobs
+    jobs.run_ready()
+
+    busiest = authors[0] if authors else usernames[0]
+    post = (Post.objects.filter(author__username=busiest)
+            .order_by("-comment_count").values_list("id", flat=True).first())
+    # читатель с самой длинной лентой подписок
+    viewer = (Follow.objects.filter(user__username__startswith=prefix)
+              .values("user__username").annotate(n=Count("id"))
+              .order_by("-n").values_list("user__username", flat=True)
+              .first())
+    return {
+        "username": busiest,
+        "viewer": viewer or usernames[0],
+        "post_id": post,
+        "slug": slugs[0] if slugs else None,
+        "q": WORDS[0],
+    }
@@ -0,0 +1,188 @@
+"""Прогон URL сайта с замером задержки, SQL-запросов и объёма ответа.
+
+Запросы идут последовательно: через django.test.Client в этом же
+потоке или по HTTP к локальному WSGI-серверу (полный путь через
+сокет и обработчик WSGI). SQL-запросы считаются так же, как в
+metrics.MetricsMiddleware: на всех соединениях потока запроса и в
+потоках пула parallel.gather.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.client import HTTPConnection
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.urls import reverse
+
+from posts import api_urls, metrics, urls
+
+# вызовы, которые меняют данные даже на GET
+WRITES = {"profile_follow", "profile_unfollow", "add_comment",
+          "api:follow", "api:add_comment"}
+# параметры запроса: имя параметра → ключ образца
+QUERY_PARAMS = {"search": {"q": "q"}}
+
+
+def targets(sample, include_writes=False):
+    """Пары (имя, путь) для всех URL приложения posts."""
+    found = []
+    for module, namespace in ((urls, ""), (api_urls, "api:")):
+        for pattern in module.urlpatterns:
+            name = f"{namespace}{pattern.name}"
+            if name in WRITES and not include_writes:
+                continue
+            kwargs = {key: sample[key]
+                      for key in pattern.pattern.converters}
+            path = reverse(name, kwargs=kwargs)
+            params = QUERY_PARAMS.get(name)
+            if params:
+                path += "?" + urlencode({param: sample[key]
+                                         for param, key in params.items()})
+            found.append((name, path))
+    return found
+
+
+@contextmanager
+def counting_queries():
+    stats = metrics.RequestStats()
+    with metrics.collecting(stats):
+        yield stats
+
+
+class ClientRunner:
+    """Запросы через тестовый клиент, без сети."""
+    def __init__(self, user=None):
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def get(self, path):
+        with counting_queries() as stats:
+            response = self.client.get(path)
+        return response.status_code, len(response.content), stats.queries
+
+    def close(self):
+        pass
+
+
+class _Server(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ServerRunner:
+    """Запросы по HTTP к WSGI-серверу в соседнем потоке."""
+    def __init__(self, user=None):
+        self.queries = 0
+        application = get_wsgi_application()
+
+        def counted(environ, start_response):
+            with counting_queries() as stats:
+                body = b"".join(application(environ, start_response))
+            self.queries = stats.queries
+            return [body]
+
+        self.server = make_server("127.0.0.1", 0, counted,
+                                  server_class=_Server,
+                                  handler_class=_QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.headers = {}
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+            self.headers["Cookie"] = f"{cookie.key}={cookie.value}"
+
+    def get(self, path):
+        http = HTTPConnection(*self.server.server_address)
+        try:
+            http.request("GET", path, headers=self.headers)
+            response = http.getresponse()
+            body = response.read()
+        finally:
+            http.close()
+        return response.status, len(body), self.queries
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(samples, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(share * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(runner, path, requests=20, warmup=2, cold=False):
+    for _ in range(warmup):
+        runner.get(path)
+    latencies, queries, sizes, statuses = [], [], [], set()
+    started = time.perf_counter()
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        begin = time.perf_counter()
+        status, size, count = runner.get(path)
+        latencies.append(time.perf_counter() - begin)
+        statuses.add(status)
+        queries.append(count)
+        sizes.append(size)
+    elapsed = time.perf_counter() - started
+    return {
+        "status": sorted(statuses),
+        "requests": requests,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / requests * 1000, 3),
+        "queries": round(sum(queries) / requests, 2),
+        "bytes": round(sum(sizes) / requests),
+        "rps": round(requests / elapsed, 1),
+    }
+
+
+def run(targets, viewers, mode="client", requests=20, warmup=2, cold=False):
+    """Замеры по каждому URL для каждого читателя.
+
+    viewers — словарь {метка: пользователь или None для гостя}.
+    """
+    runner_class = {"client": ClientRunner, "server": ServerRunner}[mode]
+    results = []
+    for label, user in viewers.items():
+        runner = runner_class(user)
+        try:
+            for name, path in targets:
+                results.append({
+                    "name": name, "viewer": label, "path": path,
+                    **measure(runner, path, requests, warmup, cold),
+                })
+        finally:
+            runner.close()
+    return results
+
+
+def totals(results):
+    requests = sum(result["requests"] for result in results)
+    seconds = sum(result["requests"] / result["rps"] for result in results
+                  if result["rps"])
+    return {
+        "requests": requests,
+        "rps": round(requests / seconds, 1) if seconds else 0,
+        "queries": round(sum(result["queries"] * result["requests"]
+                             for result in results) / max(requests, 1), 2),
+    }
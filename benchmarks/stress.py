@@ -0,0 +1,123 @@
+"""Конкурентная нагрузка на файл SQLite: блокировки при записи.
+
+Несколько потоков, у каждого своё соединение Django, одновременно
+читают таблицу и пишут в неё транзакциями вида «прочитать, затем
+записать» — так работают new_post и add_comment со счётчиками. На
+стандартном бэкенде sqlite3 такие транзакции падают с «database is
+locked», на yatube.sqlite должны проходить все.
+"""
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import OperationalError, connections, transaction
+
+ALIAS = "stress"
+ENGINES = ("django.db.backends.sqlite3", "yatube.sqlite")
+
+
+def _worker(operations, write_every, stats, lock):
+    connection = connections[ALIAS]
+    errors = 0
+    try:
+        for i in range(operations):
+            try:
+                if i % write_every == 0:
+                    with transaction.atomic(using=ALIAS):
+                        with connection.cursor() as cursor:
+                            cursor.execute(
+                                "SELECT COALESCE(MAX(n), 0) FROM stress"
+                            )
+                            top = cursor.fetchone()[0]
+                            cursor.execute(
+                                "INSERT INTO stress (n) VALUES (%s)",
+                                [top + 1],
+                            )
+                else:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT COUNT(*) FROM stress")
+                        cursor.fetchone()
+            except OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                errors += 1
+    finally:
+        connection.close()
+    with lock:
+        stats["errors"] += errors
+
+
+def _forget(alias):
+    if hasattr(connections._connections, alias):
+        delattr(connections._connections, alias)
+
+
+@contextmanager
+def temporary_database(engine, options=None, alias=ALIAS):
+    """Псевдоним alias для базы во временном файле на время блока.
+
+    Если псевдоним уже настроен, после блока настройки возвращаются.
+    """
+    previous = connections.databases.get(alias)
+    with tempfile.TemporaryDirectory() as directory:
+        _forget(alias)
+        connections.databases[alias] = {
+            "ENGINE": engine,
+            "NAME": os.path.join(directory, f"{alias}.sqlite3"),
+            "OPTIONS": options or {},
+        }
+        try:
+            yield connections[alias]
+        finally:
+            connections[alias].close()
+            _forget(alias)
+            if previous is None:
+                del connections.databases[alias]
+            else:
+                connections.databases[alias] = previous
+
+
+def run(engine, threads=8, operations=200, write_every=3, timeout=None):
+    """Прогон на временном файле базы; возвращает число ошибок и время.
+
+    timeout — время ожидания блокировки в секундах (для стандартного
+    бэкенда — параметр sqlite3.connect, для yatube.sqlite — busy_timeout).
+    """
+    options = {}
+    if timeout is not None:
+        options = ({"pragmas": {"busy_timeout": int(timeout * 1000)}}
+                   if engine == "yatube.sqlite" else {"timeout": timeout})
+    with temporary_database(engine, options) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE stress "
+                           "(id INTEGER PRIMARY KEY, n INTEGER)")
+        connection.close()
+
+        stats, lock = {"errors": 0}, threading.Lock()
+        workers = [
+            threading.Thread(target=_worker, args=(
+                operations, write_every, stats, lock,
+            ))
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        seconds = time.perf_counter() - started
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*), COUNT(DISTINCT n) FROM stress")
+            rows, distinct = cursor.fetchone()
+    return {
+        "engine": engine,
+        "operations": threads * operations,
+        "errors": stats["errors"],
+        "rows": rows,
+        # транзакции «прочитать, затем записать» не перекрывались
+        "serialized": rows == distinct,
+        "seconds": round(seconds, 3),
+    }
@@ -0,0 +1,310 @@
+"""JSON API лент, записей, комментариев и подписок.
+
+Повторяет HTML-страницы из views, но без шаблонов: те же запросы
+(for_feed, ленты подписок из timeline, счётчики из counters), курсорная
+пагинация (?after=/?before=) и выборочные поля (?fields=id,text).
+ETag считается по поколениям лент (см. feed_cache) до обращения к базе,
+поэтому повторный запрос с If-None-Match получает 304 без запросов
+записей. Изменяющие запросы проверяют CSRF-токен сессии сами и при
+ошибке отвечают JSON, а не HTML-страницей 403.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+
+from . import counters, feed_cache, follows, timeline
+from .forms import CommentForm
+from .models import Follow, Group, Post
+from .page_cache import author_scopes, group_scopes
+from .pagination import CursorPaginator
+
+
+User = get_user_model()
+
+POST_FIELDS = {
+    "id": lambda post: post.id,
+    "text": lambda post: post.text,
+    "pub_date": lambda post: post.pub_date.isoformat(),
+    "author": lambda post: post.author.username,
+    "group": lambda post: post.group.slug if post.group_id else None,
+    "image": lambda post: post.image.url if post.image else None,
+    "thumbnail": lambda post: post.thumbnails.get("card"),
+    "comment_count": lambda post: post.comment_count,
+}
+
+COMMENT_FIELDS = {
+    "id": lambda comment: comment.id,
+    "text": lambda comment: comment.text,
+    "created": lambda comment: comment.created.isoformat(),
+    "author": lambda comment: comment.author.username,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _error(status, detail, **extra):
+    return JsonResponse({"detail": detail, **extra}, status=status,
+                        json_dumps_params={"ensure_ascii": False})
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status,
+                        json_dumps_params={"ensure_ascii": False})
+
+
+class _CsrfCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        return _error(403, f"Ошибка проверки CSRF: {reason}")
+
+
+_csrf = _CsrfCheck()
+
+
+def _etag(request, version):
+    raw = f"{request.get_full_path()}:{request.user.pk}:{version}"
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def api_view(methods=("GET",), login=False, version=None):
+    """Обёртка JSON-представления.
+
+    version(request, **kwargs) возвращает строку поколений данных,
+    которые отдаёт представление; из неё строится ETag, а представление
+    получает её в request.data_version.
+    """
+    allowed = (*methods, "HEAD") if "GET" in methods else methods
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = _error(405, "Метод не поддерживается")
+                response["Allow"] = ", ".join(allowed)
+                return response
+            if login and not request.user.is_authenticated:
+                return _error(401, "Требуется вход")
+            if request.method not in ("GET", "HEAD"):
+                rejected = _csrf.process_view(request, None, (), {})
+                if rejected is not None:
+                    return rejected
+
+            etag = None
+            if version is not None and request.method in ("GET", "HEAD"):
+                request.data_version = version(request, *args, **kwargs)
+                etag = _etag(request, request.data_version)
+                response = get_conditional_response(request, etag=etag)
+                if response is not None:
+                    response["ETag"] = etag
+                    return response
+            try:
+                response = view(request, *args, **kwargs)
+            except ApiError as error:
+                return _error(error.status, error.detail)
+            except Http404:
+                return _error(404, "Не найдено")
+            if etag is not None:
+                response["ETag"] = etag
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
+
+
+def _fields(request, available):
+    requested = request.GET.get("fields")
+    if not requested:
+        return list(available)
+    fields = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = sorted(set(fields) - set(available))
+    if unknown:
+        raise ApiError(400, f"Неизвестные поля: {', '.join(unknown)}")
+    return fields
+
+
+def _serialize(obj, available, fields):
+    return {name: available[name](obj) for name in fields}
+
+
+def _post_page(request, object_list, hydrate=None):
+    fields = _fields(request, POST_FIELDS)
+    page = CursorPaginator(object_list, settings.POSTS_PER_PAGE).page(
+        after=request.GET.get("after"), before=request.GET.get("before"),
+    )
+    posts = page.object_list if hydrate is None else hydrate(page.object_list)
+    return {
+        "results": [_serialize(post, POST_FIELDS, fields) for post in posts],
+        "next_cursor": page.next_cursor,
+        "previous_cursor": page.previous_cursor,
+    }
+
+
+def _with_following(queryset, request, author_field):
+    """Добавляет флаг подписки читателя тем же запросом."""
+    if not request.user.is_authenticated:
+        return queryset.annotate(viewer_follows=Value(False, BooleanField()))
+    return queryset.annotate(viewer_follows=Exists(Follow.objects.filter(
+        user=request.user, author=OuterRef(author_field),
+    )))
+
+
+def _author(author, following):
+    stats = counters.stats_for(author)
+    # following_count в AuthorStats — подписчики автора, follower_count —
+    # его подписки; в API названия привычные клиентам
+    return {
+        "username": author.username,
+        "name": author.get_full_name(),
+        "post_count": stats.post_count,
+        "followers_count": stats.following_count,
+        "following_count": stats.follower_count,
+        "following": bool(following),
+    }
+
+
+def _author_version(request, username, **kwargs):
+    return feed_cache.version(*author_scopes(username))
+
+
+@api_view(version=lambda request: feed_cache.version("all"))
+def index(request):
+    return _json(_post_page(request, Post.objects.for_feed()))
+
+
+@api_view(version=lambda request, slug: feed_cache.version(
+    *group_scopes(slug)))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    data = _post_page(request, group.posts.for_feed())
+    data["group"] = {"slug": group.slug, "title": group.title,
+                     "description": group.description}
+    return _json(data)
+
+
+@api_view(version=_author_version)
+def profile(request, username):
+    authors = _with_following(User.objects.select_related("stats"),
+                              request, "pk")
+    author = get_object_or_404(authors, username=username)
+    data = _post_page(request, author.posts.for_feed())
+    data["author"] = _author(author, author.viewer_follows)
+    return _json(data)
+
+
+@api_view(version=_author_version)
+def post_view(request, username, post_id):
+    posts = _with_following(
+        Post.objects.for_feed().select_related("author__stats"),
+        request, "author",
+    )
+    post = get_object_or_404(posts, id=post_id, author__username=username)
+    fields = _fields(request, POST_FIELDS)
+    comments = post.comments.select_related("author")
+    return _json({
+        "post": _serialize(post, POST_FIELDS, fields),
+        "author": _author(post.author, post.viewer_follows),
+        "comments": [_serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
+                     for comment in comments],
+    })
+
+
+@api_view(login=True,
+          version=lambda request: timeline.version(request.user))
+def follow_index(request):
+    return _json(_post_page(request,
+                            timeline.entries(request.user,
+                                             request.data_version),
+                            hydrate=timeline.hydrate))
+
+
+def _payload(request):
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            raise ApiError(400, "Некорректный JSON") from None
+        if not isinstance(data, dict):
+            raise ApiError(400, "Ожидается JSON-объект")
+        return data
+    return request.POST
+
+
+@api_view(methods=("POST",), login=True)
+@transaction.atomic
+def add_comment(request, username, post_id):
+    post = get_object_or_404(Post, id=post_id, author__username=username)
+    form = CommentForm(_payload(request))
+    if not form.is_valid():
+        return _error(400, "Некорректные данные",
+                      errors=form.errors.get_json_data())
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return _json(_serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS),
+                 status=201)
+
+
+@api_view(methods=("POST", "DELETE"), login=True)
+@transaction.atomic
+def follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.method == "DELETE":
+        Follow.objects.filter(user=request.user, author=author).delete()
+        return _json({"username": author.username, "following": False})
+    if author == request.user:
+        raise ApiError(400, "Нельзя подписаться на себя")
+    _, created = Follow.objects.get_or_create(user=request.user,
+                                              author=author)
+    return _json({"username": author.username, "following": True},
+                 status=201 if created else 200)
+
+
+def _usernames(request):
+    data = _payload(request)
+    if hasattr(data, "getlist"):
+        usernames = data.getlist("usernames")
+    else:
+        usernames = data.get("usernames")
+    if (not isinstance(usernames, list) or not usernames
+            or not all(isinstance(name, str) for name in usernames)):
+        raise ApiError(400, "Ожидается непустой список usernames")
+    if len(usernames) > settings.FOLLOW_BATCH_LIMIT:
+        raise ApiError(
+            400, f"Не больше {settings.FOLLOW_BATCH_LIMIT} авторов за раз"
+        )
+    return usernames
+
+
+@api_view(methods=("POST", "DELETE"), login=True)
+@transaction.atomic
+def follow_many(request):
+    """Подписка на список авторов (POST) или отписка от них (DELETE)."""
+    usernames = _usernames(request)
+    ids = follows.resolve(usernames)
+    pairs = [(request.user.id, author_id) for author_id in ids.values()]
+    if request.method == "DELETE":
+        changed, key = follows.unfollow_pairs(pairs), "unfollowed"
+    else:
+        changed, key = follows.follow_pairs(pairs), "followed"
+    names = {author_id: name for name, author_id in ids.items()}
+    return _json({
+        key: sorted(names[author_id] for _, author_id in changed),
+        "unknown": sorted(set(usernames) - set(ids)),
+    })
@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import api
+
+app_name = "api"
+
+urlpatterns = [
+     path("posts/", api.index, name="index"),
+     path("groups/<slug:slug>/posts/", api.group_posts, name="group_posts"),
+     path("follow/", api.follow_index, name="follow_index"),
+     path("follow/authors/", api.follow_many, name="follow_many"),
+     path("users/<str:username>/", api.profile, name="profile"),
+     path("users/<str:username>/follow/", api.follow, name="follow"),
+     path("users/<str:username>/posts/<int:post_id>/", api.post_view,
+          name="post"),
+     path("users/<str:username>/posts/<int:post_id>/comments/",
+          api.add_comment, name="add_comment"),
+]
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = "posts"
+
+    def ready(self):
+        # модули с фоновыми задачами регистрируют их при импорте
+        from . import signals, thumbnails  # noqa
@@ -0,0 +1,60 @@
+"""Денормализованные счётчики: записи и подписки автора, комментарии поста.
+
+Счётчики обновляются сигналами при создании и удалении Post, Comment и
+Follow; команда recount_stats пересчитывает их и исправляет расхождения.
+"""
+from django.db.models import F
+
+from yatube.replicas import housekeeping
+
+from .models import AuthorStats, Follow, Post
+
+
+def recount(user_id):
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "post_count": Post.objects.filter(author_id=user_id).count(),
+            "following_count":
+                Follow.objects.filter(author_id=user_id).count(),
+            "follower_count": Follow.objects.filter(user_id=user_id).count(),
+        },
+    )
+    return stats
+
+
+def change(user_id, field, delta):
+    # если строки ещё нет, её посчитает с нуля stats_for
+    AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def change_many(field, deltas):
+    """change() для словаря {user_id: delta}: один UPDATE на значение."""
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        AuthorStats.objects.filter(user_id__in=user_ids).update(
+            **{field: F(field) + delta}
+        )
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(id=post_id).update(
+        comment_count=F("comment_count") + delta
+    )
+
+
+def stats_for(user):
+    """Счётчики пользователя; строка создаётся при первом обращении.
+
+    Если user получен с select_related("stats"), запросов не будет.
+    """
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        # запись при чтении страницы не привязывает её к основной базе
+        with housekeeping():
+            return recount(user.id)
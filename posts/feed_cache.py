@@ -0,0 +1,99 @@
+"""Версионированный кэш лент.
+
+У каждой ленты есть поколение: общее («all»), группы, автора и
+подписчика. Запись поста, комментария или подписки сбрасывает
+поколения затронутых лент, а ключи фрагментов и списков включают
+их текущие значения. Поэтому срок жизни кэша может быть долгим, а
+изменения видны сразу.
+"""
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 2
+WAIT_STEP = 0.05
+
+
+def _gen_key(scope):
+    return f"feed-gen:{scope}"
+
+
+def bump(*scopes):
+    """Сбрасывает поколения лент.
+
+    Удалённое поколение при следующем чтении получит новое значение
+    по времени, поэтому удаление равносильно инкременту.
+    """
+    if scopes:
+        cache.delete_many([_gen_key(scope) for scope in scopes])
+
+
+def version(*scopes):
+    """Строка с текущими поколениями лент для ключа кэша."""
+    keys = [_gen_key(scope) for scope in scopes]
+    gens = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in gens}
+    if missing:
+        cache.set_many(missing, None)
+        gens.update(missing)
+    return ".".join(str(gens[key]) for key in keys)
+
+
+def jittered(timeout):
+    """Срок жизни с разбросом, чтобы ключи не истекали одновременно."""
+    spread = timeout * settings.FEED_CACHE_JITTER
+    return int(timeout + random.uniform(-spread, spread))
+
+
+def get_or_compute(key, compute, timeout=None):
+    """Значение из кэша; при промахе его вычисляет только один процесс.
+
+    Остальные ждут результата до WAIT_TIMEOUT секунд, а если не
+    дождались — вычисляют сами, не записывая в кэш.
+    """
+    value = cache.get(key)
+    metrics.record_cache("feed", value is not None)
+    if value is not None:
+        return value
+    if timeout is None:
+        timeout = settings.FEED_CACHE_TIMEOUT
+
+    lock = f"{key}:lock"
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, jittered(timeout))
+        finally:
+            cache.delete(lock)
+        return value
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return compute()
+
+
+def post_scopes(post, *group_ids):
+    group_ids = {post.group_id, *group_ids} - {None}
+    return ["all", f"author:{post.author_id}",
+            *(f"group:{group_id}" for group_id in group_ids)]
+
+
+def card_key(post):
+    """Ключ карточки поста: меняется вместе с любым выводимым полем."""
+    group = post.group
+    fields = (post.text, post.image.name or "", post.thumbnail_data,
+              post.pub_date.isoformat(),
+              post.comment_count, post.author.username,
+              group and group.slug, group and group.title)
+    digest = hashlib.md5("\x1f".join(map(str, fields)).encode()).hexdigest()
+    return f"post-card:{post.id}:{digest}"
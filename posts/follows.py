@@ -0,0 +1,110 @@
+"""Подписки пачкой: онбординг «подписаться на этих авторов» и импорт.
+
+Одиночная подписка идёт через сигналы Follow, и каждая стоит проверки,
+INSERT и нескольких UPDATE счётчиков. Здесь на всю пачку: один запрос
+проверяет авторов, один INSERT ... ON CONFLICT DO NOTHING RETURNING
+вставляет подписки и возвращает те, что вставил именно он (подписку,
+созданную параллельно, пропускает ограничение user_author), а счётчики,
+поколения кэша и ленты подписок обновляются одним проходом только по
+ним. Отписка так же удаляет строки через DELETE ... RETURNING. Сигналов
+эти запросы не вызывают, поэтому всё это делается явно.
+
+RETURNING есть в PostgreSQL и в SQLite начиная с 3.35.
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+
+from . import counters, feed_cache, jobs, timeline
+from .models import Follow, TimelineEntry
+
+User = get_user_model()
+# пар в одном запросе: SQLite ограничивает число параметров
+CHUNK = 400
+
+
+def resolve(usernames):
+    """{username: id} для существующих пользователей — один запрос."""
+    return dict(User.objects.filter(username__in=set(usernames))
+                .values_list("username", "id"))
+
+
+def _returning(sql, pairs):
+    """Выполняет sql пачками пар; возвращает пары из его RETURNING.
+
+    В sql подставляются {table} и {rows} — список «(%s, %s), ...».
+    """
+    connection = connections[router.db_for_write(Follow)]
+    found = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(pairs), CHUNK):
+            chunk = pairs[start:start + CHUNK]
+            cursor.execute(
+                sql.format(rows=", ".join(["(%s, %s)"] * len(chunk)),
+                           table=connection.ops.quote_name(
+                               Follow._meta.db_table)),
+                [value for pair in chunk for value in pair],
+            )
+            found.extend(map(tuple, cursor.fetchall()))
+    return found
+
+
+def _counted(pairs, sign):
+    """Счётчики и поколения кэша обоих участников каждой подписки."""
+    authors = Counter(author_id for _, author_id in pairs)
+    users = Counter(user_id for user_id, _ in pairs)
+    # following_count — подписчики автора, follower_count — подписки
+    for field, counts in (("following_count", authors),
+                          ("follower_count", users)):
+        counters.change_many(field, {user_id: sign * count
+                                     for user_id, count in counts.items()})
+    feed_cache.bump(*(f"author:{user_id}" for user_id in {*authors, *users}))
+
+
+def follow_pairs(pairs):
+    """Создаёт подписки из пар (user_id, author_id); возвращает новые.
+
+    Пары с подпиской на себя и уже существующие пропускаются.
+    """
+    pairs = {(user_id, author_id) for user_id, author_id in pairs
+             if user_id != author_id}
+    if not pairs:
+        return []
+    with transaction.atomic():
+        created = sorted(_returning(
+            "INSERT INTO {table} (user_id, author_id) VALUES {rows} "
+            "ON CONFLICT DO NOTHING RETURNING user_id, author_id",
+            sorted(pairs),
+        ))
+        _counted(created, 1)
+        jobs.enqueue_many("timeline-backfill", [
+            (f"backfill:{user_id}:{author_id}",
+             {"user_id": user_id, "author_id": author_id})
+            for user_id, author_id in created
+        ])
+    return created
+
+
+def unfollow_pairs(pairs):
+    """Удаляет подписки из пар (user_id, author_id); возвращает удалённые."""
+    pairs = set(pairs)
+    if not pairs:
+        return []
+    with transaction.atomic():
+        # без сигналов post_delete на каждую строку
+        removed = sorted(_returning(
+            "DELETE FROM {table} WHERE (user_id, author_id) "
+            "IN (VALUES {rows}) RETURNING user_id, author_id",
+            sorted(pairs),
+        ))
+        by_user = {}
+        for user_id, author_id in removed:
+            by_user.setdefault(user_id, []).append(author_id)
+        for user_id, author_ids in by_user.items():
+            TimelineEntry.objects.filter(
+                user_id=user_id, author_id__in=author_ids
+            ).delete()
+        _counted(removed, -1)
+        feed_cache.bump(*map(timeline.follower_scope, by_user))
+    return removed
@@ -1,6 +1,13 @@
-from django.forms import ModelForm
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
+from django.forms import (CharField, Form, ModelChoiceField, ModelForm,
+                          ValidationError)
 
-from .models import Post, Comment
+from .images import normalize
+from .models import Post, Comment, Group
+
+
+User = get_user_model()
 
 
 class PostForm(ModelForm):
@@ -8,8 +15,32 @@ class PostForm(ModelForm):
         model = Post
         fields = ["text", "group", "image"]
 
+    def clean_image(self):
+        image = self.cleaned_data.get("image")
+        if isinstance(image, UploadedFile):
+            return normalize(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
         model = Comment
         fields = ["text"]
+
+
+class SearchForm(Form):
+    q = CharField(label="Запрос", max_length=200)
+    group = ModelChoiceField(label="Сообщество", required=False,
+                             queryset=Group.objects.order_by("title"),
+                             to_field_name="slug",
+                             empty_label="Все сообщества")
+    author = CharField(label="Автор", required=False, max_length=150)
+
+    def clean_author(self):
+        username = self.cleaned_data.get("author")
+        if not username:
+            return None
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise ValidationError("Такого автора нет")
+        return author
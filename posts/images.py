@@ -0,0 +1,71 @@
+"""Нормализация загружаемых картинок.
+
+Загрузка уменьшается до IMAGE_MAX_SIDE по большей стороне, поворачивается
+по EXIF и перекодируется в IMAGE_FORMAT без метаданных. JPEG декодируется
+сразу в уменьшенном виде (draft), а слишком большие по числу пикселей
+картинки отклоняются по заголовку, до декодирования.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, features
+
+FORMATS = {
+    "WEBP": ("webp", "image/webp", {"quality": 80, "method": 4}),
+    "JPEG": ("jpg", "image/jpeg", {"quality": 85, "optimize": True,
+                                   "progressive": True}),
+}
+
+
+def _output_format():
+    if settings.IMAGE_FORMAT == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return settings.IMAGE_FORMAT
+
+
+def normalize(upload):
+    """Возвращает новый файл для ImageField.
+
+    Перекодируется любая картинка, даже маленькая и уже в IMAGE_FORMAT:
+    иначе в ней остались бы метаданные. Исходный файл возвращается только
+    для анимации, которую перекодирование свело бы к первому кадру.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except Image.DecompressionBombError:
+        raise ValidationError("Изображение слишком большое.")
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError("Изображение слишком большое.")
+    if getattr(image, "is_animated", False):
+        upload.seek(0)
+        return upload
+
+    max_side = settings.IMAGE_MAX_SIDE
+    if image.format == "JPEG":
+        image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    content, extension, content_type = encode(image)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(f"{stem}.{extension}", content, content_type)
+
+
+def encode(image):
+    """Кодирует картинку в IMAGE_FORMAT: (байты, расширение, MIME-тип)."""
+    output = _output_format()
+    extension, content_type, options = FORMATS[output]
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    if output == "JPEG" or not has_alpha:
+        image = image.convert("RGB")
+    elif image.mode != "RGBA":
+        image = image.convert("RGBA")
+
+    buffer = BytesIO()
+    image.save(buffer, output, **options)
+    return buffer.getvalue(), extension, content_type
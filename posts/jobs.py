@@ -0,0 +1,170 @@
+"""Фоновые задачи в таблице базы данных.
+
+Побочные эффекты записи (миниатюры, раскладка по лентам подписчиков,
+поисковый индекс) не выполняются в запросе: enqueue() записывает задачу
+в таблицу posts_job в той же транзакции, что и само изменение, а команда
+run_jobs выполняет их в отдельном процессе. Брокер не нужен; задача
+видна исполнителю только после фиксации и пропадает при откате. Поэтому
+пишущие представления обёрнуты в transaction.atomic: в автокоммите
+запись и задача фиксировались бы по отдельности, и сбой между ними
+оставил бы изменение без побочных эффектов.
+
+* Задача — функция, зарегистрированная декоратором task(name).
+  Аргументы задачи должны сериализоваться в JSON.
+* Ключ идемпотентности (key) не даёт поставить задачу дважды, пока
+  первая ждёт выполнения: повторный enqueue() с тем же ключом ничего не
+  делает. Когда задачу берёт исполнитель, ключ освобождается, и
+  изменение, сделанное во время выполнения, поставит задачу заново.
+* Задача с batch=True получает список аргументов сразу пачки задач
+  (до JOB_BATCH_SIZE). Если пачка упала, задачи повторяются по одной,
+  чтобы одна плохая задача не держала остальные.
+* Упавшая задача повторяется с экспоненциальной задержкой, после
+  JOB_MAX_ATTEMPTS попыток она остаётся в таблице с failed=True и без
+  ключа, чтобы новые задачи с тем же ключом ставились.
+
+С JOBS_EAGER задача выполняется сразу при вызове enqueue(); тесты
+включают его явно или вызывают run_pending().
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+class Task:
+    def __init__(self, name, func, batch):
+        self.name = name
+        self.func = func
+        self.batch = batch
+
+    def run(self, payloads):
+        if self.batch:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+
+def task(name, batch=False):
+    """Регистрирует функцию как задачу name.
+
+    Функция с batch=True вызывается со списком словарей аргументов.
+    """
+    def register(func):
+        _tasks[name] = Task(name, func, batch)
+        return func
+    return register
+
+
+def enqueue(name, key=None, **payload):
+    """Ставит задачу name с аргументами payload в текущей транзакции."""
+    enqueue_many(name, [(key, payload)])
+
+
+def enqueue_many(name, items):
+    """enqueue() для списка пар (key, payload) одним INSERT."""
+    if name not in _tasks:
+        raise KeyError(f"Неизвестная задача: {name}")
+    if not items:
+        return
+    if settings.JOBS_EAGER:
+        _tasks[name].run([payload for _, payload in items])
+        return
+    # задача с тем же ключом уже ждёт — повторная не нужна
+    Job.objects.bulk_create(
+        (Job(name=name, key=key, payload=json.dumps(payload))
+         for key, payload in items),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def _claim(now, batch_size):
+    """Забирает пачку готовых задач одного имени; ключи освобождаются."""
+    with transaction.atomic():
+        ready = (Job.objects.select_for_update(skip_locked=True)
+                 .filter(failed=False, run_at__lte=now)
+                 .exclude(locked_until__gt=now)
+                 .order_by("id"))
+        first = ready.first()
+        if first is None:
+            return []
+        jobs = list(ready.filter(name=first.name)[:batch_size])
+        Job.objects.filter(id__in=[job.id for job in jobs]).update(
+            key=None,
+            locked_until=now + timedelta(seconds=settings.JOB_LOCK_TIMEOUT),
+        )
+    return jobs
+
+
+def _failed(job, now):
+    job.attempts += 1
+    job.error = traceback.format_exc()
+    job.locked_until = None
+    if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+        job.failed = True
+        # ключ не должен навсегда закрыть дорогу новым задачам
+        job.key = None
+        logger.error("Задача %s #%s не выполнена:\n%s",
+                     job.name, job.id, job.error)
+    else:
+        delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        job.run_at = now + timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        # с тем же ключом уже поставлена новая задача, она и выполнится
+        job.key = None
+        job.save()
+
+
+def _run(registered, jobs):
+    payloads = [json.loads(job.payload) for job in jobs]
+    try:
+        with transaction.atomic():
+            registered.run(payloads)
+    except Exception:
+        if len(jobs) == 1:
+            _failed(jobs[0], timezone.now())
+        else:
+            for job in jobs:
+                _run(registered, [job])
+        return
+    Job.objects.filter(id__in=[job.id for job in jobs]).delete()
+
+
+def run_pending(batch_size=None):
+    """Выполняет одну пачку задач; возвращает число взятых задач."""
+    jobs = _claim(timezone.now(), batch_size or settings.JOB_BATCH_SIZE)
+    if not jobs:
+        return 0
+    registered = _tasks.get(jobs[0].name)
+    if registered is None:
+        Job.objects.filter(id__in=[job.id for job in jobs]).update(
+            failed=True, locked_until=None,
+            error=f"Неизвестная задача: {jobs[0].name}",
+        )
+    else:
+        _run(registered, jobs)
+    return len(jobs)
+
+
+def run_ready(batch_size=None):
+    """Выполняет все готовые задачи; возвращает их число."""
+    done = 0
+    while True:
+        taken = run_pending(batch_size)
+        if not taken:
+            return done
+        done += taken
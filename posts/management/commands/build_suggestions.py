@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации «Кого почитать» по всему графу"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=settings.SUGGESTIONS_CHUNK,
+            help="Сколько пользователей записывать одной транзакцией",
+        )
+
+    def handle(self, *args, chunk_size=None, **options):
+        started = time.monotonic()
+        total = suggestions.build(chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Рекомендаций: {total} за {time.monotonic() - started:.1f} с"
+        ))
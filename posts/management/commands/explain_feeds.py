@@ -0,0 +1,83 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+
+User = get_user_model()
+PER_PAGE = 10
+
+# признаки плохого плана: полный проход по таблице или сортировка
+BAD_PLANS = {
+    "sqlite": (re.compile(r"\bSCAN (TABLE )?\w+$"),
+               re.compile(r"USE TEMP B-TREE")),
+    "postgresql": (re.compile(r"Seq Scan"), re.compile(r"\bSort\b")),
+}
+
+
+def feed_queries():
+    """Запросы, которые выполняют представления posts, по именам."""
+    now = timezone.now()
+    keyset = Q(Q(pub_date__lt=now) | Q(id__lt=1), pub_date__lte=now)
+    return {
+        "index": Post.objects.for_feed()[:PER_PAGE],
+        # Paginator.count: COUNT(*) читает тот же индекс, что и выборка id
+        "index count": Post.objects.values("id"),
+        "index cursor": (Post.objects.for_feed().filter(keyset)
+                         .order_by("-pub_date", "-id")[:PER_PAGE + 1]),
+        "group_posts": (Post.objects.for_feed()
+                        .filter(group_id=1)[:PER_PAGE]),
+        "group_posts cursor": (Post.objects.for_feed()
+                               .filter(keyset, group_id=1)
+                               .order_by("-pub_date", "-id")[:PER_PAGE + 1]),
+        "profile": Post.objects.for_feed().filter(author_id=1)[:PER_PAGE],
+        "profile following": Follow.objects.filter(author_id=1, user_id=2),
+        "follow_index timeline": (TimelineEntry.objects.filter(user_id=1)
+                                  .order_by("-pub_date", "-post_id")
+                                  .values_list("pub_date", "post_id")),
+        "follow_index heavy authors": (Post.objects.filter(author_id=1)
+                                       .order_by("-pub_date", "-id")
+                                       .values_list("pub_date", "id")),
+        "follow_index hydrate": (Post.objects.for_feed()
+                                 .filter(id__in=[1, 2]).order_by()),
+        "post": Post.objects.for_feed().filter(id=1),
+        "post comments": (Comment.objects.select_related("author")
+                          .filter(post_id=1)),
+        "fan_out followers": (Follow.objects.filter(author_id=1)
+                              .values_list("user_id", flat=True)),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Выполняет EXPLAIN для запросов лент и завершается с ошибкой, "
+            "если план читает таблицу целиком или сортирует во временном "
+            "B-дереве")
+
+    def handle(self, *args, **options):
+        patterns = BAD_PLANS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(
+                f"EXPLAIN для {connection.vendor} не поддерживается"
+            )
+
+        failed = []
+        for name, queryset in feed_queries().items():
+            plan = queryset.explain()
+            bad = [line for line in plan.splitlines()
+                   if any(pattern.search(line) for pattern in patterns)]
+            status = self.style.ERROR("FAIL") if bad else "ok"
+            self.stdout.write(f"{status:>4}  {name}")
+            for line in plan.splitlines():
+                self.stdout.write(f"      {line}")
+            if bad:
+                failed.append(name)
+
+        if failed:
+            raise CommandError(
+                "Запросы без подходящего индекса: " + ", ".join(failed)
+            )
@@ -0,0 +1,41 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = "Выгружает сообщества, записи, комментарии и подписки в файлы"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory",
+                            help="Каталог для файлов <вид>.<формат>")
+        parser.add_argument("--format", choices=transfer.FORMATS,
+                            default="jsonl", dest="fmt")
+        parser.add_argument(
+            "--kinds", default=",".join(transfer.KINDS),
+            help="Что выгружать, через запятую",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=transfer.CHUNK_SIZE,
+            help="Сколько строк читать из базы за раз",
+        )
+
+    def handle(self, directory, fmt="jsonl", kinds="",
+               chunk_size=transfer.CHUNK_SIZE, **options):
+        try:
+            kinds = transfer.parse_kinds(kinds)
+        except transfer.TransferError as error:
+            raise CommandError(error)
+        os.makedirs(directory, exist_ok=True)
+        for kind in kinds:
+            path = transfer.path_for(directory, kind, fmt)
+            started = time.monotonic()
+            total = transfer.export(kind, path, fmt, chunk_size=chunk_size)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"{kind}: {total} строк за {elapsed:.1f} с "
+                f"({total / elapsed:.0f} строк/с) → {path}"
+            )
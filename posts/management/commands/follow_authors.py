@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import follows
+
+
+class Command(BaseCommand):
+    help = "Подписывает пользователя на авторов пачкой или отписывает"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="Кого подписывать")
+        parser.add_argument("authors", nargs="+",
+                            help="На кого подписывать, по username")
+        parser.add_argument("--unfollow", action="store_true",
+                            help="Отписать вместо подписки")
+
+    def handle(self, username, authors, unfollow=False, **options):
+        ids = follows.resolve([username, *authors])
+        if username not in ids:
+            raise CommandError(f"Нет пользователя {username}")
+        user_id = ids[username]
+        pairs = [(user_id, ids[name]) for name in authors if name in ids]
+        if unfollow:
+            changed = follows.unfollow_pairs(pairs)
+            self.stdout.write(f"Отписок: {len(changed)}")
+        else:
+            changed = follows.follow_pairs(pairs)
+            self.stdout.write(f"Новых подписок: {len(changed)}")
+        unknown = sorted(set(authors) - set(ids))
+        if unknown:
+            self.stdout.write(self.style.WARNING(
+                f"Неизвестные авторы: {', '.join(unknown)}"
+            ))
@@ -0,0 +1,86 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+REPORT_EVERY = 5
+# сколько id конфликтующих строк перечислять в отчёте
+SHOWN_CONFLICTS = 20
+
+
+class Command(BaseCommand):
+    help = "Загружает сообщества, записи, комментарии и подписки из файлов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory",
+                            help="Каталог с файлами <вид>.<формат>")
+        parser.add_argument("--format", choices=transfer.FORMATS,
+                            default="jsonl", dest="fmt")
+        parser.add_argument(
+            "--kinds", default=",".join(transfer.KINDS),
+            help="Что загружать, через запятую",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=transfer.BATCH_SIZE,
+            help="Сколько записей сохранять одной транзакцией",
+        )
+        parser.add_argument(
+            "--create-authors", action="store_true",
+            help="Создавать неизвестных пользователей без пароля",
+        )
+        parser.add_argument(
+            "--restart", action="store_true",
+            help="Не продолжать с места обрыва, читать файлы с начала",
+        )
+
+    def handle(self, directory, fmt="jsonl", kinds="",
+               batch_size=transfer.BATCH_SIZE, create_authors=False,
+               restart=False, **options):
+        try:
+            kinds = transfer.parse_kinds(kinds)
+        except transfer.TransferError as error:
+            raise CommandError(error)
+        importer = transfer.Importer(create_authors=create_authors)
+
+        for kind in kinds:
+            path = transfer.path_for(directory, kind, fmt)
+            if not os.path.exists(path):
+                continue
+            created, skipped = importer.created, importer.skipped
+            conflicts = len(importer.conflicts)
+            started = last_report = time.monotonic()
+
+            def report(records, per_second):
+                nonlocal last_report
+                if time.monotonic() - last_report >= REPORT_EVERY:
+                    last_report = time.monotonic()
+                    self.stdout.write(f"{kind}: {records} записей, "
+                                      f"{per_second:.0f} записей/с")
+
+            try:
+                total = transfer.import_file(
+                    importer, kind, path, fmt, batch_size=batch_size,
+                    resume=not restart, report=report,
+                )
+            except (transfer.TransferError, ValueError, KeyError) as error:
+                raise CommandError(
+                    f"{path}: {error!r}; после исправления запуск "
+                    "продолжится с последней сохранённой пачки"
+                )
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(self.style.SUCCESS(
+                f"{kind}: прочитано {total}, добавлено "
+                f"{importer.created - created}, пропущено "
+                f"{importer.skipped - skipped} за {elapsed:.1f} с"
+            ))
+            clashed = [id_ for _, id_ in importer.conflicts[conflicts:]]
+            if clashed:
+                shown = ", ".join(map(str, clashed[:SHOWN_CONFLICTS]))
+                more = len(clashed) - SHOWN_CONFLICTS
+                self.stderr.write(
+                    f"{kind}: {len(clashed)} id заняты другими строками и "
+                    f"не загружены: {shown}"
+                    + (f" и ещё {more}" if more > 0 else "")
+                )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс записей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=search.BATCH_SIZE,
+            help="Сколько записей индексировать за один запрос",
+        )
+
+    def handle(self, *args, batch_size=search.BATCH_SIZE, **options):
+        total = search.rebuild(batch_size=batch_size)
+        self.stdout.write(f"Проиндексировано записей: {total}")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Заполняет ленты подписок постами авторов по всем подпискам"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=timeline.BACKFILL_BATCH_SIZE,
+            help="Сколько подписок обрабатывать одной транзакцией",
+        )
+
+    def handle(self, *args, batch_size=timeline.BACKFILL_BATCH_SIZE,
+               **options):
+        total = timeline.backfill_all(batch_size=batch_size)
+        self.stdout.write(f"Обработано подписок: {total}")
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from posts.models import AuthorStats, Follow, Post
+
+
+User = get_user_model()
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики записей, подписок и комментариев"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Только показать расхождения, ничего не сохраняя",
+        )
+
+    def handle(self, *args, dry_run=False, **options):
+        with transaction.atomic():
+            authors = self.repair_authors(dry_run)
+            posts = self.repair_posts(dry_run)
+        action = "Найдено" if dry_run else "Исправлено"
+        self.stdout.write(
+            f"{action} расхождений: авторы — {authors}, записи — {posts}"
+        )
+
+    def repair_authors(self, dry_run):
+        posts = dict(Post.objects.values("author")
+                     .annotate(n=Count("id")).values_list("author", "n"))
+        following = dict(Follow.objects.values("author")
+                         .annotate(n=Count("id")).values_list("author", "n"))
+        follower = dict(Follow.objects.values("user")
+                        .annotate(n=Count("id")).values_list("user", "n"))
+        stored = {stats.user_id: stats
+                  for stats in AuthorStats.objects.all()}
+
+        to_create, to_update = [], []
+        for user_id in User.objects.values_list("id", flat=True).iterator():
+            actual = {
+                "post_count": posts.get(user_id, 0),
+                "following_count": following.get(user_id, 0),
+                "follower_count": follower.get(user_id, 0),
+            }
+            stats = stored.get(user_id)
+            if stats is None:
+                to_create.append(AuthorStats(user_id=user_id, **actual))
+            elif any(getattr(stats, field) != value
+                     for field, value in actual.items()):
+                for field, value in actual.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+
+        if not dry_run:
+            AuthorStats.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            AuthorStats.objects.bulk_update(
+                to_update, ["post_count", "following_count", "follower_count"],
+                batch_size=BATCH_SIZE,
+            )
+        return len(to_create) + len(to_update)
+
+    def repair_posts(self, dry_run):
+        drifted = list(
+            Post.objects.annotate(actual=Count("comments"))
+            .exclude(comment_count=F("actual"))
+            .only("id", "comment_count")
+        )
+        for post in drifted:
+            post.comment_count = post.actual
+        if not dry_run:
+            Post.objects.bulk_update(drifted, ["comment_count"],
+                                     batch_size=BATCH_SIZE)
+        return len(drifted)
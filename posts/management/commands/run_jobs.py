@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts import jobs
+
+
+class Command(BaseCommand):
+    help = "Выполняет фоновые задачи из очереди posts_job"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Выполнить готовые задачи и выйти, не дожидаясь новых",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.JOB_BATCH_SIZE,
+            help="Сколько задач одного вида брать за раз",
+        )
+
+    def handle(self, *args, **options):
+        done = 0
+        try:
+            while True:
+                done += jobs.run_ready(options["batch_size"])
+                if options["once"]:
+                    break
+                close_old_connections()
+                time.sleep(settings.JOB_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Задач выполнено: {done}")
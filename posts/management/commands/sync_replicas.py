@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube import replicas
+
+
+class Command(BaseCommand):
+    help = ("Копирует основную базу SQLite в файлы реплик "
+            "(замена репликации при локальной разработке)")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("Реплики не настроены: DATABASE_REPLICAS пуст")
+        for alias in settings.DATABASE_REPLICAS:
+            replicas.sync(alias)
+            self.stdout.write(f"Реплика {alias} обновлена")
@@ -0,0 +1,342 @@
+"""Замеры запросов и их выдача в формате Prometheus.
+
+MetricsMiddleware для каждого запроса измеряет время ответа, число и
+время SQL-запросов, время отрисовки шаблонов, попадания и промахи
+кэша лент и страниц и время построения миниатюр. Значения копятся в
+гистограммах с меткой view — именем представления из resolver_match,
+и отдаются представлением metrics_view в текстовом формате Prometheus.
+Реестр живёт в памяти процесса: каждый процесс сервера отдаёт свои
+значения, и сервер метрик собирает их с каждого.
+
+Запрос дороже бюджета (METRICS_QUERY_BUDGET запросов или
+METRICS_TIME_BUDGET секунд) попадает в лог предупреждением.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNRESOLVED = "<unresolved>"
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=SECONDS,
+                 labels=("view",)):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total)
+                              for labels, (counts, total)
+                              in self._series.items())
+        bounds = (*self.buckets, float("inf"))
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (f"{self.name}_bucket"
+                       f"{_labels(self.labels, labels, le=_number(bound))}",
+                       cumulative)
+            yield f"{self.name}_sum{_labels(self.labels, labels)}", total
+            yield (f"{self.name}_count{_labels(self.labels, labels)}",
+                   cumulative)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=("view",)):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            yield f"{self.name}{_labels(self.labels, labels)}", value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+REQUEST_SECONDS = Histogram(
+    "yatube_request_duration_seconds", "Время ответа на запрос.",
+)
+QUERY_COUNT = Histogram(
+    "yatube_request_queries", "Число SQL-запросов за запрос.", QUERIES,
+)
+QUERY_SECONDS = Histogram(
+    "yatube_request_query_duration_seconds",
+    "Суммарное время SQL-запросов за запрос.",
+)
+TEMPLATE_SECONDS = Histogram(
+    "yatube_request_template_duration_seconds",
+    "Время отрисовки шаблонов за запрос.",
+)
+REQUEST_THUMBNAIL_SECONDS = Histogram(
+    "yatube_request_thumbnail_duration_seconds",
+    "Время построения миниатюр в потоке запроса.",
+)
+CACHE_HITS = Counter(
+    "yatube_cache_hits_total", "Попадания в кэш лент и страниц.",
+    labels=("view", "cache"),
+)
+CACHE_MISSES = Counter(
+    "yatube_cache_misses_total", "Промахи кэша лент и страниц.",
+    labels=("view", "cache"),
+)
+THUMBNAIL_SECONDS = Histogram(
+    "yatube_thumbnail_duration_seconds",
+    "Время построения всех миниатюр одной картинки.", labels=(),
+)
+REGISTRY = (REQUEST_SECONDS, QUERY_COUNT, QUERY_SECONDS, TEMPLATE_SECONDS,
+            REQUEST_THUMBNAIL_SECONDS, CACHE_HITS, CACHE_MISSES,
+            THUMBNAIL_SECONDS)
+
+
+def expose():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {_number(value)}"
+                     for name, value in metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.clear()
+
+
+class RequestStats:
+    """Замеры одного запроса; их дополняют и потоки parallel.gather."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.thumbnail_seconds = 0.0
+        self.cache_hits = {}
+        self.cache_misses = {}
+
+    def add(self, field, value):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + value)
+
+    def query(self, seconds):
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+
+    def cache(self, name, hit):
+        counts = self.cache_hits if hit else self.cache_misses
+        with self._lock:
+            counts[name] = counts.get(name, 0) + 1
+
+
+_current = ContextVar("request_stats", default=None)
+_rendering = ContextVar("template_rendering", default=False)
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+class _QueryTimer:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats.query(time.perf_counter() - started)
+
+
+@contextmanager
+def collecting(stats):
+    """Относит к stats всё, что происходит в этом потоке внутри блока.
+
+    SQL-запросы считаются обёрткой execute_wrapper на соединениях
+    потока, остальное — через record_*; stats=None или уже собираемые
+    в этом потоке stats ничего не меняют.
+    """
+    if stats is None or stats is _current.get():
+        yield
+        return
+    token = _current.set(stats)
+    try:
+        with ExitStack() as stack:
+            timer = _QueryTimer(stats)
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            yield
+    finally:
+        _current.reset(token)
+
+
+def record_cache(name, hit):
+    stats = _current.get()
+    if stats is not None:
+        stats.cache(name, hit)
+
+
+def record_thumbnail(seconds):
+    THUMBNAIL_SECONDS.observe(seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.add("thumbnail_seconds", seconds)
+
+
+@contextmanager
+def _timing_template():
+    # вложенные отрисовки (карточка поста внутри ленты) уже входят
+    # во время внешней
+    if _rendering.get() or _current.get() is None:
+        yield
+        return
+    token = _rendering.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _rendering.reset(token)
+        _current.get().add("template_seconds",
+                           time.perf_counter() - started)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with _timing_template():
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонный движок Django, замеряющий время отрисовки."""
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+def observe(request, seconds, stats):
+    view = _view_name(request)
+    REQUEST_SECONDS.observe(seconds, view)
+    QUERY_COUNT.observe(stats.queries, view)
+    QUERY_SECONDS.observe(stats.query_seconds, view)
+    TEMPLATE_SECONDS.observe(stats.template_seconds, view)
+    if stats.thumbnail_seconds:
+        REQUEST_THUMBNAIL_SECONDS.observe(stats.thumbnail_seconds, view)
+    for name, count in stats.cache_hits.items():
+        CACHE_HITS.inc(view, name, amount=count)
+    for name, count in stats.cache_misses.items():
+        CACHE_MISSES.inc(view, name, amount=count)
+
+    if (stats.queries > settings.METRICS_QUERY_BUDGET
+            or seconds > settings.METRICS_TIME_BUDGET):
+        logger.warning(
+            "Запрос дороже бюджета: %s %s (%s) — %.3f с, SQL-запросов: "
+            "%d за %.3f с, шаблоны %.3f с",
+            request.method, request.get_full_path(), view, seconds,
+            stats.queries, stats.query_seconds, stats.template_seconds,
+        )
+
+
+class MetricsMiddleware:
+    """Замеряет каждый запрос; ставится первым в MIDDLEWARE.
+
+    Если запрос уже замеряется снаружи (benchmarks.harness), значения
+    копятся в те же stats.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = current() or RequestStats()
+        started = time.perf_counter()
+        with collecting(stats):
+            response = self.get_response(request)
+        observe(request, time.perf_counter() - started, stats)
+        return response
+
+
+def metrics_view(request):
+    """Метрики для Prometheus; доступны только с METRICS_ALLOWED_IPS."""
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(expose(), content_type=CONTENT_TYPE)
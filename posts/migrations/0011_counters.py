@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_comments(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    counts = (Comment.objects.values("post")
+              .annotate(n=models.Count("id"))
+              .values_list("post", "n"))
+    for post_id, n in counts:
+        Post.objects.filter(id=post_id).update(comment_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('following_count', models.PositiveIntegerField(default=0, help_text='Сколько пользователей подписано на автора', verbose_name='Подписчиков')),
+                ('follower_count', models.PositiveIntegerField(default=0, help_text='На скольких авторов подписан пользователь', verbose_name='Подписок')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
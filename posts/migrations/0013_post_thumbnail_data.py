@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_data',
+            field=models.TextField(default='{}', editable=False, help_text='Готовые миниатюры, JSON'),
+        ),
+    ]
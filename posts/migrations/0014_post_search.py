@@ -0,0 +1,67 @@
+# Generated by Django 2.2.6 on 2026-10-18 09:12
+
+from itertools import islice
+
+from django.db import migrations
+
+# основы слов нужны, чтобы заполнить индекс так же, как его заполняет
+# posts.search; стеммер — чистая функция текста и от схемы не зависит
+from posts.stemmer import stems
+
+# DDL записан здесь, а не взят из posts.search: миграция должна строить
+# ту схему, что была на момент её создания
+TABLE = "posts_post_search"
+INDEX = "posts_post_search_idx"
+BATCH_SIZE = 1000
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "body, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX} ON posts_post "
+            "USING gin (to_tsvector('russian'::regconfig, "
+            "COALESCE(text, '')))"
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX}")
+
+
+def fill_index(apps, schema_editor):
+    # индекс PostgreSQL заполняет сама СУБД
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Post = apps.get_model("posts", "Post")
+    rows = Post.objects.values_list("id", "text").iterator()
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = [(pk, " ".join(stems(text)))
+                     for pk, text in islice(rows, BATCH_SIZE)]
+            if not batch:
+                break
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, body) VALUES (%s, %s)", batch
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_thumbnail_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(editable=False)),
+                ('score', models.FloatField(editable=False)),
+                ('mutual_count', models.PositiveIntegerField(default=0, editable=False, help_text='Сколько авторов пользователя подписаны на кандидата', verbose_name='Общих подписок')),
+                ('group_count', models.PositiveIntegerField(default=0, editable=False, help_text='В скольких группах пользователя пишет кандидат', verbose_name='Общих групп')),
+                ('candidate', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['user', 'rank'], name='suggestion_user_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='suggestion',
+            constraint=models.UniqueConstraint(fields=('user', 'candidate'), name='suggestion_user_candidate'),
+        ),
+    ]
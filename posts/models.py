@@ -1,5 +1,8 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 
 User = get_user_model()
@@ -14,6 +17,16 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты со всеми связями, которые выводят post_item.html и post.html.
+
+        Число комментариев хранится в comment_count, поэтому
+        отдельной аннотации не нужно.
+        """
+        return self.select_related("author", "group")
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name="Текст", help_text="Содержание поста")
     pub_date = models.DateTimeField("date published", auto_now_add=True)
@@ -24,13 +37,32 @@ class Post(models.Model):
                               verbose_name="Группа",
                               help_text="Группа, содержащая пост")
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comment_count = models.PositiveIntegerField("Комментариев", default=0,
+                                                editable=False)
+    thumbnail_data = models.TextField(default="{}", editable=False,
+                                      help_text="Готовые миниатюры, JSON")
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pub_date"]
+        # по возрастанию: обратный проход даёт порядок (-pub_date, -id)
+        indexes = [
+            models.Index(fields=["pub_date"], name="post_pub_date_idx"),
+            models.Index(fields=["group", "pub_date"],
+                         name="post_group_pub_date_idx"),
+            models.Index(fields=["author", "pub_date"],
+                         name="post_author_pub_date_idx"),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnails(self):
+        """Миниатюры по именам размеров: {"card": {"url", "width", "height"}}."""
+        return json.loads(self.thumbnail_data)
+
 
 class Comment(models.Model):
     text = models.TextField("Текст", help_text="Комментарий к посту")
@@ -40,6 +72,13 @@ class Comment(models.Model):
                              related_name="comments", editable=False)
     created = models.DateTimeField("Date created", auto_now_add=True)
 
+    class Meta:
+        ordering = ["created"]
+        indexes = [
+            models.Index(fields=["post", "created"],
+                         name="comment_post_created_idx"),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE,
@@ -53,3 +92,92 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='user_author')
         ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                related_name="stats", primary_key=True)
+    post_count = models.PositiveIntegerField("Записей", default=0)
+    following_count = models.PositiveIntegerField(
+        "Подписчиков", default=0,
+        help_text="Сколько пользователей подписано на автора"
+    )
+    follower_count = models.PositiveIntegerField(
+        "Подписок", default=0,
+        help_text="На скольких авторов подписан пользователь"
+    )
+
+    def __str__(self):
+        return f"Статистика {self.user}"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="timeline", editable=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="timeline_entries", editable=False)
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+", editable=False)
+    pub_date = models.DateTimeField(editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="timeline_user_post")
+        ]
+        indexes = [
+            models.Index(fields=["user", "pub_date", "post"],
+                         name="timeline_user_pub_date_post"),
+            models.Index(fields=["user", "author"],
+                         name="timeline_user_author"),
+        ]
+
+
+class Job(models.Model):
+    """Фоновая задача, см. posts.jobs."""
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=200, null=True, unique=True,
+                           help_text="Ключ идемпотентности ждущей задачи")
+    payload = models.TextField(default="{}")
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    failed = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["failed", "run_at"],
+                         name="job_failed_run_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id}"
+
+
+class Suggestion(models.Model):
+    """Кого почитать: top-K кандидатов пользователя, см. posts.suggestions."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="suggestions", editable=False)
+    candidate = models.ForeignKey(User, on_delete=models.CASCADE,
+                                  related_name="+", editable=False)
+    rank = models.PositiveSmallIntegerField(editable=False)
+    score = models.FloatField(editable=False)
+    mutual_count = models.PositiveIntegerField(
+        "Общих подписок", default=0, editable=False,
+        help_text="Сколько авторов пользователя подписаны на кандидата"
+    )
+    group_count = models.PositiveIntegerField(
+        "Общих групп", default=0, editable=False,
+        help_text="В скольких группах пользователя пишет кандидат"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "candidate"],
+                                    name="suggestion_user_candidate")
+        ]
+        indexes = [
+            models.Index(fields=["user", "rank"],
+                         name="suggestion_user_rank"),
+        ]
@@ -0,0 +1,132 @@
+"""Кэш целых страниц для анонимных читателей.
+
+Ключ страницы — адрес запроса и поколения лент, которые она выводит
+(см. feed_cache), поэтому запись поста, комментария или подписки сразу
+делает старую копию недоступной. ETag и Last-Modified считаются по
+самой свежей записи страницы; при совпадении ответ 304 отдаётся без
+рендеринга шаблона.
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import feed_cache, metrics
+from .models import Group
+
+
+User = get_user_model()
+
+
+def _cached_id(key, queryset):
+    return feed_cache.get_or_compute(
+        key, lambda: queryset.values_list("id", flat=True).first()
+    )
+
+
+def group_scopes(slug):
+    group_id = _cached_id(f"group-id:{slug}", Group.objects.filter(slug=slug))
+    return [f"group:{group_id}"]
+
+
+def author_scopes(username, **kwargs):
+    author_id = _cached_id(f"user-id:{username}",
+                           User.objects.filter(username=username))
+    return [f"author:{author_id}"]
+
+
+def forget_ids(group_slugs=(), usernames=()):
+    """Сбрасывает кэш id по slug и username после их изменения."""
+    cache.delete_many([*(f"group-id:{slug}" for slug in group_slugs),
+                       *(f"user-id:{name}" for name in usernames)])
+
+
+def _is_anonymous(request):
+    # сессию не читаем: без cookie пользователь точно анонимный
+    return (request.method in ("GET", "HEAD")
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+
+def page_key(full_path, scopes):
+    path = hashlib.md5(full_path.encode()).hexdigest()
+    return f"page-cache:{path}:{feed_cache.version(*scopes)}"
+
+
+def _newest(context):
+    dates = []
+    if context.get("post") is not None:
+        dates.append(context["post"].pub_date)
+    dates.extend(post.pub_date for post in context.get("page") or ())
+    dates.extend(comment.created for comment in context.get("comments") or ())
+    if not dates:
+        return None
+    return timegm(max(dates).utctimetuple())
+
+
+def _etag(key, last_modified):
+    return quote_etag(
+        hashlib.md5(f"{key}:{last_modified}".encode()).hexdigest()
+    )
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def anonymous_page_cache(scopes):
+    """Кэширует страницу для анонимов.
+
+    scopes(**view_kwargs) возвращает поколения лент, от которых зависит
+    страница.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _is_anonymous(request):
+                return view(request, *args, **kwargs)
+
+            key = page_key(request.get_full_path(), scopes(**kwargs))
+            entry = cache.get(key)
+            metrics.record_cache("page", entry is not None)
+            if entry is not None:
+                content, content_type, etag, last_modified = entry
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified,
+                    response=HttpResponse(content, content_type=content_type),
+                )
+                return _set_validators(response, etag, last_modified)
+
+            response = view(request, *args, **kwargs)
+            if (not isinstance(response, TemplateResponse)
+                    or response.status_code != 200):
+                return response
+
+            last_modified = _newest(response.context_data)
+            etag = _etag(key, last_modified)
+            conditional = get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+            )
+            if conditional is not None:
+                return _set_validators(conditional, etag, last_modified)
+
+            response.render()
+            cache.set(
+                key,
+                (response.content, response["Content-Type"], etag,
+                 last_modified),
+                feed_cache.jittered(settings.PAGE_CACHE_TIMEOUT),
+            )
+            return _set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,233 @@
+"""Постраничный вывод лент.
+
+Кроме обычного Paginator с ?page=N ленты умеют листаться курсором:
+?after=<токен> — записи старше токена, ?before=<токен> — новее.
+Курсор — это пара (pub_date, id) последней показанной записи, поэтому
+страница 5000 стоит столько же, сколько первая, и COUNT(*) не нужен.
+
+Для ?page=N число записей берётся из кэша, а не из COUNT(*) на каждый
+запрос, и шаблон выводит только окно номеров вокруг текущей страницы.
+"""
+import base64
+import hashlib
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import SimpleLazyObject
+
+from . import feed_cache
+
+
+def _key(item):
+    if isinstance(item, tuple):
+        return item
+    return item.pub_date, item.id
+
+
+def encode_cursor(item):
+    pub_date, pk = _key(item)
+    raw = f"{pub_date.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        pub_date, pk = raw.decode().split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage(Sequence):
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous,
+                 cache_key=""):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.cache_key = cache_key
+
+    def __repr__(self):
+        return f"<CursorPage {self.cache_key}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id), от новых записей к старым.
+
+    object_list — QuerySet постов либо список пар (pub_date, id),
+    отсортированный по убыванию.
+    """
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    def page(self, after=None, before=None):
+        after_key = decode_cursor(after) if after else None
+        before_key = decode_cursor(before) if before else None
+        if isinstance(self.object_list, QuerySet):
+            items, more = self._query(after_key, before_key)
+        else:
+            items, more = self._scan(after_key, before_key)
+
+        if before_key:
+            return CursorPage(items, self, has_next=True, has_previous=more,
+                              cache_key=f"before:{before}")
+        if after_key:
+            return CursorPage(items, self, has_next=more, has_previous=True,
+                              cache_key=f"after:{after}")
+        return CursorPage(items, self, has_next=more, has_previous=False,
+                          cache_key="first")
+
+    def _query(self, after, before):
+        queryset = self.object_list
+        if before:
+            pub_date, pk = before
+            queryset = queryset.filter(
+                Q(pub_date__gt=pub_date) | Q(id__gt=pk),
+                pub_date__gte=pub_date,
+            ).order_by("pub_date", "id")
+        else:
+            if after:
+                pub_date, pk = after
+                # диапазон по pub_date идёт по индексу, OR только уточняет
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(id__lt=pk),
+                    pub_date__lte=pub_date,
+                )
+            queryset = queryset.order_by("-pub_date", "-id")
+        items = list(queryset[:self.per_page + 1])
+        more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if before:
+            items.reverse()
+        return items, more
+
+    def _scan(self, after, before):
+        keys = self.object_list
+        if before:
+            end = next((i for i, key in enumerate(keys) if key <= before),
+                       len(keys))
+            start = max(end - self.per_page, 0)
+            return list(keys[start:end]), start > 0
+        start = 0
+        if after:
+            start = next((i for i, key in enumerate(keys) if key < after),
+                         len(keys))
+        end = start + self.per_page
+        return list(keys[start:end]), end < len(keys)
+
+
+ON_EACH_SIDE = 2
+ON_ENDS = 1
+
+
+def page_window(number, num_pages):
+    """Номера страниц вокруг текущей и по краям; None — пропуск.
+
+    Для страницы 50 из 100: 1, None, 48, 49, 50, 51, 52, None, 100.
+    """
+    start = max(number - ON_EACH_SIDE, 1)
+    end = min(number + ON_EACH_SIDE, num_pages)
+    head, tail = [], []
+    # пропуск ставится, только если он скрывает больше одной страницы
+    if start > ON_ENDS + 2:
+        head = [*range(1, ON_ENDS + 1), None]
+    else:
+        start = 1
+    if end < num_pages - ON_ENDS - 1:
+        tail = [None, *range(num_pages - ON_ENDS + 1, num_pages + 1)]
+    else:
+        end = num_pages
+    return [*head, *range(start, end + 1), *tail]
+
+
+def cached_count(object_list, scopes=()):
+    """COUNT(*) для Paginator без запроса на каждую страницу.
+
+    Число записей QuerySet кэшируется по тексту запроса. Если переданы
+    scopes — поколения лент из feed_cache, — они входят в ключ, и число
+    сбрасывается вместе с лентой при любой записи. Без них оно
+    приблизительное и обновляется раз в PAGINATOR_COUNT_TIMEOUT секунд.
+    """
+    if not isinstance(object_list, QuerySet):
+        return len(object_list)
+    digest = hashlib.md5(str(object_list.query).encode()).hexdigest()
+    if scopes:
+        key = f"page-count:{digest}:{feed_cache.version(*scopes)}"
+        timeout = settings.FEED_CACHE_TIMEOUT
+    else:
+        key = f"page-count:{digest}"
+        timeout = settings.PAGINATOR_COUNT_TIMEOUT
+    count = cache.get(key)
+    if count is None:
+        count = object_list.count()
+        cache.set(key, count, feed_cache.jittered(timeout))
+    return count
+
+
+def paginate(request, object_list, per_page=None, scopes=()):
+    """Возвращает (paginator, page) для ленты.
+
+    С ?after=/?before= используется курсор, иначе — обычный Paginator
+    с числом записей из cached_count(object_list, scopes). По умолчанию
+    на странице POSTS_PER_PAGE записей.
+    """
+    per_page = per_page or settings.POSTS_PER_PAGE
+    after = request.GET.get("after")
+    before = request.GET.get("before")
+    if after or before:
+        paginator = CursorPaginator(object_list, per_page)
+        return paginator, paginator.page(after=after, before=before)
+
+    paginator = Paginator(object_list, per_page)
+    # count — cached_property, значение в экземпляре заменяет COUNT(*)
+    paginator.count = cached_count(object_list, scopes)
+    page = paginator.get_page(request.GET.get("page"))
+    page.window = page_window(page.number, paginator.num_pages)
+    # repr() страницы содержит число страниц и не годится для ключа кэша
+    page.cache_key = f"page:{page.number}"
+    # по последней записи страницы: записи читаются, только если курсор
+    # выводится, а не при попадании во фрагмент ленты в кэше
+    page.next_cursor = SimpleLazyObject(
+        lambda: encode_cursor(page[-1]) if page.has_next() and len(page)
+        else ""
+    )
+    return paginator, page
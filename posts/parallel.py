@@ -0,0 +1,63 @@
+"""Одновременное выполнение независимых запросов представления.
+
+Django 2.2 не умеет асинхронных представлений, поэтому запросы, которые
+не зависят друг от друга (автор, запись, комментарии, подписка), идут
+в пуле потоков: у каждого потока своё соединение с базой, и время
+страницы определяется самым медленным запросом, а не их суммой.
+
+Пул включается VIEW_QUERY_WORKERS и по умолчанию выключен: он общий для
+всех запросов процесса, а соединение потока без CONN_MAX_AGE
+открывается заново на каждый вызов. Это окупается только на сервере
+базы данных с сетевой задержкой, но не на локальном файле SQLite.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from . import metrics
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.VIEW_QUERY_WORKERS,
+            thread_name_prefix="view-queries",
+        )
+    return _executor
+
+
+def _run(call, stats):
+    try:
+        # запросы потока пула относятся к запросу, который их запустил
+        with metrics.collecting(stats):
+            return call()
+    finally:
+        close_old_connections()
+
+
+def _can_use_pool():
+    # другие соединения не видят незафиксированную транзакцию запроса,
+    # а SQLite в памяти не ждёт блокировок между потоками
+    in_memory = getattr(connection, "is_in_memory_db", lambda: False)()
+    return (settings.VIEW_QUERY_WORKERS
+            and not connection.in_atomic_block
+            and not in_memory)
+
+
+def gather(*calls):
+    """Результаты вызовов в том же порядке; исключение первого
+    упавшего вызова пробрасывается дальше."""
+    if not _can_use_pool() or len(calls) < 2:
+        return [call() for call in calls]
+    stats = metrics.current()
+    # контекст запроса (например, привязка к основной базе после
+    # записи) нужен и в потоках пула
+    futures = [_pool().submit(copy_context().run, _run, call, stats)
+               for call in calls[1:]]
+    # первый вызов — в потоке запроса, чтобы не простаивать
+    return [calls[0](), *(future.result() for future in futures)]
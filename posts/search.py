@@ -0,0 +1,253 @@
+"""Полнотекстовый поиск по записям.
+
+Индекс живёт в той же базе, что и посты. Сохранённая запись попадает в
+него фоновой задачей (см. jobs), удалённая убирается сразу; команда
+rebuild_search_index пересобирает его целиком. Бэкенд выбирается по
+СУБД:
+
+* SQLite — таблица FTS5 posts_post_search (rowid = id поста) с текстом,
+  заранее приведённым к основам стеммером (см. stemmer), ранжирование
+  по bm25();
+* PostgreSQL — to_tsvector('russian', text) с GIN-индексом по тому же
+  выражению и ts_rank(); хранить ничего не нужно, индекс СУБД
+  обновляется сам.
+
+Результаты листаются курсором по паре (релевантность, id), как и
+ленты: ни OFFSET, ни COUNT(*) по совпадениям не выполняются.
+"""
+import base64
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from . import jobs, stemmer
+from .models import Post
+from .pagination import CursorPage
+
+TABLE = "posts_post_search"
+BATCH_SIZE = 1000
+
+
+def encode_cursor(key):
+    score, pk = key
+    raw = f"{score!r}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        score, pk = raw.decode().split("|")
+        return float(score), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class SearchPage(CursorPage):
+    """Страница результатов; курсор указывает на последнее совпадение."""
+    def __init__(self, object_list, keys, has_next, cache_key=""):
+        super().__init__(object_list, None, has_next=has_next,
+                         has_previous=False, cache_key=cache_key)
+        self.keys = keys
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.keys:
+            return encode_cursor(self.keys[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        return None
+
+
+class SQLiteBackend:
+    def create(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "body, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def update(self, rows):
+        """Переиндексирует пары (id, text)."""
+        rows = [(pk, " ".join(stemmer.stems(text))) for pk, text in rows]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s",
+                               [(pk,) for pk, _ in rows])
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, body) VALUES (%s, %s)", rows
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s",
+                               [(pk,) for pk in post_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')"
+            )
+
+    def match(self, query, group_id, author_id, after, limit):
+        terms = stemmer.stems(query)
+        if not terms:
+            return []
+        # каждая основа в кавычках: синтаксис FTS5 из запроса не проходит
+        sql = [
+            f"SELECT {TABLE}.rowid AS id, bm25({TABLE}) AS score",
+            f"FROM {TABLE} JOIN posts_post p ON p.id = {TABLE}.rowid",
+            f"WHERE {TABLE} MATCH %s",
+        ]
+        params = [" ".join(f'"{term}"' for term in terms)]
+        if group_id is not None:
+            sql.append("AND p.group_id = %s")
+            params.append(group_id)
+        if author_id is not None:
+            sql.append("AND p.author_id = %s")
+            params.append(author_id)
+        sql = f"SELECT score, id FROM ({' '.join(sql)})"
+        if after:
+            # bm25 тем меньше, чем лучше совпадение
+            sql += " WHERE score > %s OR (score = %s AND id > %s)"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY score, id LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class PostgresBackend:
+    CONFIG = "russian"
+    INDEX = "posts_post_search_idx"
+
+    def create(self, schema_editor):
+        # выражение совпадает с тем, что строит SearchVector("text")
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.INDEX} ON posts_post "
+            f"USING gin (to_tsvector('{self.CONFIG}'::regconfig, "
+            "COALESCE(text, '')))"
+        )
+
+    def drop(self, schema_editor):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {self.INDEX}")
+
+    def update(self, rows):
+        pass
+
+    def remove(self, post_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def optimize(self):
+        pass
+
+    def match(self, query, group_id, author_id, after, limit):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector,
+        )
+
+        vector = SearchVector("text", config=self.CONFIG)
+        search_query = SearchQuery(query, config=self.CONFIG)
+        queryset = (Post.objects
+                    .annotate(document=vector,
+                              score=SearchRank(vector, search_query))
+                    .filter(document=search_query))
+        if group_id is not None:
+            queryset = queryset.filter(group_id=group_id)
+        if author_id is not None:
+            queryset = queryset.filter(author_id=author_id)
+        if after:
+            # ts_rank тем больше, чем лучше совпадение
+            queryset = queryset.filter(
+                Q(score__lt=after[0]) | Q(score=after[0], id__gt=after[1])
+            )
+        return list(queryset.order_by("-score", "id")
+                    .values_list("score", "id")[:limit])
+
+
+BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "postgresql": PostgresBackend,
+}
+
+
+def backend(using=connection):
+    try:
+        return BACKENDS[using.vendor]()
+    except KeyError:
+        raise NotImplementedError(
+            f"Поиск не поддерживается для {using.vendor}"
+        ) from None
+
+
+def index_posts(posts):
+    backend().update((post.id, post.text) for post in posts)
+
+
+@jobs.task("search-index", batch=True)
+def _index_job(payloads):
+    index_posts(Post.objects.filter(
+        id__in=[payload["post_id"] for payload in payloads]
+    ).only("id", "text"))
+
+
+def schedule_index(post):
+    jobs.enqueue("search-index", key=f"search-index:{post.id}",
+                 post_id=post.id)
+
+
+def remove_posts(post_ids):
+    backend().remove(post_ids)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Пересобирает индекс пачками; возвращает число записей."""
+    engine = backend()
+    total = 0
+    with transaction.atomic():
+        engine.clear()
+        batch = []
+        rows = (Post.objects.order_by().values_list("id", "text")
+                .iterator(chunk_size=batch_size))
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                engine.update(batch)
+                total += len(batch)
+                batch = []
+        engine.update(batch)
+        total += len(batch)
+    engine.optimize()
+    return total
+
+
+def search(query, group=None, author=None, after=None, per_page=None):
+    """Страница записей по запросу, от самых релевантных."""
+    per_page = per_page or settings.POSTS_PER_PAGE
+    after_key = decode_cursor(after) if after else None
+    keys = backend().match(
+        query,
+        group_id=group.id if group else None,
+        author_id=author.id if author else None,
+        after=after_key,
+        limit=per_page + 1,
+    )
+    more = len(keys) > per_page
+    keys = keys[:per_page]
+    posts = Post.objects.for_feed().in_bulk([pk for _, pk in keys])
+    # запись могла исчезнуть между поиском и выборкой
+    keys = [key for key in keys if key[1] in posts]
+    return SearchPage([posts[pk] for _, pk in keys], keys, has_next=more,
+                      cache_key=f"after:{after}" if after_key else "first")
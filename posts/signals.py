@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, page_cache, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed_cache.bump(f"group:{instance.id}")
+        page_cache.forget_ids(group_slugs=[instance.slug])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, raw=False, update_fields=None,
+                 **kwargs):
+    # вход пользователя обновляет только last_login — страницы не меняются
+    if not raw and update_fields != frozenset({"last_login"}):
+        feed_cache.bump(f"author:{instance.id}")
+        page_cache.forget_ids(usernames=[instance.username])
+
+
+def _image_name(post):
+    # из __dict__: отложенное поле не должно читаться из базы
+    image = post.__dict__.get("image")
+    return getattr(image, "name", image) or ""
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # группа до редактирования: её ленту тоже нужно сбросить
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = _image_name(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change(instance.author_id, "post_count", 1)
+    feed_cache.bump(*feed_cache.post_scopes(instance,
+                                            instance._loaded_group_id))
+    instance._loaded_group_id = instance.group_id
+    if update_fields is None or "text" in update_fields:
+        search.schedule_index(instance)
+    if update_fields is None or "image" in update_fields:
+        image = _image_name(instance)
+        if image != instance._loaded_image:
+            thumbnails.schedule(instance)
+        instance._loaded_image = image
+    timeline.schedule_fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, "post_count", -1)
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+    search.remove_posts([instance.id])
+    thumbnails.forget(instance)
+    timeline.touch_followers(instance.author_id)
+
+
+def _comment_changed(comment):
+    post = comment.post
+    feed_cache.bump(*feed_cache.post_scopes(post))
+    timeline.schedule_touch(post.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments(instance.post_id, 1)
+        _comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+    _comment_changed(instance)
+
+
+def _follow_changed(follow):
+    feed_cache.bump(f"author:{follow.author_id}", f"author:{follow.user_id}")
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, "following_count", 1)
+        counters.change(instance.user_id, "follower_count", 1)
+        _follow_changed(instance)
+        timeline.schedule_backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, "following_count", -1)
+    counters.change(instance.user_id, "follower_count", -1)
+    _follow_changed(instance)
+    timeline.prune(instance.user_id, instance.author_id)
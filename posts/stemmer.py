@@ -0,0 +1,118 @@
+"""Стеммер для русского языка по алгоритму Snowball (Портер).
+
+Используется поисковым индексом на SQLite: FTS5 не умеет русскую
+морфологию, поэтому текст и запрос приводятся к основам заранее.
+Слова не на кириллице возвращаются без изменений.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = "аеиоуыэюя"
+CYRILLIC = re.compile(r"^[а-я]+$")
+WORD = re.compile(r"\w+")
+
+# окончания первой группы допустимы только после «а» или «я»
+PERFECTIVE_GERUND = (
+    ("в", "вши", "вшись"),
+    ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"),
+)
+ADJECTIVE = (
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем",
+    "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю",
+    "ая", "яя", "ою", "ею",
+)
+PARTICIPLE = (
+    ("ем", "нн", "вш", "ющ", "щ"),
+    ("ивш", "ывш", "ующ"),
+)
+REFLEXIVE = ("ся", "сь")
+VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет",
+     "ют", "ны", "ть", "ешь", "нно"),
+    ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй",
+     "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют",
+     "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"),
+)
+NOUN = (
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и",
+    "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам", "ом", "о",
+    "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+)
+SUPERLATIVE = ("ейш", "ейше")
+DERIVATIONAL = ("ост", "ость")
+
+
+def _after_vowel_consonant(word, start):
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _ending(word, start, after_a=(), plain=()):
+    """Длина самого длинного окончания из списков, лежащего в word[start:]."""
+    best = 0
+    for suffix in after_a:
+        size = len(suffix)
+        if (size > best and word.endswith(suffix)
+                and len(word) - size - 1 >= start
+                and word[-size - 1] in "ая"):
+            best = size
+    for suffix in plain:
+        size = len(suffix)
+        if (size > best and word.endswith(suffix)
+                and len(word) - size >= start):
+            best = size
+    return best
+
+
+def _cut(word, size):
+    return word[:len(word) - size]
+
+
+def _adjectival(word, start):
+    size = _ending(word, start, plain=ADJECTIVE)
+    if size:
+        size += _ending(_cut(word, size), start, *PARTICIPLE)
+    return size
+
+
+def stem(word):
+    return _stem(word.lower().replace("ё", "е"))
+
+
+# словарь естественного языка мал: основы частых слов берутся из кэша
+@lru_cache(maxsize=100_000)
+def _stem(word):
+    if not CYRILLIC.match(word):
+        return word
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in VOWELS),
+              len(word))
+    r2 = _after_vowel_consonant(word, _after_vowel_consonant(word, 0))
+
+    size = _ending(word, rv, *PERFECTIVE_GERUND)
+    if size:
+        word = _cut(word, size)
+    else:
+        word = _cut(word, _ending(word, rv, plain=REFLEXIVE))
+        size = (_adjectival(word, rv)
+                or _ending(word, rv, *VERB)
+                or _ending(word, rv, plain=NOUN))
+        word = _cut(word, size)
+
+    word = _cut(word, _ending(word, rv, plain=("и",)))
+    word = _cut(word, _ending(word, r2, plain=DERIVATIONAL))
+
+    size = _ending(word, rv, plain=SUPERLATIVE)
+    if size:
+        word = _cut(word, size)
+    if word.endswith("нн") and len(word) - 1 >= rv:
+        word = word[:-1]
+    elif not size:
+        word = _cut(word, _ending(word, rv, plain=("ь",)))
+    return word
+
+
+def stems(text):
+    """Основы всех слов текста в порядке появления."""
+    return [stem(word) for word in WORD.findall(text)]
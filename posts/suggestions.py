@@ -0,0 +1,170 @@
+"""Кого почитать: рекомендации авторов по графу подписок и группам.
+
+Рекомендации считаются пакетно по всему графу командой
+build_suggestions (например, раз в час по cron) и хранятся в таблице
+Suggestion — по SUGGESTIONS_PER_USER кандидатов на пользователя.
+Лента подписок читает рекомендации читателя одним запросом (for_user),
+отбрасывая авторов, на которых он подписался после расчёта.
+
+Оценка кандидата складывается из двух частей:
+
+* друзья друзей — за каждого автора, на которого подписан пользователь
+  и который сам подписан на кандидата; вклад автора тем меньше, чем на
+  большее число людей он подписан (как в индексе Адамик — Адара);
+* общие группы — за каждую группу, где пользователь пишет записи или
+  комментарии, а кандидат пишет записи; вклад большой группы меньше.
+
+Граф хранится в сжатых строках (CSR) из массивов array целых чисел:
+offsets[id] — начало соседей вершины id в плоском массиве соседей.
+Вершины — это сами id, поэтому словари не нужны, а память линейна по
+числу подписок (4 байта на ребро) и по наибольшему id (8 байт). Обход
+от каждого соседа ограничен SUGGESTIONS_MAX_WALK вершинами — самыми
+свежими подписками и самыми активными авторами группы, так что
+счёт одного пользователя не зависит от размера графа, а результаты
+записываются пачками по SUGGESTIONS_CHUNK пользователей.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Comment, Follow, Group, Post, Suggestion
+
+User = get_user_model()
+
+FRIEND_WEIGHT = 1.0
+GROUP_WEIGHT = 0.5
+READ_CHUNK = 10000
+
+
+class Graph:
+    """Списки смежности в формате CSR; строки — id вершин."""
+
+    def __init__(self, size, rows):
+        """rows — пары (строка, столбец), отсортированные по строке."""
+        counts = array("q", [0]) * (size + 1)
+        self.columns = array("i")
+        for row, column in rows:
+            if row >= size:
+                # вершина появилась после того, как граф начали читать
+                continue
+            counts[row + 1] += 1
+            self.columns.append(column)
+        self.offsets = array("q", accumulate(counts))
+
+    def __getitem__(self, row):
+        if row + 1 >= len(self.offsets):
+            return self.columns[0:0]
+        return self.columns[self.offsets[row]:self.offsets[row + 1]]
+
+    def degree(self, row):
+        if row + 1 >= len(self.offsets):
+            return 0
+        return self.offsets[row + 1] - self.offsets[row]
+
+
+def _size(model):
+    return (model.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+
+
+def load():
+    """Граф подписок и активность в группах: (follows, groups, posters)."""
+    users = _size(User)
+    # свежие подписки первыми: score() берёт только первые из них, и при
+    # сортировке по author_id это были бы самые старые аккаунты
+    follows = Graph(users, Follow.objects.order_by("user_id", "-id")
+                    .values_list("user_id", "author_id")
+                    .iterator(chunk_size=READ_CHUNK))
+
+    # группы, где пользователь пишет записи или комментарии
+    active = {
+        *Post.objects.exclude(group=None)
+        .values_list("author_id", "group_id").distinct(),
+        *Comment.objects.exclude(post__group=None)
+        .values_list("author_id", "post__group_id").distinct(),
+    }
+    groups = Graph(users, sorted(active))
+    del active
+
+    # авторы группы, самые активные первыми
+    posters = Graph(
+        _size(Group),
+        ((group_id, author_id) for group_id, author_id, _ in
+         Post.objects.exclude(group=None).values("group_id", "author_id")
+         .annotate(posts=Count("id"))
+         .order_by("group_id", "-posts", "author_id")
+         .values_list("group_id", "author_id", "posts")
+         .iterator(chunk_size=READ_CHUNK)),
+    )
+    return follows, groups, posters
+
+
+def score(user_id, follows, groups, posters, limit=None, walk=None):
+    """Лучшие кандидаты пользователя: [(оценка, id, подписки, группы)]."""
+    limit = limit or settings.SUGGESTIONS_PER_USER
+    walk = walk or settings.SUGGESTIONS_MAX_WALK
+    scores, mutual, shared = Counter(), Counter(), Counter()
+
+    followed = follows[user_id]
+    for friend in followed[:walk]:
+        weight = FRIEND_WEIGHT / math.log2(2 + follows.degree(friend))
+        for candidate in follows[friend][:walk]:
+            scores[candidate] += weight
+            mutual[candidate] += 1
+
+    for group in groups[user_id][:walk]:
+        weight = GROUP_WEIGHT / math.log2(2 + posters.degree(group))
+        for candidate in posters[group][:walk]:
+            scores[candidate] += weight
+            shared[candidate] += 1
+
+    for known in (user_id, *followed):
+        scores.pop(known, None)
+    best = heapq.nlargest(limit, scores.items(),
+                          key=lambda item: (item[1], -item[0]))
+    return [(value, candidate, mutual[candidate], shared[candidate])
+            for candidate, value in best]
+
+
+def build(chunk_size=None):
+    """Пересчитывает таблицу Suggestion; возвращает число рекомендаций."""
+    chunk_size = chunk_size or settings.SUGGESTIONS_CHUNK
+    follows, groups, posters = load()
+    total = 0
+    size = len(follows.offsets) - 1
+    for start in range(0, size, chunk_size):
+        end = min(start + chunk_size, size)
+        rows = [
+            Suggestion(user_id=user_id, candidate_id=candidate, rank=rank,
+                       score=value, mutual_count=mutual, group_count=shared)
+            for user_id in range(start, end)
+            if follows.degree(user_id) or groups.degree(user_id)
+            for rank, (value, candidate, mutual, shared) in enumerate(
+                score(user_id, follows, groups, posters)
+            )
+        ]
+        # по диапазону id: удаляются и рекомендации тех, у кого их больше нет
+        with transaction.atomic():
+            Suggestion.objects.filter(user_id__gte=start,
+                                      user_id__lt=end).delete()
+            Suggestion.objects.bulk_create(rows, batch_size=500)
+        total += len(rows)
+    return total
+
+
+def for_user(user_id, limit=None):
+    """Рекомендации пользователя одним запросом, без уже подписанных."""
+    limit = limit or settings.SUGGESTIONS_SHOWN
+    return list(
+        Suggestion.objects.filter(user_id=user_id)
+        .exclude(candidate__in=Follow.objects.filter(user_id=user_id)
+                 .values("author_id"))
+        .select_related("candidate")
+        .order_by("rank")[:limit]
+    )
@@ -0,0 +1,83 @@
+import re
+
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import feed_cache
+
+register = template.Library()
+
+ACTIONS_MARKER = "<!-- post-actions -->"
+# метка карточки во фрагменте ленты: кнопки подставляются после кэша
+VIEWER_ACTIONS = re.compile(r"<!-- post-actions:(\d+):(\d+) -->")
+DEFER_ACTIONS = "_feedcache_defer_actions"
+
+
+def _with_actions(html, user):
+    """Подставляет кнопки зрителя вместо меток карточек."""
+    def actions(match):
+        post_id, author_id = map(int, match.groups())
+        if getattr(user, "id", None) != author_id:
+            return ""
+        return render_to_string("post_actions.html", {
+            "post_id": post_id, "author_id": author_id, "user": user,
+        })
+    return mark_safe(VIEWER_ACTIONS.sub(actions, html))
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+
+        def build():
+            with context.push({DEFER_ACTIONS: True}):
+                return self.nodelist.render(context)
+
+        # фрагмент общий для всех зрителей, свои у каждого только кнопки
+        return _with_actions(feed_cache.get_or_compute(key, build),
+                             context.get("user"))
+
+
+@register.tag("feedcache")
+def do_feedcache(parser, token):
+    """Кэширует фрагмент ленты.
+
+    {% feedcache index_page feed_version page %} ... {% endfeedcache %}
+
+    В отличие от {% cache %}, срок жизни берётся из FEED_CACHE_TIMEOUT
+    с разбросом, а при промахе фрагмент строит только один запрос.
+    Свежесть обеспечивает версия ленты среди vary_on. Фрагмент не
+    зависит от зрителя: кнопки автора в карточках (post_card)
+    подставляются в него после чтения из кэша.
+    """
+    nodelist = parser.parse(("endfeedcache",))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 1 argument."
+        )
+    return FeedCacheNode(nodelist, bits[1],
+                         [parser.compile_filter(bit) for bit in bits[2:]])
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Карточка поста: общий для всех кэш плюс кнопки текущего зрителя."""
+    card = feed_cache.get_or_compute(
+        feed_cache.card_key(post),
+        lambda: render_to_string("post_card.html", {"post": post}),
+    )
+    card = card.replace(ACTIONS_MARKER,
+                        f"<!-- post-actions:{post.id}:{post.author_id} -->")
+    if context.get(DEFER_ACTIONS):
+        return mark_safe(card)
+    return _with_actions(card, context.get("user"))
@@ -0,0 +1,93 @@
+"""Бюджеты SQL-запросов для URL приложения.
+
+Бюджеты лежат в query_budgets.json рядом с тестами в виде
+{имя URL: {зритель: число запросов}} и меняются только намеренно:
+после оптимизации их уменьшают вручную, а после осознанного
+усложнения страницы перезаписывают замером:
+
+    UPDATE_QUERY_BUDGETS=1 python manage.py test posts.tests.test_query_budgets
+"""
+import json
+import os
+from pathlib import Path
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+BUDGETS_PATH = Path(__file__).with_name("query_budgets.json")
+
+
+def updating():
+    return os.environ.get("UPDATE_QUERY_BUDGETS") == "1"
+
+
+def load():
+    with open(BUDGETS_PATH, encoding="utf-8") as source:
+        return json.load(source)
+
+
+def save(budgets):
+    with open(BUDGETS_PATH, "w", encoding="utf-8") as out:
+        json.dump(budgets, out, ensure_ascii=False, indent=2, sort_keys=True)
+        out.write("\n")
+
+
+# внутри внешней транзакции atomic() представления ставит точки
+# сохранения; в автокоммите сервера их нет
+SAVEPOINTS = ("SAVEPOINT ", "RELEASE SAVEPOINT ", "ROLLBACK TO SAVEPOINT ")
+
+
+def count_queries(request):
+    """Число запросов вызова request(); его изменения в базе откатываются."""
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        transaction.set_rollback(True)
+    return sum(not query["sql"].startswith(SAVEPOINTS)
+               for query in queries)
+
+
+class QueryBudgetMixin:
+    """assert_query_budget для TestCase.
+
+    Сравнивает замеры одного URL на разных объёмах данных: число
+    запросов не должно расти вместе с объёмом и превышать бюджет.
+    С UPDATE_QUERY_BUDGETS=1 вместо проверки бюджета замеры
+    записываются в файл.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.budgets = load()
+        cls.measured = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if updating() and cls.measured:
+            budgets = load()
+            for name, viewers in cls.measured.items():
+                budgets.setdefault(name, {}).update(viewers)
+            save(budgets)
+        super().tearDownClass()
+
+    def assert_query_budget(self, name, viewer, counts):
+        """counts — {объём данных: число запросов} по возрастанию объёма."""
+        sizes = list(counts)
+        for smaller, larger in zip(sizes, sizes[1:]):
+            self.assertLessEqual(
+                counts[larger], counts[smaller],
+                f"{name} ({viewer}): число запросов растёт с объёмом "
+                f"данных: {counts}",
+            )
+        worst = max(counts.values())
+        if updating():
+            self.measured.setdefault(name, {})[viewer] = worst
+            return
+        budget = self.budgets.get(name, {}).get(viewer)
+        self.assertIsNotNone(
+            budget, f"{name} ({viewer}): нет бюджета в {BUDGETS_PATH.name}"
+        )
+        self.assertLessEqual(
+            worst, budget,
+            f"{name} ({viewer}): {worst} запросов при бюджете {budget}",
+        )
@@ -0,0 +1,201 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters, page_cache, timeline
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=True)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="TestTestov")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(title="Группа номер 1",
+                                         slug="test_group")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(text=f"Номер {i}", author=cls.author,
+                                group=cls.group)
+            for i in range(13)
+        ]
+        Comment.objects.create(post=cls.posts[-1], author=cls.reader,
+                               text="Комментарий")
+        cls.post_kwargs = {"username": cls.author.username,
+                           "post_id": cls.posts[-1].id}
+
+    def setUp(self):
+        cache.clear()
+        counters.recount(ApiTests.author.id)
+        counters.recount(ApiTests.reader.id)
+
+        self.guest_client = Client()
+        self.client = Client()
+        self.client.force_login(ApiTests.reader)
+
+    def test_feeds_walk_with_cursor(self):
+        urls = (
+            reverse("api:index"),
+            reverse("api:group_posts", kwargs={"slug": "test_group"}),
+            reverse("api:profile", kwargs={"username": "TestTestov"}),
+            reverse("api:follow_index"),
+        )
+        expected = [post.id for post in reversed(ApiTests.posts)]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                seen = [post["id"] for post in data["results"]]
+                data = self.client.get(
+                    url, {"after": data["next_cursor"]}).json()
+                seen += [post["id"] for post in data["results"]]
+
+                self.assertEqual(seen, expected)
+                self.assertIsNone(data["next_cursor"])
+
+    def test_sparse_fields(self):
+        data = self.client.get(reverse("api:index"),
+                               {"fields": "id,comment_count"}).json()
+
+        self.assertEqual(data["results"][0],
+                         {"id": ApiTests.posts[-1].id, "comment_count": 1})
+        response = self.client.get(reverse("api:index"),
+                                   {"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_and_post_embed_counts(self):
+        author = self.client.get(
+            reverse("api:profile", kwargs={"username": "TestTestov"})
+        ).json()["author"]
+        data = self.client.get(reverse("api:post",
+                                       kwargs=ApiTests.post_kwargs)).json()
+
+        self.assertEqual(author, data["author"])
+        self.assertEqual(author["post_count"], 13)
+        self.assertEqual(author["followers_count"], 1)
+        self.assertTrue(author["following"])
+        self.assertEqual([comment["text"] for comment in data["comments"]],
+                         ["Комментарий"])
+
+    def test_etag_returns_not_modified_until_feed_changes(self):
+        url = reverse("api:index")
+        etag = self.guest_client.get(url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        Post.objects.create(text="Новая", author=ApiTests.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_is_cheaper_than_html(self):
+        pages = (
+            ("index", {}),
+            ("group_posts", {"slug": "test_group"}),
+            ("profile", {"username": "TestTestov"}),
+            ("post", ApiTests.post_kwargs),
+        )
+        for name, kwargs in pages:
+            with self.subTest(page=name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as html:
+                    self.client.get(reverse(name, kwargs=kwargs))
+                cache.clear()
+                # id по slug и username живут в кэше до их изменения
+                page_cache.group_scopes("test_group")
+                page_cache.author_scopes("TestTestov")
+                with CaptureQueriesContext(connection) as api:
+                    self.client.get(reverse(f"api:{name}", kwargs=kwargs))
+                self.assertLess(len(api), len(html))
+
+    def test_follow_feed_costs_no_more_than_html(self):
+        with CaptureQueriesContext(connection) as html:
+            self.client.get(reverse("follow_index"))
+        cache.clear()
+        with CaptureQueriesContext(connection) as api:
+            self.client.get(reverse("api:follow_index"))
+
+        self.assertLessEqual(len(api), len(html))
+
+    def test_add_comment(self):
+        url = reverse("api:add_comment", kwargs=ApiTests.post_kwargs)
+
+        response = self.client.post(url, json.dumps({"text": "Из API"}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["author"], "Reader")
+        self.assertTrue(Comment.objects.filter(text="Из API").exists())
+
+        response = self.client.post(url, "{}",
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("text", response.json()["errors"])
+
+    def test_follow_and_unfollow(self):
+        url = reverse("api:follow", kwargs={"username": "TestTestov"})
+        Follow.objects.all().delete()
+
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.client.delete(url).status_code, 200)
+        self.assertFalse(Follow.objects.exists())
+        own = reverse("api:follow", kwargs={"username": "Reader"})
+        self.assertEqual(self.client.post(own).status_code, 400)
+
+    def test_guest_errors_are_json(self):
+        checks = (
+            (self.guest_client.get(reverse("api:follow_index")), 401),
+            (self.guest_client.post(
+                reverse("api:add_comment", kwargs=ApiTests.post_kwargs),
+                {"text": "Гость"}), 401),
+            (self.client.get(reverse("api:profile",
+                                     kwargs={"username": "Nobody"})), 404),
+            (self.client.post(reverse("api:index")), 405),
+        )
+        for response, status in checks:
+            with self.subTest(status=status):
+                self.assertEqual(response.status_code, status)
+                self.assertIn("detail", response.json())
+
+    def test_post_only_view_rejects_head(self):
+        response = self.client.head(reverse("api:follow_many"))
+
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response["Allow"], "POST, DELETE")
+
+    def test_csrf_failure_is_json(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(ApiTests.reader)
+        url = reverse("api:follow", kwargs={"username": "TestTestov"})
+
+        response = client.delete(url)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF", response.json()["detail"])
+        self.assertTrue(Follow.objects.exists())
+
+        client.get(reverse("new_post"))
+        response = client.delete(
+            url, HTTP_X_CSRFTOKEN=client.cookies["csrftoken"].value)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_feed_version_is_computed_once(self):
+        with mock.patch.object(timeline, "version",
+                               wraps=timeline.version) as version:
+            self.client.get(reverse("api:follow_index"))
+
+        self.assertEqual(version.call_count, 1)
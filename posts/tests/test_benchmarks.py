@@ -0,0 +1,61 @@
+from statistics import median
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import TestCase
+
+from benchmarks import data, harness
+from posts.models import Comment, Follow, Post
+
+
+User = get_user_model()
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_generator_builds_power_law_graph(self):
+        sample = data.generate(users=60, posts=120, comments=80, groups=3,
+                               follows_per_user=8, seed=1)
+
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 80)
+        followers = sorted(
+            Follow.objects.values("author").annotate(n=Count("id"))
+            .values_list("n", flat=True), reverse=True)
+        self.assertGreater(followers[0], 3 * median(followers))
+        self.assertTrue(Post.objects.filter(
+            id=sample["post_id"], author__username=sample["username"]
+        ).exists())
+
+    def test_harness_measures_every_url(self):
+        sample = data.generate(users=10, posts=15, comments=5, groups=1,
+                               follows_per_user=3)
+        targets = harness.targets(sample)
+        viewer = User.objects.get(username=sample["viewer"])
+
+        results = harness.run(targets, {"guest": None, "user": viewer},
+                              requests=3, warmup=0)
+
+        self.assertEqual(len(results), 2 * len(targets))
+        names = {name for name, _ in targets}
+        self.assertIn("post", names)
+        self.assertIn("api:index", names)
+        self.assertNotIn("profile_follow", names)
+        for result in results:
+            with self.subTest(name=result["name"], viewer=result["viewer"]):
+                self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+                self.assertLess(max(result["status"]), 500)
+        index = next(r for r in results
+                     if r["name"] == "index" and r["viewer"] == "user")
+        self.assertGreater(index["queries"], 0)
+        self.assertGreater(index["bytes"], 0)
+
+    def test_percentile_uses_nearest_rank(self):
+        samples = list(range(1, 101))
+
+        self.assertEqual(harness.percentile(samples, 0.5), 50)
+        self.assertEqual(harness.percentile(samples, 0.99), 99)
+        self.assertEqual(harness.percentile([7], 0.95), 7)
@@ -0,0 +1,173 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from yatube import caches as backends
+
+def two_level(location, **options):
+    return {
+        "BACKEND": "yatube.caches.TwoLevelCache",
+        "LOCATION": location,
+        "OPTIONS": {"SHARED": "shared", "CHECK_INTERVAL": 60, **options},
+    }
+
+
+class CacheTestCase(SimpleTestCase):
+    """Каждый тест получает свой файл общего кэша."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, "cache.sqlite3")
+        settings = override_settings(CACHES={
+            "default": two_level("default"),
+            "shared": {"BACKEND": "yatube.caches.SQLiteCache",
+                       "LOCATION": self.path,
+                       "OPTIONS": {"MAX_ENTRIES": 1000}},
+            # «второй процесс»: своё LRU поверх того же файла
+            "other": two_level("other"),
+            "small": two_level("small", MAX_ENTRIES=2, MAX_BYTES=10_000,
+                               SHARED_ONLY=("gen:",)),
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for alias in ("default", "other", "small"):
+            caches[alias].lru.clear()
+
+
+class SQLiteCacheTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = caches["shared"]
+
+    def test_values_are_shared_between_instances(self):
+        other = backends.SQLiteCache(self.path, {})
+        self.cache.set("key", {"a": [1, 2]})
+
+        self.assertEqual(other.get("key"), {"a": [1, 2]})
+        other.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_expired_values_are_missing(self):
+        self.cache.set("key", "value", 0.05)
+        time.sleep(0.1)
+
+        self.assertIsNone(self.cache.get("key"))
+        self.assertFalse(self.cache.has_key("key"))
+        self.assertTrue(self.cache.add("key", "new"))
+        self.assertFalse(self.cache.add("key", "newer"))
+        self.assertEqual(self.cache.get("key"), "new")
+
+    def test_many(self):
+        self.cache.set_many({f"key{i}": i for i in range(600)})
+
+        self.assertEqual(len(self.cache.get_many(
+            [f"key{i}" for i in range(700)])), 600)
+        self.cache.delete_many([f"key{i}" for i in range(600)])
+        self.assertEqual(self.cache.get_many(["key1", "key599"]), {})
+
+    def test_cull_keeps_table_bounded(self):
+        cache = backends.SQLiteCache(self.path,
+                                     {"OPTIONS": {"MAX_ENTRIES": 100}})
+        for i in range(300):
+            cache.set(f"key{i}", i)
+
+        (count,) = cache._connection().execute(
+            "SELECT COUNT(*) FROM cache").fetchone()
+        self.assertLessEqual(count, 200)
+
+
+class TwoLevelCacheTests(CacheTestCase):
+    def test_local_hit_skips_shared_cache(self):
+        caches["default"].set("fragment", "<p>Запись</p>")
+
+        with mock.patch.object(backends.SQLiteCache, "get_many") as shared:
+            self.assertEqual(caches["default"].get("fragment"),
+                             "<p>Запись</p>")
+        shared.assert_not_called()
+
+    def test_other_process_sees_writes_after_check_interval(self):
+        default, other = caches["default"], caches["other"]
+        default.set("fragment", "старая")
+        self.assertEqual(other.get("fragment"), "старая")
+
+        default.set("fragment", "новая")
+        self.assertEqual(other.get("fragment"), "старая")
+
+        later = time.monotonic() + 61
+        with mock.patch.object(backends.time, "monotonic",
+                               return_value=later):
+            self.assertEqual(other.get("fragment"), "новая")
+
+    def test_stamp_check_does_not_refetch_unchanged_value(self):
+        caches["default"].set("fragment", "значение")
+        caches["other"].get("fragment")
+
+        later = time.monotonic() + 61
+        shared = backends.SQLiteCache.get_many
+        with mock.patch.object(backends.time, "monotonic",
+                               return_value=later), \
+                mock.patch.object(backends.SQLiteCache, "get_many",
+                                  autospec=True, side_effect=shared) as spy:
+            self.assertEqual(caches["other"].get("fragment"), "значение")
+        self.assertEqual(spy.call_args[0][1], ["fragment:stamp"])
+
+    def test_delete_reaches_other_processes(self):
+        caches["default"].set("fragment", "значение")
+        caches["other"].get("fragment")
+        caches["default"].delete("fragment")
+
+        later = time.monotonic() + 61
+        with mock.patch.object(backends.time, "monotonic",
+                               return_value=later):
+            self.assertIsNone(caches["other"].get("fragment"))
+
+    def test_shared_only_keys_skip_lru(self):
+        small = caches["small"]
+        small.set_many({"gen:all": 1, "fragment": "x"})
+
+        self.assertEqual(small.get_many(["gen:all", "fragment"]),
+                         {"gen:all": 1, "fragment": "x"})
+        self.assertEqual(len(small.lru.entries), 1)
+        self.assertEqual(caches["shared"].get("gen:all"), 1)
+
+    def test_lru_is_bounded(self):
+        small = caches["small"]
+        for i in range(5):
+            small.set(f"key{i}", "x" * 100)
+        small.set("huge", "x" * 20_000)
+
+        self.assertEqual(list(small.lru.entries),
+                         [small.make_key("key3"), small.make_key("key4")])
+        self.assertEqual(small.get("huge"), "x" * 20_000)
+
+
+class IsolatedCacheTests(SimpleTestCase):
+    def test_tests_do_not_use_checkout_cache(self):
+        checkout = os.path.join(settings.BASE_DIR, "cache.sqlite3")
+
+        self.assertNotEqual(caches["shared"].path, checkout)
+
+    def test_shared_caches_move_to_temporary_file(self):
+        with backends.isolated():
+            path = caches["shared"].path
+            caches["default"].set("key", "value")
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(settings.CACHES["default"]["BACKEND"],
+                             "yatube.caches.TwoLevelCache")
+        self.assertFalse(os.path.exists(path))
+        self.assertNotEqual(caches["shared"].path, path)
+
+
+@skipUnless(backends.redis is None, "redis установлен")
+class RedisCacheTests(SimpleTestCase):
+    def test_requires_redis_package(self):
+        with self.assertRaises(ImproperlyConfigured):
+            backends.RedisCache("redis://localhost:6379/0", {})
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import counters
+from posts.models import AuthorStats, Comment, Follow, Post
+
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="Author")
+        cls.reader = User.objects.create_user(username="Reader")
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_counters_follow_writes(self):
+        stats = counters.stats_for(self.author)
+        self.assertEqual(stats.post_count, 0)
+
+        post = Post.objects.create(text="Запись", author=self.author)
+        Comment.objects.create(text="Комментарий", author=self.reader,
+                               post=post)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+
+        stats.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.following_count, 1)
+        self.assertEqual(counters.stats_for(self.reader).follower_count, 1)
+        self.assertEqual(post.comment_count, 1)
+
+        follow.delete()
+        post.comments.all().delete()
+        stats.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(stats.following_count, 0)
+        self.assertEqual(post.comment_count, 0)
+
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.post_count, 0)
+
+    def test_profile_reads_stored_counters(self):
+        Post.objects.create(text="Запись", author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        counters.recount(self.author.id)
+        AuthorStats.objects.filter(user=self.author).update(post_count=7)
+
+        response = self.guest_client.get(
+            reverse("profile", kwargs={"username": self.author.username}))
+
+        self.assertEqual(response.context.get("post_count"), 7)
+        self.assertEqual(response.context.get("following_count"), 1)
+        self.assertEqual(response.context.get("follower_count"), 0)
+
+    def test_recount_stats_repairs_drift(self):
+        post = Post.objects.create(text="Запись", author=self.author)
+        Comment.objects.create(text="Комментарий", author=self.reader,
+                               post=post)
+        counters.recount(self.author.id)
+        AuthorStats.objects.filter(user=self.author).update(post_count=5)
+        Post.objects.filter(id=post.id).update(comment_count=9)
+
+        out = StringIO()
+        call_command("recount_stats", stdout=out)
+
+        post.refresh_from_db()
+        self.assertEqual(AuthorStats.objects.get(user=self.author).post_count,
+                         1)
+        self.assertEqual(AuthorStats.objects.get(user=self.reader).post_count,
+                         0)
+        self.assertEqual(post.comment_count, 1)
+        self.assertIn("авторы — 2, записи — 1", out.getvalue())
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=True)
+class FeedVersionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="Author")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(title="Группа номер 1",
+                                         slug="test_group")
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = Client()
+        self.client.force_login(FeedVersionTests.reader)
+
+    def test_writes_bump_affected_scopes(self):
+        scopes = ("all", f"group:{self.group.id}", f"author:{self.author.id}")
+        before = feed_cache.version(*scopes)
+        post = Post.objects.create(text="Запись", author=self.author,
+                                   group=self.group)
+        after_post = feed_cache.version(*scopes)
+        Comment.objects.create(text="Комментарий", author=self.reader,
+                               post=post)
+        after_comment = feed_cache.version(*scopes)
+
+        self.assertEqual(len({before, after_post, after_comment}), 3)
+
+    def test_moving_post_bumps_previous_group(self):
+        post = Post.objects.create(text="Запись", author=self.author,
+                                   group=self.group)
+        before = feed_cache.version(f"group:{self.group.id}")
+
+        post = Post.objects.get(id=post.id)
+        post.group = None
+        post.save()
+
+        self.assertNotEqual(feed_cache.version(f"group:{self.group.id}"),
+                            before)
+
+    def test_follow_page_is_fresh_after_write(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse("follow_index")
+        self.client.get(url)
+
+        Post.objects.create(text="Свежая запись", author=self.author)
+
+        self.assertContains(self.client.get(url), "Свежая запись")
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_page_is_fresh_for_heavy_author(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse("follow_index")
+        self.client.get(url)
+
+        Post.objects.create(text="Свежая запись", author=self.author)
+
+        self.assertContains(self.client.get(url), "Свежая запись")
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                feed_cache.get_or_compute("key", compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 5)
+
+    @override_settings(FEED_CACHE_JITTER=0.1)
+    def test_jitter_stays_in_bounds(self):
+        timeouts = {feed_cache.jittered(1000) for _ in range(50)}
+
+        self.assertTrue(all(900 <= timeout <= 1100 for timeout in timeouts))
+        self.assertGreater(len(timeouts), 1)
@@ -0,0 +1,136 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters, follows
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=True)
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.authors = [User.objects.create_user(username=f"Author{i}")
+                       for i in range(30)]
+        for author in cls.authors:
+            Post.objects.create(text=f"Запись {author.username}",
+                                author=author)
+        for user in (cls.reader, *cls.authors):
+            counters.recount(user.id)
+        cls.url = reverse("api:follow_many")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def send(self, method, usernames):
+        return getattr(self.client, method)(
+            self.url, json.dumps({"usernames": usernames}),
+            content_type="application/json",
+        )
+
+    def test_follow_many(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        names = [author.username for author in self.authors[:3]]
+
+        response = self.send("post", [*names, "Reader", "Nobody"])
+
+        self.assertEqual(response.json(), {"followed": names[1:],
+                                           "unknown": ["Nobody"]})
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 3)
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.follower_count, 3)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.reader)
+                .values_list("author__username", flat=True)),
+            set(names),
+        )
+
+    def test_counters_match_recount(self):
+        self.send("post", [author.username for author in self.authors[:5]])
+
+        for user in (self.reader, *self.authors[:5]):
+            user.stats.refresh_from_db()
+            stats = user.stats
+            recounted = counters.recount(user.id)
+            self.assertEqual(
+                (stats.follower_count, stats.following_count),
+                (recounted.follower_count, recounted.following_count),
+            )
+
+    def test_rows_inserted_concurrently_are_not_counted(self):
+        # подписка, появившаяся в обход follow_pairs, как из параллельного
+        # запроса: без сигналов и счётчиков
+        Follow.objects.bulk_create([Follow(user=self.reader,
+                                           author=self.authors[0])])
+
+        self.assertEqual(follows.follow_pairs(
+            [(self.reader.id, self.authors[0].id)]), [])
+        response = self.send("post", [self.authors[0].username])
+
+        self.assertEqual(response.json()["followed"], [])
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.follower_count, 0)
+
+    def test_query_count_does_not_grow_with_authors(self):
+        def queries(authors):
+            with CaptureQueriesContext(connection) as captured:
+                self.send("post", [author.username for author in authors])
+            return len(captured)
+
+        self.assertEqual(queries(self.authors[:1]), queries(self.authors[1:]))
+
+    def test_unfollow_many(self):
+        self.send("post", [author.username for author in self.authors[:3]])
+        names = [author.username for author in self.authors[:2]]
+
+        response = self.send("delete", names)
+
+        self.assertEqual(response.json(), {"unfollowed": names,
+                                           "unknown": []})
+        self.assertEqual(list(Follow.objects.filter(user=self.reader)
+                              .values_list("author__username", flat=True)),
+                         [self.authors[2].username])
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, author__in=self.authors[:2]).exists())
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.follower_count, 1)
+
+    @override_settings(FOLLOW_BATCH_LIMIT=2)
+    def test_invalid_requests(self):
+        for usernames in ([], "Author0", [1], ["a", "b", "c"]):
+            with self.subTest(usernames=usernames):
+                self.assertEqual(self.send("post", usernames).status_code,
+                                 400)
+        self.assertEqual(Client().post(self.url).status_code, 401)
+
+    def test_form_encoded_request(self):
+        response = self.client.post(self.url, {"usernames": ["Author0"]})
+
+        self.assertEqual(response.json()["followed"], ["Author0"])
+
+    def test_command(self):
+        out = StringIO()
+        call_command("follow_authors", "Reader", "Author0", "Author1",
+                     "Nobody", stdout=out)
+
+        self.assertIn("Новых подписок: 2", out.getvalue())
+        self.assertIn("Nobody", out.getvalue())
+        call_command("follow_authors", "Reader", "Author0", unfollow=True,
+                     stdout=out)
+        self.assertEqual(
+            list(follows.resolve(["Author1"]).values()),
+            list(Follow.objects.filter(user=self.reader)
+                 .values_list("author_id", flat=True)),
+        )
@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.models import Post
+
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def make_jpeg(size=(400, 200), orientation=None):
+    image = Image.new("RGB", size, color=(200, 30, 30))
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif.tobytes())
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue(), "image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_MAX_SIDE=100,
+                   IMAGE_FORMAT="WEBP")
+class ImageNormalizationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="TestTestov")
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def clean(self, upload):
+        form = PostForm(data={"text": "Запись"}, files={"image": upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.cleaned_data["image"]
+
+    def test_image_is_downscaled_and_reencoded(self):
+        image = Image.open(self.clean(make_jpeg()))
+
+        self.assertEqual(image.format, "WEBP")
+        self.assertEqual(image.size, (100, 50))
+
+    def test_exif_orientation_is_applied_and_stripped(self):
+        upload = self.clean(make_jpeg(orientation=6))
+        image = Image.open(upload)
+
+        self.assertEqual(image.size, (50, 100))
+        self.assertNotIn(ORIENTATION, image.getexif())
+
+    @override_settings(IMAGE_FORMAT="JPEG")
+    def test_jpeg_fallback(self):
+        upload = self.clean(make_jpeg())
+
+        self.assertTrue(upload.name.endswith(".jpg"))
+        self.assertEqual(Image.open(upload).format, "JPEG")
+
+    @override_settings(IMAGE_MAX_PIXELS=10_000)
+    def test_oversized_image_is_rejected(self):
+        form = PostForm(data={"text": "Запись"},
+                        files={"image": make_jpeg(size=(200, 100))})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("image", form.errors)
+
+    def test_new_post_stores_normalized_image(self):
+        self.authorized_client.post(
+            reverse("new_post"),
+            data={"text": "Запись с фото", "image": make_jpeg()},
+        )
+
+        post = Post.objects.get(text="Запись с фото")
+        self.assertTrue(post.image.name.endswith(".webp"))
+        self.assertEqual((post.image.width, post.image.height), (100, 50))
@@ -0,0 +1,13 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class FeedIndexesTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        out = StringIO()
+
+        call_command("explain_feeds", stdout=out)
+
+        self.assertNotIn("FAIL", out.getvalue())
@@ -0,0 +1,162 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import jobs
+from posts.models import Follow, Job, Post, TimelineEntry
+
+User = get_user_model()
+calls = []
+
+
+@jobs.task("test-single")
+def single(value):
+    if value == "плохое":
+        raise ValueError(value)
+    calls.append(value)
+
+
+@jobs.task("test-batch", batch=True)
+def batch(payloads):
+    values = [payload["value"] for payload in payloads]
+    if "плохое" in values:
+        raise ValueError(values)
+    calls.append(values)
+
+
+@jobs.task("test-enqueue-again")
+def enqueue_again(value):
+    # изменение во время выполнения ставит задачу с тем же ключом
+    jobs.enqueue("test-single", key="again", value=value)
+
+
+@override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_DELAY=10)
+class JobQueueTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_is_stored_and_run_by_worker(self):
+        jobs.enqueue("test-single", value="значение")
+
+        self.assertEqual(calls, [])
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ["значение"])
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_is_rolled_back_with_the_change(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            jobs.enqueue("test-single", value="значение")
+            raise ValueError
+
+        self.assertFalse(Job.objects.exists())
+
+    def test_post_is_rolled_back_when_its_jobs_are_not_stored(self):
+        author = User.objects.create_user(username="Author")
+        client = Client()
+        client.force_login(author)
+
+        with mock.patch.object(Job.objects, "bulk_create",
+                               side_effect=DatabaseError("сбой")):
+            with self.assertRaises(DatabaseError):
+                client.post(reverse("new_post"), {"text": "Запись"})
+
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_job_runs_inline(self):
+        jobs.enqueue("test-single", value="значение")
+
+        self.assertEqual(calls, ["значение"])
+        self.assertFalse(Job.objects.exists())
+
+    def test_same_key_is_enqueued_once(self):
+        jobs.enqueue("test-single", key="ключ", value="первое")
+        jobs.enqueue("test-single", key="ключ", value="второе")
+
+        jobs.run_pending()
+        self.assertEqual(calls, ["первое"])
+
+    def test_claimed_job_frees_its_key(self):
+        jobs.enqueue("test-enqueue-again", key="again", value="новое")
+
+        jobs.run_pending()
+        self.assertEqual(Job.objects.filter(key="again").count(), 1)
+        jobs.run_pending()
+        self.assertEqual(calls, ["новое"])
+
+    def test_batch_task_gets_all_payloads(self):
+        for value in ("а", "б", "в"):
+            jobs.enqueue("test-batch", value=value)
+        jobs.enqueue("test-single", value="г")
+
+        self.assertEqual(jobs.run_pending(), 3)
+        self.assertEqual(calls, [["а", "б", "в"]])
+        jobs.run_pending()
+        self.assertEqual(calls[-1], "г")
+
+    def test_failed_batch_is_retried_job_by_job(self):
+        for value in ("а", "плохое", "б"):
+            jobs.enqueue("test-batch", value=value)
+
+        jobs.run_pending()
+
+        self.assertEqual(calls, [["а"], ["б"]])
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("ValueError", job.error)
+
+    def test_failed_job_is_retried_with_backoff_then_given_up(self):
+        jobs.enqueue("test-single", key="плохое", value="плохое")
+        jobs.run_pending()
+
+        job = Job.objects.get()
+        self.assertEqual(job.key, "плохое")
+        self.assertGreater(job.run_at,
+                           timezone.now() + timedelta(seconds=5))
+        self.assertEqual(jobs.run_pending(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertTrue(job.failed)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNone(job.key)
+        self.assertEqual(jobs.run_pending(), 0)
+
+        # упавшая задача не мешает поставить новую с тем же ключом
+        jobs.enqueue("test-single", key="плохое", value="хорошее")
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ["хорошее"])
+
+    def test_locked_job_is_taken_again_after_timeout(self):
+        jobs.enqueue("test-single", value="значение")
+        Job.objects.update(locked_until=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(jobs.run_pending(), 0)
+
+        Job.objects.update(locked_until=timezone.now())
+        self.assertEqual(jobs.run_pending(), 1)
+
+    def test_post_side_effects_wait_for_worker(self):
+        author = User.objects.create_user(username="Author")
+        reader = User.objects.create_user(username="Reader")
+        Follow.objects.create(user=reader, author=author)
+        call_command("run_jobs", once=True, stdout=StringIO())
+
+        post = Post.objects.create(text="Запись", author=author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(set(Job.objects.values_list("name", flat=True)),
+                         {"search-index", "timeline-fan-out"})
+
+        out = StringIO()
+        call_command("run_jobs", once=True, stdout=out)
+        self.assertIn("Задач выполнено: 2", out.getvalue())
+        self.assertTrue(TimelineEntry.objects.filter(user=reader,
+                                                     post=post).exists())
@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import metrics, parallel
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+def sample(name):
+    """Значение строки метрики name из выдачи /metrics/."""
+    for line in metrics.expose().splitlines():
+        if line.startswith(f"{name} "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="TestTestov")
+        Post.objects.create(text="Текст записи", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = Client()
+
+    def test_request_is_recorded_per_view(self):
+        self.client.get(reverse("index"))
+        self.client.get(reverse("index"))
+
+        self.assertEqual(
+            sample('yatube_request_duration_seconds_count{view="index"}'), 2
+        )
+        self.assertEqual(
+            sample('yatube_request_duration_seconds_bucket'
+                   '{view="index",le="+Inf"}'), 2
+        )
+        self.assertGreater(
+            sample('yatube_request_queries_sum{view="index"}'), 0
+        )
+        self.assertGreater(
+            sample('yatube_request_template_duration_seconds_sum'
+                   '{view="index"}'), 0
+        )
+
+    def test_cache_hits_and_misses(self):
+        self.client.get(reverse("index"))
+        self.client.get(reverse("index"))
+
+        self.assertEqual(
+            sample('yatube_cache_hits_total{view="index",cache="page"}'), 1
+        )
+        self.assertEqual(
+            sample('yatube_cache_misses_total{view="index",cache="page"}'), 1
+        )
+
+    @override_settings(VIEW_QUERY_WORKERS=4)
+    def test_pool_threads_report_to_request(self):
+        stats = metrics.RequestStats()
+
+        def hit():
+            metrics.record_cache("feed", True)
+
+        with mock.patch.object(parallel, "_can_use_pool", return_value=True):
+            with metrics.collecting(stats):
+                parallel.gather(hit, hit, hit)
+
+        self.assertEqual(stats.cache_hits, {"feed": 3})
+
+    def test_outer_stats_get_request_once(self):
+        stats = metrics.RequestStats()
+
+        with metrics.collecting(stats):
+            self.client.get(reverse("index"))
+
+        self.assertGreater(stats.queries, 0)
+        self.assertEqual(
+            sample('yatube_request_queries_sum{view="index"}'), stats.queries
+        )
+
+    def test_unresolved_path(self):
+        self.client.get("/no/such/page/here/")
+
+        self.assertEqual(
+            sample('yatube_request_duration_seconds_count'
+                   '{view="<unresolved>"}'), 1
+        )
+
+    @override_settings(METRICS_QUERY_BUDGET=0)
+    def test_warns_over_budget(self):
+        with self.assertLogs("posts.metrics", "WARNING") as logs:
+            self.client.get(reverse("index"))
+
+        self.assertIn("/", logs.output[0])
+        self.assertIn("index", logs.output[0])
+
+    def test_endpoint(self):
+        self.client.get(reverse("index"))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn("# TYPE yatube_request_duration_seconds histogram",
+                      response.content.decode())
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_endpoint_is_hidden_from_other_addresses(self):
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class HistogramTests(TestCase):
+    def test_buckets_are_cumulative(self):
+        histogram = metrics.Histogram("h", "Тест.", buckets=(1, 5),
+                                      labels=("view",))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value, 'a"b')
+
+        self.assertEqual(list(histogram.samples()), [
+            ('h_bucket{view="a\\"b",le="1"}', 2),
+            ('h_bucket{view="a\\"b",le="5"}', 3),
+            ('h_bucket{view="a\\"b",le="+Inf"}', 4),
+            ('h_sum{view="a\\"b"}', 14.5),
+            ('h_count{view="a\\"b"}', 4),
+        ])
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.page_cache import page_key
+from posts.models import Comment, Group, Post
+
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="Author")
+        cls.group = Group.objects.create(title="Группа номер 1",
+                                         slug="test_group")
+        cls.post = Post.objects.create(text="Запись", author=cls.author,
+                                       group=cls.group)
+        cls.urls = (
+            reverse("index"),
+            reverse("group_posts", kwargs={"slug": cls.group.slug}),
+            reverse("profile", kwargs={"username": cls.author.username}),
+            reverse("post", kwargs={"username": cls.author.username,
+                                    "post_id": cls.post.id}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(AnonymousPageCacheTests.author)
+
+    def test_second_hit_runs_no_queries(self):
+        for url in AnonymousPageCacheTests.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertEqual(first.content, second.content)
+                self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_conditional_get_returns_304(self):
+        for url in AnonymousPageCacheTests.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                self.assertIn("Last-Modified", first)
+
+                by_etag = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=first["ETag"])
+                by_date = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+
+                self.assertEqual(by_etag.status_code, 304)
+                self.assertEqual(by_date.status_code, 304)
+                self.assertEqual(by_etag.content, b"")
+
+    def test_conditional_get_on_miss_skips_rendering(self):
+        url = AnonymousPageCacheTests.urls[0]
+        etag = self.guest_client.get(url)["ETag"]
+        cache.delete(page_key(url, ["all"]))
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+
+    def test_writes_invalidate_pages(self):
+        for url in AnonymousPageCacheTests.urls:
+            self.guest_client.get(url)
+
+        Comment.objects.create(text="Новый комментарий", author=self.author,
+                               post=self.post)
+
+        for url in AnonymousPageCacheTests.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIsNotNone(response.context)
+
+    def test_logged_in_users_bypass_cache(self):
+        url = AnonymousPageCacheTests.urls[0]
+        self.guest_client.get(url)
+
+        response = self.authorized_client.get(url)
+
+        self.assertIsNotNone(response.context)
+        self.assertNotIn("ETag", response)
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.pagination import decode_cursor, encode_cursor
+
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=True)
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="TestTestov")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(title="Группа номер 1",
+                                         slug="test_group")
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.posts = [
+            Post.objects.create(text=f"Номер {i}", author=cls.user,
+                                group=cls.group)
+            for i in range(23)
+        ]
+        cls.urls = (
+            reverse("index"),
+            reverse("group_posts", kwargs={"slug": cls.group.slug}),
+            reverse("profile", kwargs={"username": cls.user.username}),
+            reverse("follow_index"),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = Client()
+        self.client.force_login(CursorPaginationTests.reader)
+
+    def walk(self, url):
+        seen = []
+        page = self.client.get(url).context.get("page")
+        seen.extend(page)
+        while page.has_next():
+            response = self.client.get(f"{url}?after={page.next_cursor}")
+            page = response.context.get("page")
+            seen.extend(page)
+        return page, seen
+
+    def test_cursor_walks_every_post_once(self):
+        expected = list(reversed(CursorPaginationTests.posts))
+        for url in CursorPaginationTests.urls:
+            with self.subTest(url=url):
+                page, seen = self.walk(url)
+                self.assertEqual(seen, expected)
+                self.assertEqual(len(page), 3)
+
+    def test_before_returns_newer_page(self):
+        expected = list(reversed(CursorPaginationTests.posts))
+        for url in CursorPaginationTests.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context.get("page")
+                second = self.client.get(
+                    f"{url}?after={first.next_cursor}").context.get("page")
+                back = self.client.get(
+                    f"{url}?before={second.previous_cursor}"
+                ).context.get("page")
+
+                self.assertEqual(list(second), expected[10:20])
+                self.assertEqual(list(back), expected[:10])
+                self.assertFalse(back.has_previous())
+
+    def test_cursor_page_skips_count(self):
+        url = CursorPaginationTests.urls[0]
+        first = self.client.get(url).context.get("page")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f"{url}?after={first.next_cursor}")
+
+        for query in queries.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+            self.assertNotIn("OFFSET", query["sql"])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse("index") + "?after=garbage")
+        page = response.context.get("page")
+
+        self.assertEqual(page[0], CursorPaginationTests.posts[-1])
+
+    def test_cursor_round_trip(self):
+        post = CursorPaginationTests.posts[0]
+
+        self.assertEqual(decode_cursor(encode_cursor(post)),
+                         (post.pub_date, post.id))
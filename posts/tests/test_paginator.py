@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Post
+from posts.pagination import cached_count, page_window
 
 
 class PaginatorViewsTest(TestCase):
@@ -35,3 +39,64 @@ class PaginatorViewsTest(TestCase):
         for url in PaginatorViewsTest.urls:
             response = self.client.get(url + "?page=2")
             self.assertEqual(len(response.context.get("page").object_list), 3)
+
+
+class CachedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="Author")
+        Post.objects.bulk_create(
+            Post(text=f"Номер {i}", author=cls.user) for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("index"))
+        return sum("COUNT(" in query["sql"]
+                   for query in queries.captured_queries)
+
+    def test_count_is_cached(self):
+        self.assertEqual(self.count_queries(), 1)
+        self.assertEqual(self.count_queries(), 0)
+
+    def test_new_post_resets_feed_count(self):
+        self.client.get(reverse("index"))
+        Post.objects.create(text="Новая", author=self.user)
+
+        paginator = self.client.get(reverse("index")).context["paginator"]
+        self.assertEqual(paginator.count, 26)
+
+    def test_count_without_scopes_is_refreshed_by_timeout(self):
+        posts = Post.objects.filter(author=self.user)
+        self.assertEqual(cached_count(posts), 25)
+        Post.objects.create(text="Новая", author=self.user)
+
+        self.assertEqual(cached_count(posts), 25)
+        cache.clear()
+        self.assertEqual(cached_count(posts), 26)
+
+    def test_template_renders_only_window(self):
+        Post.objects.bulk_create(
+            Post(text=f"Номер {i}", author=self.user) for i in range(200)
+        )
+        response = self.client.get(reverse("index") + "?page=10")
+
+        self.assertContains(response, 'href="?page=23"')
+        self.assertContains(response, 'href="?page=12"')
+        self.assertNotContains(response, 'href="?page=13"')
+        self.assertNotContains(response, 'href="?page=5"')
+
+
+class PageWindowTests(SimpleTestCase):
+    def test_short_range_has_no_gaps(self):
+        self.assertEqual(page_window(1, 1), [1])
+        self.assertEqual(page_window(4, 7), [1, 2, 3, 4, 5, 6, 7])
+
+    def test_window_around_current_page(self):
+        self.assertEqual(page_window(50, 100),
+                         [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(page_window(1, 100), [1, 2, 3, None, 100])
+        self.assertEqual(page_window(99, 100), [1, None, 97, 98, 99, 100])
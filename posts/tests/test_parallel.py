@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import parallel
+
+
+class GatherTests(TestCase):
+    @override_settings(VIEW_QUERY_WORKERS=4)
+    def test_results_keep_order_across_threads(self):
+        threads = []
+
+        def call(value):
+            def run():
+                threads.append(threading.get_ident())
+                return value
+            return run
+
+        with mock.patch.object(parallel, "_can_use_pool", return_value=True):
+            results = parallel.gather(call(1), call(2), call(3))
+
+        self.assertEqual(results, [1, 2, 3])
+        self.assertGreater(len(set(threads)), 1)
+
+    @override_settings(VIEW_QUERY_WORKERS=4)
+    def test_errors_are_raised_in_request_thread(self):
+        def fail():
+            raise LookupError("нет такой записи")
+
+        with mock.patch.object(parallel, "_can_use_pool", return_value=True):
+            with self.assertRaises(LookupError):
+                parallel.gather(lambda: 1, fail)
+
+    def test_runs_inline_by_default(self):
+        self.assertFalse(parallel._can_use_pool())
+
+    def test_runs_inline_inside_transaction(self):
+        threads = set()
+
+        def call():
+            threads.add(threading.get_ident())
+
+        with transaction.atomic():
+            self.assertFalse(parallel._can_use_pool())
+            parallel.gather(call, call, call)
+
+        self.assertEqual(threads, {threading.get_ident()})
+
+
+class AsgiTests(SimpleTestCase):
+    def test_application_serves_requests(self):
+        from asgiref.testing import ApplicationCommunicator
+
+        from yatube.asgi import application
+
+        async def request():
+            communicator = ApplicationCommunicator(application, {
+                "type": "http",
+                "http_version": "1.1",
+                "method": "GET",
+                "path": reverse("about:author"),
+                "root_path": "",
+                "query_string": b"",
+                "headers": [(b"host", b"testserver")],
+            })
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(timeout=5)
+            await communicator.receive_output(timeout=5)
+            return start
+
+        start = asyncio.run(request())
+        self.assertEqual(start["status"], 200)
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import feed_cache, jobs
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="Author")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.posts = [Post.objects.create(text=f"Запись {i}", author=cls.author)
+                     for i in range(11)]
+
+    def setUp(self):
+        cache.clear()
+
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(PostCardCacheTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(PostCardCacheTests.reader)
+
+    def test_page_fragments_vary_on_page_number(self):
+        url = reverse("index")
+        self.guest_client.get(url)
+
+        response = self.guest_client.get(url + "?page=2")
+
+        self.assertContains(response, "Запись 0")
+        self.assertNotContains(response, "Запись 10")
+
+    def test_edit_button_is_not_shared_between_viewers(self):
+        url = reverse("index")
+        edit_url = reverse("post_edit", kwargs={
+            "username": self.author.username,
+            "post_id": self.posts[-1].id,
+        })
+
+        self.assertContains(self.author_client.get(url), edit_url)
+        self.assertNotContains(self.guest_client.get(url), edit_url)
+        self.assertNotContains(self.reader_client.get(url), edit_url)
+        self.assertContains(self.author_client.get(url), edit_url)
+
+    def test_cached_fragment_skips_post_queries(self):
+        Follow.objects.create(user=self.author, author=self.reader)
+        Post.objects.create(text="Запись читателя", author=self.reader)
+        jobs.run_ready()
+        edit_url = reverse("post_edit", kwargs={
+            "username": self.author.username,
+            "post_id": self.posts[-1].id,
+        })
+        pages = {reverse("index"): [edit_url, "Следующая"],
+                 reverse("follow_index"): ["Запись читателя"]}
+        for url, expected in pages.items():
+            with self.subTest(url=url):
+                self.author_client.get(url)
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.author_client.get(url)
+                self.assertFalse([query["sql"] for query in queries
+                                  if '"posts_post"' in query["sql"]])
+                for text in expected:
+                    self.assertContains(response, text)
+
+    def test_card_key_follows_displayed_fields(self):
+        post = Post.objects.get(id=self.posts[0].id)
+        key = feed_cache.card_key(post)
+
+        post.comment_count += 1
+        self.assertNotEqual(feed_cache.card_key(post), key)
+        post.comment_count -= 1
+        self.assertEqual(feed_cache.card_key(post), key)
+
+    def test_card_is_cached_for_all_viewers(self):
+        url = reverse("index")
+        self.guest_client.get(url)
+        key = feed_cache.card_key(Post.objects.get(id=self.posts[-1].id))
+
+        self.assertIn("Запись 10", cache.get(key))
+        self.assertNotIn("Редактировать", cache.get(key))
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import api_urls, counters, jobs, urls
+from posts.models import Comment, Follow, Group, Post
+
+from . import budgets
+
+User = get_user_model()
+# записей на странице и в каждом объёме данных: одна запись, полная
+# страница по умолчанию (10 записей) и полная страница бюджета
+PER_PAGE = 100
+SIZES = {"small": 1, "page": 10, "large": PER_PAGE}
+
+
+@override_settings(POSTS_PER_PAGE=PER_PAGE)
+class QueryBudgetTests(budgets.QueryBudgetMixin, TestCase):
+    """Каждый URL приложения укладывается в бюджет запросов, и число
+    запросов не зависит от числа записей и комментариев на странице."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="Author")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.other = User.objects.create_user(username="Other")
+        cls.group = Group.objects.create(title="Группа", slug="budget")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(text="Запись 0", author=cls.author,
+                                       group=cls.group)
+        Comment.objects.create(text="Комментарий", author=cls.reader,
+                               post=cls.post)
+        cls.own_post = Post.objects.create(text="Своя запись",
+                                           author=cls.reader)
+        for user in (cls.author, cls.reader, cls.other):
+            counters.recount(user.id)
+        jobs.run_ready()
+
+    def setUp(self):
+        self.viewers = {"guest": Client(), "user": Client()}
+        self.viewers["user"].force_login(self.reader)
+
+    def grow(self, size):
+        """Доводит число записей автора и комментариев записи до size."""
+        for i in range(Post.objects.filter(author=self.author).count(),
+                       size):
+            post = Post.objects.create(text=f"Запись {i}", author=self.author,
+                                       group=self.group)
+            Comment.objects.create(text="Комментарий", author=self.reader,
+                                   post=post)
+            Comment.objects.create(text=f"Комментарий {i}",
+                                   author=self.other, post=self.post)
+        jobs.run_ready()
+
+    def targets(self):
+        """Имя URL → (метод, аргументы пути, данные запроса)."""
+        author = {"username": self.author.username}
+        post = {**author, "post_id": self.post.id}
+        own_post = {"username": self.reader.username,
+                    "post_id": self.own_post.id}
+        comment = {"text": "Новый комментарий"}
+        return {
+            "index": ("get", {}, None),
+            "group_posts": ("get", {"slug": self.group.slug}, None),
+            "new_post": ("get", {}, None),
+            "follow_index": ("get", {}, None),
+            "search": ("get", {}, {"q": "запись"}),
+            "profile_follow": ("get", {"username": self.other.username},
+                               None),
+            "profile_unfollow": ("get", author, None),
+            "profile": ("get", author, None),
+            "post": ("get", post, None),
+            "post_edit": ("get", own_post, None),
+            "add_comment": ("post", post, comment),
+            "api:index": ("get", {}, None),
+            "api:group_posts": ("get", {"slug": self.group.slug}, None),
+            "api:follow_index": ("get", {}, None),
+            "api:profile": ("get", author, None),
+            "api:follow": ("post", {"username": self.other.username}, None),
+            "api:follow_many": ("post", {},
+                                {"usernames": [self.other.username,
+                                               self.author.username]}),
+            "api:post": ("get", post, None),
+            "api:add_comment": ("post", post, comment),
+        }
+
+    def measure(self):
+        counts = {}
+        for name, (method, kwargs, data) in self.targets().items():
+            url = reverse(name, kwargs=kwargs)
+            for viewer, client in self.viewers.items():
+                cache.clear()
+                counts[name, viewer] = budgets.count_queries(
+                    lambda: getattr(client, method)(url, data)
+                )
+        return counts
+
+    def test_every_url_has_target(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        names |= {f"api:{pattern.name}" for pattern in api_urls.urlpatterns}
+
+        self.assertEqual(names, set(self.targets()))
+
+    def test_budgets(self):
+        measured = {}
+        for size_name, size in SIZES.items():
+            self.grow(size)
+            for key, count in self.measure().items():
+                measured.setdefault(key, {})[size_name] = count
+
+        for (name, viewer), counts in measured.items():
+            with self.subTest(url=name, viewer=viewer):
+                self.assert_query_budget(name, viewer, counts)
@@ -0,0 +1,138 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+
+from benchmarks import stress
+from posts.models import AuthorStats, Post
+from yatube import replicas
+
+
+User = get_user_model()
+# не совпадает с "replica" из настроек при YATUBE_SQLITE_REPLICA=1
+REPLICA = "test_replica"
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False, model=Post, housekeeping=False):
+        """Прогоняет запрос через middleware; возвращает базу чтения."""
+        used = {}
+
+        def view(request):
+            if housekeeping:
+                with replicas.housekeeping():
+                    self.assertEqual(router.db_for_write(model), "default")
+            if write:
+                router.db_for_write(model)
+            used["read"] = router.db_for_read(model)
+            return HttpResponse()
+
+        response = replicas.PinPrimaryMiddleware(view)(request)
+        return used["read"], response
+
+    def test_request_reads_go_to_replica(self):
+        self.assertEqual(self.handle(self.factory.get("/"))[0], "replica")
+        self.assertEqual(router.db_for_write(Post), "default")
+
+    def test_reads_outside_request_go_to_primary(self):
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_sessions_are_read_from_primary(self):
+        read, _ = self.handle(self.factory.get("/"), model=Session)
+
+        self.assertEqual(read, "default")
+
+    def test_unsafe_methods_are_pinned(self):
+        read, response = self.handle(self.factory.post("/"))
+
+        self.assertEqual(read, "default")
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_write_pins_request_and_sets_cookie(self):
+        read, response = self.handle(self.factory.get("/"), write=True)
+
+        self.assertEqual(read, "default")
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_housekeeping_write_does_not_pin(self):
+        read, response = self.handle(self.factory.get("/"),
+                                     housekeeping=True)
+
+        self.assertEqual(read, "replica")
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_cookie_pins_until_it_expires(self):
+        request = self.factory.get("/")
+        request.COOKIES[replicas.PIN_COOKIE] = str(time.time() + 5)
+        self.assertEqual(self.handle(request)[0], "default")
+
+        request.COOKIES[replicas.PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.handle(request)[0], "replica")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_single_database(self):
+        read, response = self.handle(self.factory.get("/"), write=True)
+
+        self.assertEqual(read, "default")
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+
+class ReadYourWritesTests(TransactionTestCase):
+    """Основная база — тестовая, реплика — отдельный файл SQLite."""
+
+    def setUp(self):
+        database = stress.temporary_database("yatube.sqlite",
+                                             alias=REPLICA)
+        database.__enter__()
+        self.addCleanup(database.__exit__, None, None, None)
+        replicas_enabled = override_settings(DATABASE_REPLICAS=[REPLICA])
+        replicas_enabled.enable()
+        self.addCleanup(replicas_enabled.disable)
+        cache.clear()
+
+        self.user = User.objects.create_user(username="Writer")
+        self.reader = User.objects.create_user(username="Reader")
+        self.post = Post.objects.create(text="Запись", author=self.user)
+        replicas.sync(REPLICA)
+        self.url = reverse("post", kwargs={"username": "Writer",
+                                           "post_id": self.post.id})
+
+    def test_writer_sees_own_comment_before_replica_catches_up(self):
+        writer = Client()
+        writer.force_login(self.user)
+        writer.post(reverse("add_comment", kwargs={
+            "username": "Writer", "post_id": self.post.id,
+        }), {"text": "Свежий комментарий"})
+        self.assertIn(replicas.PIN_COOKIE, writer.cookies)
+
+        self.assertContains(writer.get(self.url), "Свежий комментарий")
+
+        stale = Client()
+        stale.force_login(self.reader)
+        self.assertNotContains(stale.get(self.url), "Свежий комментарий")
+
+        replicas.sync(REPLICA)
+        cache.clear()
+        self.assertContains(stale.get(self.url), "Свежий комментарий")
+
+    def test_counting_missing_stats_does_not_pin(self):
+        AuthorStats.objects.all().delete()
+        replicas.sync(REPLICA)
+        reader = Client()
+        reader.force_login(self.reader)
+
+        response = reader.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(replicas.PIN_COOKIE, reader.cookies)
+        self.assertTrue(AuthorStats.objects.filter(user=self.user).exists())
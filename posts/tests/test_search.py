@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post
+from posts.stemmer import stem
+
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_a_stem(self):
+        forms = (
+            ("книга", "книги", "книгой"),
+            ("красивая", "красивый", "красивые"),
+            ("читал", "читала", "читали"),
+        )
+        for words in forms:
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_non_cyrillic_words_are_kept(self):
+        self.assertEqual(stem("Django"), "django")
+        self.assertEqual(stem("2021"), "2021")
+        self.assertEqual(stem("Ёлки"), stem("елки"))
+
+
+@override_settings(JOBS_EAGER=True)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="TestTestov")
+        cls.other = User.objects.create_user(username="Other")
+        cls.group = Group.objects.create(title="Книги", slug="books")
+        cls.exact = Post.objects.create(
+            text="Книга про книги и ещё одна книга", author=cls.author,
+            group=cls.group)
+        cls.mention = Post.objects.create(
+            text="Вчера купил новую книгу", author=cls.other)
+        cls.unrelated = Post.objects.create(
+            text="Погода сегодня хорошая", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def find(self, **params):
+        response = self.client.get(reverse("search"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context["page"]
+
+    def test_finds_other_word_forms_ranked(self):
+        page = self.find(q="книгами")
+
+        self.assertEqual(list(page), [SearchTests.exact, SearchTests.mention])
+
+    def test_filters_by_group_and_author(self):
+        self.assertEqual(list(self.find(q="книга", group="books")),
+                         [SearchTests.exact])
+        self.assertEqual(list(self.find(q="книга", author="Other")),
+                         [SearchTests.mention])
+
+    def test_unknown_author_is_a_form_error(self):
+        response = self.client.get(reverse("search"),
+                                   {"q": "книга", "author": "Nobody"})
+
+        self.assertIsNone(response.context["page"])
+        self.assertTrue(response.context["form"].errors)
+
+    def test_query_syntax_is_not_passed_to_index(self):
+        self.assertEqual(list(self.find(q='("книга*')),
+                         [SearchTests.exact, SearchTests.mention])
+
+    def test_cursor_walks_all_results(self):
+        posts = [Post.objects.create(text=f"Заметка номер {i}",
+                                     author=SearchTests.author)
+                 for i in range(25)]
+
+        seen = []
+        page = search.search("заметки", per_page=10)
+        seen.extend(page)
+        while page.has_next():
+            page = search.search("заметки", after=page.next_cursor,
+                                 per_page=10)
+            seen.extend(page)
+
+        self.assertEqual(sorted(post.id for post in seen),
+                         [post.id for post in posts])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(text="Первый вариант",
+                                   author=SearchTests.author)
+        self.assertEqual(list(search.search("вариант")), [post])
+
+        post.text = "Исправленный текст"
+        post.save()
+        self.assertEqual(list(search.search("вариант")), [])
+        self.assertEqual(list(search.search("исправленные")), [post])
+
+        post.delete()
+        self.assertEqual(list(search.search("исправленные")), [])
+
+    def test_rebuild_restores_index(self):
+        Post.objects.filter(id=SearchTests.unrelated.id).update(
+            text="Книжный магазин")
+        call_command("rebuild_search_index", batch_size=2,
+                     stdout=StringIO())
+
+        self.assertEqual(list(search.search("магазин")),
+                         [SearchTests.unrelated])
+        self.assertEqual(list(search.search("погода")), [])
+
+    def test_search_uses_fts_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("План запроса проверяется только для SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"EXPLAIN QUERY PLAN SELECT rowid FROM {search.TABLE} "
+                f"WHERE {search.TABLE} MATCH 'книг'"
+            )
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+
+        self.assertIn("VIRTUAL TABLE", plan)
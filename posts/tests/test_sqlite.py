@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.test import SimpleTestCase
+
+from benchmarks import stress
+
+
+class SqliteBackendTests(SimpleTestCase):
+    def setUp(self):
+        database = stress.temporary_database("yatube.sqlite")
+        self.connection = database.__enter__()
+        self.addCleanup(database.__exit__, None, None, None)
+        with self.connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("temp_store"), 2)
+        self.assertGreater(self.pragma("mmap_size"), 0)
+
+    def test_reads_outside_transaction_use_read_connection(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM item")
+            self.assertIs(cursor.cursor.active, cursor.cursor.reader)
+            cursor.execute("INSERT INTO item (id) VALUES (1)")
+            self.assertIs(cursor.cursor.active, cursor.cursor.writer)
+
+    def test_transaction_reads_its_own_writes(self):
+        with transaction.atomic(using=stress.ALIAS):
+            with self.connection.cursor() as cursor:
+                cursor.execute("INSERT INTO item (id) VALUES (1)")
+                cursor.execute("SELECT COUNT(*) FROM item")
+                self.assertEqual(cursor.fetchone()[0], 1)
+
+            other = self.connection.read_connection()
+            count = other.execute("SELECT COUNT(*) FROM item").fetchone()[0]
+            self.assertEqual(count, 0)
+
+
+class SqliteStressTests(SimpleTestCase):
+    def test_no_lock_errors_under_concurrent_writes(self):
+        result = stress.run("yatube.sqlite", threads=8, operations=60,
+                            write_every=3, timeout=5)
+
+        self.assertEqual(result["errors"], 0)
+        self.assertEqual(result["rows"], 8 * 20)
+        self.assertTrue(result["serialized"])
@@ -0,0 +1,116 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import suggestions
+from posts.models import Comment, Follow, Group, Post, Suggestion
+
+User = get_user_model()
+
+
+class GraphTests(SimpleTestCase):
+    def test_rows_become_compressed_lists(self):
+        graph = suggestions.Graph(5, [(1, 3), (1, 4), (3, 1)])
+
+        self.assertEqual(list(graph[1]), [3, 4])
+        self.assertEqual(list(graph[2]), [])
+        self.assertEqual(graph.degree(3), 1)
+        self.assertEqual(list(graph[10]), [])
+        self.assertEqual(graph.columns.itemsize, 4)
+
+    def test_rows_past_size_are_skipped(self):
+        graph = suggestions.Graph(2, [(0, 1), (5, 0)])
+
+        self.assertEqual(list(graph.columns), [1])
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        names = ["reader", "friend1", "friend2", "popular", "niche",
+                 "member", "loner"]
+        cls.users = {name: User.objects.create_user(username=name)
+                     for name in names}
+        for user, author in [("reader", "friend1"), ("reader", "friend2"),
+                             ("friend1", "popular"), ("friend2", "popular"),
+                             ("friend2", "niche"), ("friend1", "reader")]:
+            Follow.objects.create(user=cls.users[user],
+                                  author=cls.users[author])
+        group = Group.objects.create(title="Группа", slug="group")
+        post = Post.objects.create(text="Запись", author=cls.users["member"],
+                                   group=group)
+        Comment.objects.create(text="Комментарий", post=post,
+                               author=cls.users["reader"])
+
+    def setUp(self):
+        cache.clear()
+
+    def build(self):
+        suggestions.build(chunk_size=3)
+        return {
+            suggestion.candidate.username: suggestion
+            for suggestion in Suggestion.objects.filter(
+                user=self.users["reader"]).select_related("candidate")
+            .order_by("rank")
+        }
+
+    def test_friends_of_friends_and_groups(self):
+        found = self.build()
+
+        self.assertEqual(list(found), ["popular", "niche", "member"])
+        self.assertEqual([s.rank for s in found.values()], [0, 1, 2])
+        self.assertEqual(found["popular"].mutual_count, 2)
+        self.assertEqual(found["member"].group_count, 1)
+        self.assertNotIn("friend1", found)
+        self.assertNotIn("reader", found)
+
+    def test_rebuild_replaces_old_rows(self):
+        self.build()
+        Follow.objects.filter(user=self.users["friend2"]).delete()
+
+        self.assertNotIn("niche", self.build())
+        self.assertFalse(Suggestion.objects.filter(
+            user=self.users["loner"]).exists())
+
+    @override_settings(SUGGESTIONS_MAX_WALK=1)
+    def test_walk_is_bounded(self):
+        # берётся только последняя подписка читателя и каждого друга
+        found = self.build()
+
+        self.assertIn("niche", found)
+        self.assertNotIn("popular", found)
+
+    def test_for_user_skips_new_follows(self):
+        self.build()
+        Follow.objects.create(user=self.users["reader"],
+                              author=self.users["popular"])
+
+        shown = suggestions.for_user(self.users["reader"].id)
+        self.assertEqual([s.candidate.username for s in shown],
+                         ["niche", "member"])
+
+    def test_follow_page_shows_own_suggestions(self):
+        self.build()
+        client = Client()
+        client.force_login(self.users["reader"])
+
+        response = client.get(reverse("follow_index"))
+        self.assertContains(response, 'href="/popular/"')
+        self.assertEqual(len(response.context["suggestions"]), 3)
+
+        # чужие рекомендации на странице автора не показываются
+        response = client.get(reverse("profile",
+                                      kwargs={"username": "friend2"}))
+        self.assertNotIn("suggestions", response.context)
+        self.assertNotContains(response, "Кого почитать")
+
+    def test_command(self):
+        out = StringIO()
+        call_command("build_suggestions", stdout=out)
+
+        self.assertIn("Рекомендаций:", out.getvalue())
+        self.assertTrue(Suggestion.objects.exists())
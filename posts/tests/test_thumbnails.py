@@ -0,0 +1,164 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from posts import jobs, thumbnails
+from posts.models import Job, Post
+
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def png(color):
+    out = BytesIO()
+    Image.new("RGB", (2, 1), color).save(out, "PNG")
+    return out.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="TestTestov")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+        self.guest_client = Client()
+
+    def create_post(self):
+        return Post.objects.create(
+            text="Запись с картинкой",
+            author=self.user,
+            image=SimpleUploadedFile("small.gif", SMALL_GIF, "image/gif"),
+        )
+
+    def test_posts_saved_outside_views_get_thumbnails(self):
+        post = self.create_post()
+
+        self.assertTrue(Job.objects.filter(
+            name="thumbnails", key=f"thumbnails:{post.id}").exists())
+        jobs.run_ready()
+        post.refresh_from_db()
+        self.assertIn("card", post.thumbnails)
+
+    def test_unused_variants_are_removed(self):
+        shared = self.create_post()
+        post = self.create_post()
+        jobs.run_ready()
+        post.refresh_from_db()
+        old = thumbnails._variant_names(post.thumbnails)
+
+        post.image = SimpleUploadedFile("red.png", png("red"), "image/png")
+        post.save()
+        jobs.run_ready()
+        post.refresh_from_db()
+        new = thumbnails._variant_names(post.thumbnails)
+
+        # старые размеры ещё выводит пост с той же картинкой
+        self.assertTrue(new and not new & old)
+        self.assertTrue(all(map(default_storage.exists, old)))
+        for deleted, names in ((shared, old), (post, new)):
+            Post.objects.filter(id=deleted.id).delete()
+            jobs.run_ready()
+            self.assertFalse(any(map(default_storage.exists, names)))
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        post = self.create_post()
+
+        response = self.guest_client.get(reverse("index"))
+
+        self.assertContains(response, 'class="card-img bg-light"')
+        self.assertNotContains(response, "<img")
+
+    def test_generate_stores_urls_and_sizes(self):
+        post = self.create_post()
+
+        thumbnails.generate(post.id)
+
+        post.refresh_from_db()
+        card = post.thumbnails["card"]
+        self.assertEqual((card["width"], card["height"]), (960, 339))
+        response = self.guest_client.get(reverse("index"))
+        self.assertContains(response, f'src="{card["url"]}"')
+
+    def test_width_ladder_is_content_hashed(self):
+        first = self.create_post()
+        second = self.create_post()
+
+        thumbnails.generate(first.id)
+        thumbnails.generate(second.id)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        srcset = first.thumbnails["card"]["srcset"]
+        self.assertEqual([variant["width"] for variant in srcset],
+                         [320, 640, 960])
+        self.assertEqual(srcset, second.thumbnails["card"]["srcset"])
+        self.assertTrue(all("/posts/variants/" in variant["url"]
+                            for variant in srcset))
+        response = self.guest_client.get(reverse("index"))
+        self.assertContains(response, f'{srcset[0]["url"]} 320w', count=2)
+        self.assertContains(response, 'sizes="')
+
+    def test_variants_are_served_as_immutable(self):
+        post = self.create_post()
+        thumbnails.generate(post.id)
+        post.refresh_from_db()
+        path = post.thumbnails["card"]["url"][len(settings.MEDIA_URL):]
+
+        response = thumbnails.serve_media(
+            RequestFactory().get("/"), path, document_root=MEDIA_ROOT)
+
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+    def test_templates_do_not_touch_sorl_on_render(self):
+        post = self.create_post()
+        thumbnails.generate(post.id)
+        url = reverse("post", kwargs={"username": self.user.username,
+                                      "post_id": post.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url)
+
+        for query in queries.captured_queries:
+            self.assertNotIn("thumbnail_kvstore", query["sql"])
+
+    def test_command_builds_missing_thumbnails(self):
+        post = self.create_post()
+        out = StringIO()
+
+        call_command("generate_thumbnails", stdout=out)
+
+        post.refresh_from_db()
+        self.assertIn("card", post.thumbnails)
+        self.assertIn("1", out.getvalue())
@@ -0,0 +1,103 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Job, Post, TimelineEntry
+
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=True)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.author = User.objects.create_user(username="Author")
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = Client()
+        self.client.force_login(TimelineTests.reader)
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text="Новая запись", author=self.author)
+
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(timeline.post_ids(self.reader), [post.id])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        posts = [Post.objects.create(text=f"Запись {i}", author=self.author)
+                 for i in range(3)]
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(timeline.post_ids(self.reader),
+                         [post.id for post in reversed(posts)])
+
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+        self.assertEqual(timeline.post_ids(self.reader), [])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_rebuild_fills_feeds_of_existing_follows(self):
+        # подписки и записи, сделанные до появления лент
+        other = User.objects.create_user(username="Other")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=other)
+        Follow.objects.create(user=other, author=self.author)
+        posts = [Post.objects.create(text=f"Запись {i}", author=author)
+                 for i, author in enumerate((self.author, other,
+                                             self.author))]
+        Job.objects.all().delete()
+        self.assertEqual(timeline.post_ids(self.reader), [])
+
+        out = StringIO()
+        call_command("rebuild_timelines", batch_size=1, stdout=out)
+
+        self.assertIn("Обработано подписок: 3", out.getvalue())
+        self.assertEqual(timeline.post_ids(self.reader),
+                         [post.id for post in reversed(posts)])
+        self.assertEqual(timeline.post_ids(other),
+                         [posts[2].id, posts[0].id])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_heavy_author_is_read_on_demand(self):
+        other = User.objects.create_user(username="Other")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+
+        post = Post.objects.create(text="Запись", author=self.author)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(timeline.post_ids(self.reader), [post.id])
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_is_bounded(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=f"Запись {i}", author=self.author)
+                 for i in range(4)]
+
+        self.assertEqual(timeline.post_ids(self.reader),
+                         [posts[3].id, posts[2].id])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2)
+
+    def test_follow_index_reads_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text="Запись", author=self.author)
+
+        response = self.client.get(reverse("follow_index"))
+
+        self.assertEqual(list(response.context.get("page")), [post])
+        self.assertEqual(response.context.get("paginator").count, 1)
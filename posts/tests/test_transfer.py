@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import counters, search, timeline, transfer
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=True)
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="TestTestov")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(title="Группа номер 1",
+                                         slug="test_group",
+                                         description="Описание, с запятой")
+        cls.posts = [
+            Post.objects.create(text=f"Запись номер {i}\nвторая строка",
+                                author=cls.author,
+                                group=cls.group if i % 2 else None)
+            for i in range(5)
+        ]
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text="Комментарий")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def export(self, fmt):
+        call_command("export_content", self.directory, format=fmt,
+                     stdout=StringIO())
+
+    def load(self, fmt, **options):
+        call_command("import_content", self.directory, format=fmt,
+                     stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return {
+            "groups": list(Group.objects.values_list(
+                "slug", "title", "description")),
+            "posts": list(Post.objects.order_by("id").values_list(
+                "id", "author__username", "group__slug", "pub_date", "text",
+                "comment_count")),
+            "comments": list(Comment.objects.values_list(
+                "id", "post_id", "author__username", "created", "text")),
+            "follows": list(Follow.objects.values_list(
+                "user__username", "author__username")),
+        }
+
+    def wipe(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.filter(username="Reader").delete()
+        AuthorStats.objects.all().delete()
+        counters.recount(TransferTests.author.id)
+
+    def test_round_trip(self):
+        for fmt in transfer.FORMATS:
+            with self.subTest(format=fmt):
+                before = self.snapshot()
+                self.export(fmt)
+                self.wipe()
+
+                self.load(fmt, create_authors=True)
+
+                self.assertEqual(self.snapshot(), before)
+                reader = User.objects.get(username="Reader")
+                self.assertFalse(reader.has_usable_password())
+                self.assertEqual(
+                    counters.stats_for(TransferTests.author).post_count, 5)
+                self.assertEqual(
+                    counters.stats_for(TransferTests.author).following_count,
+                    1)
+                self.assertEqual(len(timeline.entries(reader)), 5)
+                self.assertEqual(len(search.search("запись")), 5)
+
+    def test_unknown_authors_are_skipped_by_default(self):
+        self.export("jsonl")
+        self.wipe()
+
+        self.load("jsonl")
+
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+    def test_import_is_idempotent(self):
+        self.export("jsonl")
+        before = self.snapshot()
+
+        self.load("jsonl")
+
+        self.assertEqual(self.snapshot(), before)
+        stats = counters.stats_for(TransferTests.author)
+        self.assertEqual(stats.post_count, 5)
+        self.assertEqual(stats.following_count, 1)
+
+    def test_resumes_after_saved_batch(self):
+        self.export("jsonl")
+        self.wipe()
+        path = transfer.path_for(self.directory, "posts", "jsonl")
+        with open(f"{path}.progress", "w") as out:
+            json.dump({"records": 3}, out)
+
+        self.load("jsonl", kinds="groups,posts", batch_size=1)
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertFalse(os.path.exists(f"{path}.progress"))
+
+    def test_id_taken_by_other_row_is_reported(self):
+        self.export("jsonl")
+        clashed = TransferTests.posts[0]
+        Post.objects.filter(id=clashed.id).update(author=self.reader)
+        err = StringIO()
+
+        call_command("import_content", self.directory, stdout=StringIO(),
+                     stderr=err)
+
+        self.assertIn(f"posts: 1 id заняты другими строками и не "
+                      f"загружены: {clashed.id}", err.getvalue())
+        self.assertEqual(Post.objects.get(id=clashed.id).author,
+                         self.reader)
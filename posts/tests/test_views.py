@@ -16,7 +16,7 @@ MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
 
 
-@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_EAGER=True)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -157,19 +157,22 @@ class PostPagesTests(TestCase):
     def test_index_page_show_correct_context_with_cache(self):
         reverse_index = reverse('index')
         initial_response = self.authorized_client.get(reverse_index)
-        Post.objects.create(
-            text="new post cache",
-            author=PostPagesTests.user
+        Post.objects.filter(id=PostPagesTests.post.id).update(
+            text="changed without signals"
         )
         response_with_cache = self.authorized_client.get(reverse_index)
 
         self.assertHTMLEqual(str(initial_response.content),
                              str(response_with_cache.content))
-        cache.clear()
-        response_without_cache = self.authorized_client.get(reverse_index)
+        Post.objects.create(
+            text="new post cache",
+            author=PostPagesTests.user
+        )
+        response_after_write = self.authorized_client.get(reverse_index)
 
         self.assertHTMLNotEqual(str(initial_response.content),
-                                str(response_without_cache.content))
+                                str(response_after_write.content))
+        self.assertContains(response_after_write, "new post cache")
 
     def test_profile_follow(self):
         author = User.objects.create_user(username="SomeAuthor")
@@ -0,0 +1,149 @@
+"""Миниатюры картинок постов, подготовленные заранее.
+
+После сохранения поста с новой картинкой (сигнал post_save, откуда бы
+пост ни пришёл) все размеры из POST_THUMBNAIL_SIZES строит фоновая
+задача (см. jobs), а их адреса и размеры записываются в
+Post.thumbnail_data. Шаблоны только читают эти значения; пока миниатюра
+не готова, вместо неё выводится заглушка.
+
+Для каждого размера строится лесенка ширин для srcset. Файлы названы
+по хэшу содержимого, поэтому их можно кэшировать навсегда. Размеры
+заменённой или удалённой картинки удаляет та же задача, если на них не
+ссылается другой пост с такой же картинкой.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+from PIL import Image, ImageOps
+
+from . import feed_cache, jobs, metrics, timeline
+from .images import encode
+from .models import Post
+
+VARIANTS_DIR = "posts/variants/"
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _save_variant(image):
+    content, extension, _ = encode(image)
+    digest = hashlib.sha256(content).hexdigest()[:20]
+    name = f"{VARIANTS_DIR}{digest}.{extension}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return {"url": default_storage.url(name),
+            "width": image.width, "height": image.height}
+
+
+def build(image):
+    """Строит все размеры; ширины больше исходной берутся только до base."""
+    with image.open("rb"), Image.open(image) as source:
+        source.load()
+    thumbnails = {}
+    for name, size in settings.POST_THUMBNAIL_SIZES.items():
+        base_width, base_height = size["base"]
+        widths = [width for width in size["widths"]
+                  if width <= max(source.width, base_width)]
+        variants = [
+            _save_variant(ImageOps.fit(
+                source, (width, round(width * base_height / base_width)),
+                Image.LANCZOS,
+            ))
+            for width in widths
+        ]
+        default = max((variant for variant in variants
+                       if variant["width"] <= base_width),
+                      key=lambda variant: variant["width"])
+        thumbnails[name] = {**default, "srcset": variants,
+                            "sizes": size["sizes"]}
+    return thumbnails
+
+
+def _variant_names(thumbnails):
+    """Имена файлов всех размеров из Post.thumbnail_data."""
+    return {VARIANTS_DIR + variant["url"].rsplit("/", 1)[-1]
+            for size in thumbnails.values() for variant in size["srcset"]}
+
+
+def _remove_unused(names):
+    """Удаляет файлы размеров, на которые не ссылается ни один пост."""
+    names = set(names)
+    if not names:
+        return
+    query = Q()
+    for name in names:
+        query |= Q(thumbnail_data__contains=name[len(VARIANTS_DIR):])
+    for data in (Post.objects.filter(query)
+                 .values_list("thumbnail_data", flat=True).iterator()):
+        names -= _variant_names(json.loads(data))
+    for name in names:
+        default_storage.delete(name)
+
+
+@jobs.task("thumbnails")
+def generate(post_id, stale=()):
+    """Строит миниатюры поста и сбрасывает кэш лент, где он выводится.
+
+    stale — имена размеров прежней картинки, их файлы удаляются.
+    """
+    post = Post.objects.filter(id=post_id).first()
+    if post is None:
+        _remove_unused(stale)
+        return
+    thumbnails = {}
+    if post.image:
+        started = time.perf_counter()
+        thumbnails = build(post.image)
+        metrics.record_thumbnail(time.perf_counter() - started)
+    # update() без сигналов: пост не меняется, только его миниатюры
+    updated = Post.objects.filter(id=post_id, image=post.image.name).update(
+        thumbnail_data=json.dumps(thumbnails)
+    )
+    stale = set(stale)
+    if not updated:
+        # картинку успели заменить: эти размеры никому не нужны
+        stale |= _variant_names(thumbnails)
+    _remove_unused(stale)
+    feed_cache.bump(*feed_cache.post_scopes(post))
+    timeline.touch_followers(post.author_id)
+
+
+def schedule(post):
+    """Ставит построение миниатюр в очередь; прежние сразу не выводятся."""
+    stale = sorted(_variant_names(post.thumbnails))
+    if post.thumbnail_data != "{}":
+        post.thumbnail_data = "{}"
+        Post.objects.filter(id=post.id).update(thumbnail_data="{}")
+    jobs.enqueue("thumbnails", key=f"thumbnails:{post.id}", post_id=post.id,
+                 stale=stale)
+
+
+def schedule_many(posts):
+    """schedule() для новых постов, например после импорта."""
+    jobs.enqueue_many("thumbnails", [
+        (f"thumbnails:{post.id}", {"post_id": post.id})
+        for post in posts if post.image
+    ])
+
+
+def forget(post):
+    """Ставит в очередь удаление размеров удалённого поста."""
+    stale = sorted(_variant_names(post.thumbnails))
+    if stale:
+        jobs.enqueue("thumbnails", key=f"thumbnails:{post.id}",
+                     post_id=post.id, stale=stale)
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve с вечным кэшем для файлов по хэшу."""
+    response = serve(request, path, document_root, show_indexes)
+    if path.startswith(VARIANTS_DIR) and response.status_code == 200:
+        patch_cache_control(response, public=True,
+                            max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
@@ -0,0 +1,270 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост автора раскладывается по лентам его подписчиков в таблицу
+TimelineEntry, а в кэше хранится ограниченный список id последних постов
+ленты. Посты авторов, у которых подписчиков больше
+TIMELINE_FANOUT_LIMIT, по лентам не раскладываются и подмешиваются
+при чтении (fan-out on read), чтобы запись оставалась дешёвой.
+
+Кэш ленты версионируется поколением подписчика и поколениями
+«тяжёлых» авторов, на которых он подписан (см. feed_cache).
+
+Раскладка, дозаполнение ленты после подписки и сброс кэша лент после
+комментария выполняются фоновыми задачами (см. jobs); schedule_*
+ставят их в очередь. Ленты подписок, сделанных до появления таблицы,
+заполняет команда rebuild_timelines (backfill_all).
+"""
+from collections import defaultdict
+from heapq import merge
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from yatube.replicas import housekeeping
+
+from . import feed_cache, jobs
+from .models import Follow, Post, TimelineEntry
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def follower_scope(user_id):
+    return f"follower:{user_id}"
+
+
+def _followers(author_id):
+    """Id подписчиков автора или None, если их больше лимита."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    followers = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list("user_id", flat=True)[:limit + 1]
+    )
+    if len(followers) > limit:
+        return None
+    return followers
+
+
+def touch_followers(author_id):
+    """Сбрасывает кэш лент подписчиков автора."""
+    followers = _followers(author_id)
+    if followers:
+        feed_cache.bump(*map(follower_scope, followers))
+
+
+def _light_authors(author_ids):
+    """Авторы из списка, чьи посты раскладываются по лентам."""
+    heavy = set(
+        Follow.objects.filter(author_id__in=author_ids)
+        .values("author")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list("author", flat=True)
+    )
+    return set(author_ids) - heavy
+
+
+def fan_out_many(posts):
+    """Раскладывает посты по лентам подписчиков их авторов."""
+    followers = defaultdict(list)
+    light = _light_authors({post.author_id for post in posts})
+    for author_id, user_id in (Follow.objects.filter(author_id__in=light)
+                               .values_list("author_id", "user_id")):
+        followers[author_id].append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.id,
+                       author_id=post.author_id, pub_date=post.pub_date)
+         for post in posts for user_id in followers[post.author_id]),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    users = {user_id for ids in followers.values() for user_id in ids}
+    feed_cache.bump(*map(follower_scope, users))
+
+
+def backfill_many(follows):
+    """Дозаполняет ленты после подписок из пар (user_id, author_id).
+
+    На пользователя — один запрос: лента всё равно хранит только
+    TIMELINE_LENGTH последних постов всех авторов, на которых он подписан.
+    """
+    authors = defaultdict(set)
+    for user_id, author_id in follows:
+        authors[user_id].add(author_id)
+    light = _light_authors({author_id for author_ids in authors.values()
+                            for author_id in author_ids})
+    for user_id, author_ids in authors.items():
+        author_ids &= light
+        if not author_ids:
+            continue
+        posts = (Post.objects.filter(author_id__in=author_ids)
+                 .order_by("-pub_date")
+                 .values_list("id", "author_id", "pub_date")
+                 [:settings.TIMELINE_LENGTH])
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=post_id,
+                           author_id=author_id, pub_date=pub_date)
+             for post_id, author_id, pub_date in posts),
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+    feed_cache.bump(*map(follower_scope, authors))
+
+
+def backfill_all(batch_size=BACKFILL_BATCH_SIZE):
+    """backfill_many по всем подпискам пачками; возвращает число подписок.
+
+    Подписки одного пользователя попадают в одну пачку, чтобы его лента
+    собиралась одним запросом.
+    """
+    total = 0
+    batch = []
+    pairs = (Follow.objects.order_by("user_id", "author_id")
+             .values_list("user_id", "author_id")
+             .iterator(chunk_size=batch_size))
+    for pair in pairs:
+        if len(batch) >= batch_size and batch[-1][0] != pair[0]:
+            with transaction.atomic():
+                backfill_many(batch)
+            total += len(batch)
+            batch = []
+        batch.append(pair)
+    with transaction.atomic():
+        backfill_many(batch)
+    return total + len(batch)
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты пользователя посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 author_id=author_id).delete()
+    feed_cache.bump(follower_scope(user_id))
+
+
+@jobs.task("timeline-fan-out", batch=True)
+def _fan_out_job(payloads):
+    posts = list(Post.objects.filter(
+        id__in=[payload["post_id"] for payload in payloads]
+    ).only("id", "author_id", "pub_date"))
+    fan_out_many(posts)
+
+
+@jobs.task("timeline-backfill", batch=True)
+def _backfill_job(payloads):
+    pairs = {(payload["user_id"], payload["author_id"])
+             for payload in payloads}
+    # подписка могла быть отменена, пока задача ждала
+    followed = set(Follow.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        author_id__in={author_id for _, author_id in pairs},
+    ).values_list("user_id", "author_id"))
+    backfill_many(pairs & followed)
+
+
+@jobs.task("timeline-touch", batch=True)
+def _touch_job(payloads):
+    for author_id in {payload["author_id"] for payload in payloads}:
+        touch_followers(author_id)
+
+
+def schedule_fan_out(post):
+    jobs.enqueue("timeline-fan-out", key=f"fan-out:{post.id}",
+                 post_id=post.id)
+
+
+def schedule_backfill(user_id, author_id):
+    jobs.enqueue("timeline-backfill", key=f"backfill:{user_id}:{author_id}",
+                 user_id=user_id, author_id=author_id)
+
+
+def schedule_touch(author_id):
+    jobs.enqueue("timeline-touch", key=f"touch:{author_id}",
+                 author_id=author_id)
+
+
+def _heavy_followed(user):
+    followed = Follow.objects.filter(user=user).values("author")
+    return list(
+        Follow.objects.filter(author__in=followed)
+        .values("author")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list("author", flat=True)
+    )
+
+
+def _prefix(user):
+    # date_joined отличает пользователя от удалённого с тем же id
+    return f"{user.id}.{user.date_joined.timestamp()}"
+
+
+def _heavy(user):
+    scope = follower_scope(user.id)
+    return feed_cache.get_or_compute(
+        f"timeline-heavy:{_prefix(user)}.{feed_cache.version(scope)}",
+        lambda: _heavy_followed(user),
+        settings.TIMELINE_CACHE_TIMEOUT,
+    )
+
+
+def version(user):
+    """Версия ленты пользователя для ключей кэша."""
+    scopes = [follower_scope(user.id),
+              *(f"author:{author_id}" for author_id in _heavy(user))]
+    return f"{_prefix(user)}.{feed_cache.version(*scopes)}"
+
+
+def _load(user):
+    length = settings.TIMELINE_LENGTH
+    entries = list(
+        TimelineEntry.objects.filter(user=user)
+        .order_by("-pub_date", "-post_id")
+        .values_list("pub_date", "post_id")[:length]
+    )
+    if len(entries) == length:
+        # обрезка хвоста ленты не должна привязывать читателя к основной
+        # базе (см. yatube.replicas)
+        with housekeeping():
+            TimelineEntry.objects.filter(
+                user=user, pub_date__lt=entries[-1][0]
+            ).delete()
+
+    # по запросу на автора: с author IN (...) сортировка идёт мимо индекса
+    pulled = [
+        Post.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("pub_date", "id")[:length]
+        for author_id in _heavy(user)
+    ]
+    entries = merge(entries, *pulled, reverse=True)
+
+    keys, seen = [], set()
+    for pub_date, post_id in entries:
+        if post_id not in seen:
+            seen.add(post_id)
+            keys.append((pub_date, post_id))
+        if len(keys) == length:
+            break
+    return keys
+
+
+def entries(user, feed_version=None):
+    """Пары (pub_date, id) постов ленты пользователя, от новых к старым."""
+    if feed_version is None:
+        feed_version = version(user)
+    return feed_cache.get_or_compute(
+        f"timeline:{feed_version}",
+        lambda: _load(user),
+        settings.TIMELINE_CACHE_TIMEOUT,
+    )
+
+
+def post_ids(user):
+    return [post_id for _, post_id in entries(user)]
+
+
+def hydrate(keys):
+    ids = [post_id for _, post_id in keys]
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return [posts[post_id] for post_id in ids if post_id in posts]
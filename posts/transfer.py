@@ -0,0 +1,334 @@
+"""Потоковый импорт и экспорт сообществ, записей, комментариев и подписок.
+
+Каждый вид данных — отдельный файл <вид>.jsonl или <вид>.csv в одном
+каталоге. Авторы и сообщества указываются по username и slug, записи и
+комментарии сохраняют свои id, поэтому комментарии и подписки находят
+свои записи и пользователей в другой базе.
+
+Экспорт читает базу курсором (.iterator(chunk_size=...)), а импорт
+пишет пачками через bulk_create, так что память не растёт с размером
+данных. bulk_create не вызывает сигналы, поэтому счётчики, ленты
+подписок, поисковый индекс и поколения кэша обновляются здесь же,
+пачкой за пачкой. Строки, которые уже есть в базе, пропускаются: импорт
+можно просто запустить заново, а файл прогресса <файл>.progress
+позволяет не перечитывать уже загруженное начало файла. Запись или
+комментарий, чей id в базе занят другим автором или другой датой, не
+загружается и попадает в Importer.conflicts.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import (counters, feed_cache, follows, search, thumbnails,
+               timeline)
+from .models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+KINDS = ("groups", "posts", "comments", "follows")
+FORMATS = ("jsonl", "csv")
+FIELDS = {
+    "groups": ("slug", "title", "description"),
+    "posts": ("id", "author", "group", "pub_date", "text", "image"),
+    "comments": ("id", "post", "author", "created", "text"),
+    "follows": ("user", "author"),
+}
+BATCH_SIZE = 1000
+CHUNK_SIZE = 2000
+
+
+class TransferError(Exception):
+    pass
+
+
+def parse_kinds(value):
+    """Виды из строки через запятую в порядке загрузки KINDS."""
+    kinds = {kind.strip() for kind in value.split(",") if kind.strip()}
+    unknown = kinds - set(KINDS)
+    if unknown:
+        raise TransferError(
+            f"Неизвестные виды: {', '.join(sorted(unknown))}"
+        )
+    # сообщества раньше записей, записи раньше комментариев
+    return [kind for kind in KINDS if kind in kinds]
+
+
+def _exported_rows(kind):
+    querysets = {
+        "groups": Group.objects.values_list("slug", "title", "description"),
+        "posts": Post.objects.values_list(
+            "id", "author__username", "group__slug", "pub_date", "text",
+            "image",
+        ),
+        "comments": Comment.objects.values_list(
+            "id", "post_id", "author__username", "created", "text",
+        ),
+        "follows": Follow.objects.values_list("user__username",
+                                              "author__username"),
+    }
+    return querysets[kind].order_by("id")
+
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def path_for(directory, kind, fmt):
+    return os.path.join(directory, f"{kind}.{fmt}")
+
+
+def export(kind, path, fmt, chunk_size=CHUNK_SIZE):
+    """Пишет все строки вида в файл; возвращает их число."""
+    fields = FIELDS[kind]
+    rows = _exported_rows(kind).iterator(chunk_size=chunk_size)
+    total = 0
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        if fmt == "csv":
+            writer = csv.writer(out)
+            writer.writerow(fields)
+        for row in rows:
+            row = [_plain(value) for value in row]
+            if fmt == "csv":
+                writer.writerow(["" if value is None else value
+                                 for value in row])
+            else:
+                out.write(json.dumps(dict(zip(fields, row)),
+                                     ensure_ascii=False))
+                out.write("\n")
+            total += 1
+    return total
+
+
+def read(path, fmt):
+    """Записи файла как словари; пустые поля CSV становятся None."""
+    with open(path, encoding="utf-8", newline="") as source:
+        if fmt == "csv":
+            for record in csv.DictReader(source):
+                yield {key: value if value != "" else None
+                       for key, value in record.items()}
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _create_dated(model, objects, field):
+    """bulk_create с датами из файла в поле auto_now_add field.
+
+    bulk_create подставляет в такое поле текущее время, поэтому даты
+    возвращаются следом одним bulk_update. Раз id заданы явно,
+    последовательность id сдвигается за наибольший из них (в PostgreSQL
+    она сама не знает о вставленных id).
+    """
+    if not objects:
+        return
+    dates = [getattr(obj, field) for obj in objects]
+    model.objects.bulk_create(objects)
+    for obj, date in zip(objects, dates):
+        setattr(obj, field, date)
+    model.objects.bulk_update(objects, [field], batch_size=BATCH_SIZE)
+
+    connection = connections[router.db_for_write(model)]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+def _date(value):
+    date = parse_datetime(value or "")
+    if date is None:
+        raise TransferError(f"Некорректная дата: {value!r}")
+    return date
+
+
+class Importer:
+    """Загружает пачки записей одного вида и ведёт статистику."""
+
+    def __init__(self, create_authors=False):
+        self.create_authors = create_authors
+        self.users = dict(User.objects.values_list("username", "id"))
+        self.groups = dict(Group.objects.values_list("slug", "id"))
+        self.created = 0
+        self.skipped = 0
+        # (вид, id) строк, чей id в базе занят чужой строкой
+        self.conflicts = []
+
+    def _resolve_authors(self, usernames):
+        missing = {name for name in usernames
+                   if name and name not in self.users}
+        if missing and self.create_authors:
+            password = make_password(None)
+            User.objects.bulk_create(
+                (User(username=name, password=password)
+                 for name in sorted(missing)),
+                batch_size=BATCH_SIZE,
+            )
+            self.users.update(User.objects.filter(username__in=missing)
+                              .values_list("username", "id"))
+
+    def load(self, kind, records):
+        records = list(records)
+        loaders = {
+            "groups": self._groups,
+            "posts": self._posts,
+            "comments": self._comments,
+            "follows": self._follows,
+        }
+        conflicts = len(self.conflicts)
+        with transaction.atomic():
+            created = loaders[kind](records)
+        self.created += created
+        self.skipped += (len(records) - created
+                         - (len(self.conflicts) - conflicts))
+
+    def _new(self, kind, model, records, date_field):
+        """Записи, чьих id ещё нет в базе.
+
+        Строка с тем же id, автором и датой уже загружена прошлым
+        запуском; иначе id занят чужой строкой, и это конфликт.
+        """
+        ids = [int(record["id"]) for record in records]
+        existing = {
+            row[0]: row[1:] for row in model.objects.filter(id__in=ids)
+            .values_list("id", "author_id", date_field)
+        }
+        new = []
+        for record in records:
+            found = existing.get(int(record["id"]))
+            if found is None:
+                new.append(record)
+            elif found != (self.users.get(record["author"]),
+                           _date(record[date_field])):
+                self.conflicts.append((kind, int(record["id"])))
+        return new
+
+    def _groups(self, records):
+        new = {record["slug"]: record for record in records
+               if record["slug"] not in self.groups}
+        Group.objects.bulk_create(
+            Group(slug=slug, title=record["title"],
+                  description=record["description"] or "")
+            for slug, record in new.items()
+        )
+        self.groups.update(Group.objects.filter(slug__in=new)
+                           .values_list("slug", "id"))
+        feed_cache.bump(*(f"group:{self.groups[slug]}" for slug in new))
+        return len(new)
+
+    def _posts(self, records):
+        self._resolve_authors(record["author"] for record in records)
+        posts = [
+            Post(id=int(record["id"]), text=record["text"],
+                 author_id=self.users[record["author"]],
+                 group_id=self.groups.get(record["group"]),
+                 pub_date=_date(record["pub_date"]),
+                 image=record["image"] or None)
+            for record in self._new("posts", Post, records, "pub_date")
+            if record["author"] in self.users
+        ]
+        _create_dated(Post, posts, "pub_date")
+
+        counters.change_many("post_count",
+                             Counter(post.author_id for post in posts))
+        search.index_posts(posts)
+        thumbnails.schedule_many(posts)
+        timeline.fan_out_many(posts)
+        scopes = {"all"}
+        for post in posts:
+            scopes.update(feed_cache.post_scopes(post))
+        feed_cache.bump(*scopes)
+        return len(posts)
+
+    def _comments(self, records):
+        self._resolve_authors(record["author"] for record in records)
+        post_ids = {int(record["post"]) for record in records}
+        posts = {post.id: post for post in Post.objects.filter(
+            id__in=post_ids).only("id", "author_id", "group_id")}
+        comments = [
+            Comment(id=int(record["id"]), text=record["text"],
+                    post_id=int(record["post"]),
+                    author_id=self.users[record["author"]],
+                    created=_date(record["created"]))
+            for record in self._new("comments", Comment, records, "created")
+            if int(record["post"]) in posts
+            and record["author"] in self.users
+        ]
+        _create_dated(Comment, comments, "created")
+
+        per_post = Counter(comment.post_id for comment in comments)
+        scopes = set()
+        for post_id, count in per_post.items():
+            counters.change_comments(post_id, count)
+            scopes.update(feed_cache.post_scopes(posts[post_id]))
+        feed_cache.bump(*scopes)
+        for author_id in {posts[post_id].author_id for post_id in per_post}:
+            timeline.touch_followers(author_id)
+        return len(comments)
+
+    def _follows(self, records):
+        self._resolve_authors(name for record in records
+                              for name in (record["user"], record["author"]))
+        pairs = {
+            (self.users[record["user"]], self.users[record["author"]])
+            for record in records
+            if record["user"] in self.users
+            and record["author"] in self.users
+            and record["user"] != record["author"]
+        }
+        return len(follows.follow_pairs(pairs))
+
+
+def _progress_path(path):
+    return f"{path}.progress"
+
+
+def _read_progress(path):
+    try:
+        with open(_progress_path(path)) as source:
+            return json.load(source)["records"]
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def _write_progress(path, records):
+    # через временный файл: обрыв не оставит половину JSON
+    tmp = f"{_progress_path(path)}.tmp"
+    with open(tmp, "w") as out:
+        json.dump({"records": records}, out)
+    os.replace(tmp, _progress_path(path))
+
+
+def import_file(importer, kind, path, fmt, batch_size=BATCH_SIZE,
+                resume=True, report=None):
+    """Загружает файл пачками; возвращает число прочитанных записей.
+
+    report(records, per_second) вызывается после каждой пачки.
+    """
+    done = skipped = _read_progress(path) if resume else 0
+    records = read(path, fmt)
+    for _ in islice(records, skipped):
+        pass
+    started = time.monotonic()
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        importer.load(kind, batch)
+        done += len(batch)
+        _write_progress(path, done)
+        if report is not None:
+            elapsed = max(time.monotonic() - started, 1e-6)
+            report(done, (done - skipped) / elapsed)
+    if os.path.exists(_progress_path(path)):
+        os.remove(_progress_path(path))
+    return done
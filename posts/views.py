@@ -1,39 +1,88 @@
-from xxlimited import Null
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
 from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.db import transaction
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
 
-from .models import Post, Group, Follow
-from .forms import PostForm, CommentForm
+from .models import Comment, Post, Group, Follow
+from .forms import PostForm, CommentForm, SearchForm
+from . import (counters, feed_cache, parallel, search, suggestions,
+               timeline)
+from .page_cache import anonymous_page_cache, author_scopes, group_scopes
+from .pagination import paginate
 
 
 User = get_user_model()
 
 
+def _fetched(queryset):
+    """Выполняет запрос сразу, а не при выводе шаблона."""
+    len(queryset)
+    return queryset
+
+
+def _fetched_page(pagination):
+    paginator, page = pagination
+    page.object_list = _fetched(page.object_list)
+    return paginator, page
+
+
+def _following_check(user, username):
+    # request.user читается здесь, в потоке запроса
+    if not user.is_authenticated:
+        return lambda: False
+    return lambda: Follow.objects.filter(
+        user=user, author__username=username
+    ).exists()
+
+
+@anonymous_page_cache(lambda: ["all"])
 def index(request):
-    post_list = Post.objects.select_related("group", "author")
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(request, "index.html", {"page": page,
-                                          "paginator": paginator})
+    post_list = Post.objects.for_feed()
+    paginator, page = paginate(request, post_list, scopes=["all"])
+    return TemplateResponse(request, "index.html", {
+        "page": page,
+        "paginator": paginator,
+        "feed_version": feed_cache.version("all"),
+    })
 
 
+@anonymous_page_cache(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related("group", "author")
-
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(request, "group.html", {"group": group, "page": page,
-                                          "paginator": paginator})
+    post_list = Post.objects.for_feed().filter(group__slug=slug)
+    group, (paginator, page) = parallel.gather(
+        lambda: get_object_or_404(Group, slug=slug),
+        lambda: _fetched_page(paginate(request, post_list)),
+    )
+    return TemplateResponse(request, "group.html", {
+        "group": group,
+        "page": page,
+        "paginator": paginator,
+    })
+
+
+def search_posts(request):
+    form = SearchForm(request.GET or None)
+    page = None
+    if form.is_valid():
+        page = search.search(form.cleaned_data["q"],
+                             group=form.cleaned_data["group"],
+                             author=form.cleaned_data["author"],
+                             after=request.GET.get("after"))
+    params = request.GET.copy()
+    params.pop("after", None)
+    return render(request, "search.html", {
+        "form": form,
+        "page": page,
+        "query_string": params.urlencode(),
+    })
 
 
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == "POST" and form.is_valid():
@@ -45,9 +94,10 @@ def new_post(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, username, post_id):
     user = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, id=post_id, author=user)
+    post = get_object_or_404(Post.objects.for_feed(), id=post_id, author=user)
     if user != request.user:
         return redirect("post", username=username, post_id=post_id)
 
@@ -62,56 +112,54 @@ def post_edit(request, username, post_id):
     return render(request, "new_post.html", {"form": form, "post": post})
 
 
+@anonymous_page_cache(author_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related("group", "author")
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    if request.user.is_authenticated:
-        following = author.following.filter(user=request.user).exists()
-    else:
-        following = False
-    following_count = author.following.count()
-    follower_count = author.follower.count()
-    post_count = paginator.count
+    post_list = Post.objects.for_feed().filter(author__username=username)
+    author, (paginator, page), following = parallel.gather(
+        lambda: get_object_or_404(User.objects.select_related("stats"),
+                                  username=username),
+        lambda: _fetched_page(paginate(request, post_list)),
+        _following_check(request.user, username),
+    )
+    stats = counters.stats_for(author)
     context = {
         "author": author,
         "page": page,
-        "post_count": post_count,
+        "post_count": stats.post_count,
         "paginator": paginator,
         "following": following,
-        "following_count": following_count,
-        "follower_count": follower_count,
+        "following_count": stats.following_count,
+        "follower_count": stats.follower_count,
     }
-    return render(request, "profile.html", context)
+    return TemplateResponse(request, "profile.html", context)
 
 
+@anonymous_page_cache(author_scopes)
 def post_view(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post_count = author.posts.count()
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
-    if request.user.is_authenticated:
-        following = author.following.filter(user=request.user).exists()
-    else:
-        following = False
-    following_count = author.following.count()
-    follower_count = author.follower.count()
+    author, post, comments, following = parallel.gather(
+        lambda: get_object_or_404(User.objects.select_related("stats"),
+                                  username=username),
+        lambda: get_object_or_404(Post.objects.for_feed(), id=post_id),
+        lambda: _fetched(Comment.objects.filter(post_id=post_id)
+                         .select_related("author")),
+        _following_check(request.user, username),
+    )
+    stats = counters.stats_for(author)
     context = {
         "author": author,
         "post": post,
-        "post_count": post_count,
+        "post_count": stats.post_count,
         "comments": comments,
         "form": CommentForm(),
         "following": following,
-        "following_count": following_count,
-        "follower_count": follower_count,
+        "following_count": stats.following_count,
+        "follower_count": stats.follower_count,
     }
-    return render(request, "post.html", context)
+    return TemplateResponse(request, "post.html", context)
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     user = get_object_or_404(User, username=username)
     post = get_object_or_404(Post, id=post_id, author=user)
@@ -139,16 +187,22 @@ def server_error(request):
 
 @login_required
 def follow_index(request):
-    authors = Follow.objects.filter(user=request.user).values_list('author')
-    post_list = Post.objects.filter(author__in=authors)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(request, "follow.html", {"page": page,
-                                           "paginator": paginator})
+    feed_version = timeline.version(request.user)
+    paginator, page = paginate(request,
+                               timeline.entries(request.user, feed_version))
+    keys = page.object_list
+    # посты читаются, только если фрагмент ленты не нашёлся в кэше
+    page.object_list = SimpleLazyObject(lambda: timeline.hydrate(keys))
+    return render(request, "follow.html", {
+        "page": page,
+        "paginator": paginator,
+        "feed_version": feed_version,
+        "suggestions": suggestions.for_user(request.user.id),
+    })
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
@@ -159,6 +213,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
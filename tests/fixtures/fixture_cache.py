@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_cache():
+    from yatube.caches import isolated
+    with isolated():
+        yield
@@ -0,0 +1,22 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no native ASGI handler, so the WSGI application is wrapped
+with asgiref's WsgiToAsgi. The ASGI server (uvicorn, daphne) receives the
+whole request body on its event loop and only then hands the request to a
+worker thread, so slow clients do not hold a worker while they upload.
+Run it with, for example::
+
+    uvicorn yatube.asgi:application --workers 4
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiToAsgi(get_wsgi_application())
@@ -0,0 +1,530 @@
+"""
+Cache backends shared by all worker processes.
+
+``LocMemCache`` keeps a copy per process: with several workers every
+fragment is built once per worker, and ``cache.delete()`` only reaches
+the process that ran it. The backends here share one cache:
+
+* ``SQLiteCache`` — a cache table in its own SQLite file (WAL), for
+  several processes on one host;
+* ``RedisCache`` — for several hosts; needs the ``redis`` package;
+* ``TwoLevelCache`` — a small in-process LRU in front of one of the
+  above (``OPTIONS['SHARED']`` names its alias).
+
+``TwoLevelCache`` stores every value in the shared cache together with a
+random stamp, and the stamp alone under a second key. A value found in
+the LRU is served without a round trip for ``CHECK_INTERVAL`` seconds.
+After that it is served only when the shared stamp still matches, which
+costs a lookup of the stamp instead of the whole value. So other
+processes' writes show up within ``CHECK_INTERVAL``. Keys starting with
+``SHARED_ONLY`` prefixes, such as the feed generations, skip the LRU and
+are always read from the shared cache.
+
+``isolated()`` moves the shared caches to a temporary file for test runs
+and benchmarks, which clear the cache and fill it with their own data.
+"""
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# SQLite limits the number of bound parameters of a statement
+SQLITE_CHUNK = 500
+# backends whose entries never leave the process
+PROCESS_LOCAL = (
+    "yatube.caches.TwoLevelCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def _dumps(value):
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _chunks(items, size=SQLITE_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """Cache in an SQLite file; LOCATION is the file path.
+
+    Each thread keeps its own connection. Expired rows are skipped on
+    read and removed when the table is culled, which is checked on
+    every CULL_EVERY-th write of a process.
+    """
+    CULL_EVERY = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # a connection inherited through fork() must not be reused
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            conn = sqlite3.connect(self.path, timeout=5,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, "
+                "value BLOB NOT NULL, expires REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires "
+                         "ON cache (expires)")
+            self._local.conn, self._local.pid = conn, pid
+        return self._local.conn
+
+    def _expires(self, timeout):
+        # Django 2.2 returns an absolute expiry time here
+        return self.get_backend_timeout(timeout)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        found = {}
+        conn, now = self._connection(), time.time()
+        for chunk in _chunks(made):
+            rows = conn.execute(
+                f"SELECT key, value FROM cache WHERE key IN "
+                f"({','.join('?' * len(chunk))}) "
+                f"AND (expires IS NULL OR expires > ?)",
+                (*chunk, now),
+            )
+            for key, value in rows:
+                found[made[key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [(self._key(key, version), _dumps(value), expires)
+                for key, value in data.items()]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires) "
+                "VALUES (?, ?, ?)", rows,
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._wrote(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # an expired row counts as absent
+        cursor = self._connection().execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+            "expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (self._key(key, version), _dumps(value), self._expires(timeout),
+             time.time()),
+        )
+        self._wrote(1)
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._expires(timeout), self._key(key, version), time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        conn = self._connection()
+        for chunk in _chunks(self._key(key, version) for key in keys):
+            conn.execute(f"DELETE FROM cache WHERE key IN "
+                         f"({','.join('?' * len(chunk))})", chunk)
+
+    def has_key(self, key, version=None):
+        return self._connection().execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def _wrote(self, count):
+        self._writes += count
+        if self._writes >= self.CULL_EVERY:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self._max_entries:
+            # rows that would expire soonest go first
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count // self._cull_frequency or 1,),
+            )
+
+
+class RedisCache(BaseCache):
+    """Cache in Redis; LOCATION is a redis:// URL.
+
+    Integers are stored as is so that incr() is atomic; everything else
+    is pickled.
+    """
+    def __init__(self, location, params):
+        if redis is None:
+            raise ImproperlyConfigured(
+                "RedisCache requires the redis package: pip install redis"
+            )
+        super().__init__(params)
+        self.client = redis.Redis.from_url(location)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return _dumps(value)
+
+    @staticmethod
+    def _decode(value):
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _ttl(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return None
+        # Redis rejects a zero expiry; make such values expire at once
+        return max(int((expires - time.time()) * 1000), 1)
+
+    def get(self, key, default=None, version=None):
+        value = self.client.get(self._key(key, version))
+        return default if value is None else self._decode(value)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        values = self.client.mget(list(made))
+        return {made[key]: self._decode(value)
+                for key, value in zip(made, values) if value is not None}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.client.set(self._key(key, version), self._encode(value),
+                        px=self._ttl(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl(timeout)
+        pipeline = self.client.pipeline()
+        for key, value in data.items():
+            pipeline.set(self._key(key, version), self._encode(value), px=ttl)
+        pipeline.execute()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(self.client.set(self._key(key, version),
+                                    self._encode(value),
+                                    px=self._ttl(timeout), nx=True))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl(timeout)
+        key = self._key(key, version)
+        if ttl is None:
+            return bool(self.client.persist(key))
+        return bool(self.client.pexpire(key, ttl))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self.client.exists(key):
+            raise ValueError(f"Key '{key}' not found")
+        return self.client.incrby(key, delta)
+
+    def delete(self, key, version=None):
+        self.client.delete(self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.client.exists(self._key(key, version)))
+
+    def clear(self):
+        # only our own keys: the Redis database may be shared
+        pattern = f"{self.key_prefix}:*" if self.key_prefix else "*"
+        for keys in _chunks(self.client.scan_iter(match=pattern), 1000):
+            self.client.delete(*keys)
+
+
+# per-process LRUs by LOCATION, like LocMemCache's _caches
+_lrus = {}
+_lrus_lock = threading.Lock()
+
+
+class _LRU:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, stamp, value, checked):
+        entry = [stamp, value, checked]
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            if len(value) > self.max_bytes:
+                return
+            self.entries[key] = entry
+            self.size += len(value)
+            while (len(self.entries) > self.max_entries
+                   or self.size > self.max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted[1])
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                old = self.entries.pop(key, None)
+                if old is not None:
+                    self.size -= len(old[1])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class TwoLevelCache(BaseCache):
+    """In-process LRU in front of the cache named by OPTIONS['SHARED'].
+
+    OPTIONS: SHARED (alias, default "shared"), MAX_ENTRIES and MAX_BYTES
+    of the LRU, CHECK_INTERVAL in seconds and SHARED_ONLY key prefixes.
+    LOCATION names the LRU; caches with the same LOCATION share it.
+    """
+    STAMP_SUFFIX = ":stamp"
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options.get("SHARED", "shared")
+        self.check_interval = options.get("CHECK_INTERVAL", 1)
+        self.shared_only = tuple(options.get("SHARED_ONLY", ()))
+        with _lrus_lock:
+            self.lru = _lrus.setdefault(location, _LRU(
+                self._max_entries, options.get("MAX_BYTES", 32 * 1024 * 1024),
+            ))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def _is_local(self, key):
+        return not key.startswith(self.shared_only)
+
+    def _stamp_key(self, key):
+        return f"{key}{self.STAMP_SUFFIX}"
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        found, missing, stale = {}, [], {}
+        now = time.monotonic()
+        for key in keys:
+            if not self._is_local(key):
+                missing.append(key)
+                continue
+            entry = self.lru.get(self._local_key(key, version))
+            if entry is None:
+                missing.append(key)
+            elif now - entry[2] < self.check_interval:
+                found[key] = pickle.loads(entry[1])
+            else:
+                stale[key] = entry
+        if not missing and not stale:
+            return found
+
+        shared = self.shared.get_many(
+            [*missing, *map(self._stamp_key, stale)], version=version,
+        )
+        changed = []
+        for key, entry in stale.items():
+            if shared.get(self._stamp_key(key)) == entry[0]:
+                entry[2] = now
+                found[key] = pickle.loads(entry[1])
+            else:
+                changed.append(key)
+        if changed:
+            shared.update(self.shared.get_many(changed, version=version))
+            missing.extend(changed)
+
+        for key in missing:
+            if key not in shared:
+                continue
+            if not self._is_local(key):
+                found[key] = shared[key]
+                continue
+            stamp, value = shared[key]
+            self.lru.put(self._local_key(key, version), stamp,
+                         _dumps(value), now)
+            found[key] = value
+        return found
+
+    def _wrap(self, data, version):
+        wrapped = {}
+        now = time.monotonic()
+        for key, value in data.items():
+            if not self._is_local(key):
+                wrapped[key] = value
+                continue
+            stamp = os.urandom(8).hex()
+            wrapped[key] = (stamp, value)
+            wrapped[self._stamp_key(key)] = stamp
+            self.lru.put(self._local_key(key, version), stamp, _dumps(value),
+                         now)
+        return wrapped
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set_many(self._wrap(data, version),
+                             self._shared_timeout(timeout), version=version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self._is_local(key):
+            return self.shared.add(key, value, self._shared_timeout(timeout),
+                                   version=version)
+        stamp = os.urandom(8).hex()
+        timeout = self._shared_timeout(timeout)
+        if not self.shared.add(key, (stamp, value), timeout, version=version):
+            return False
+        self.shared.set(self._stamp_key(key), stamp, timeout,
+                        version=version)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._shared_timeout(timeout)
+        if self._is_local(key):
+            self.shared.touch(self._stamp_key(key), timeout, version=version)
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.lru.discard(self._local_key(key, version) for key in keys)
+        self.shared.delete_many(
+            [*keys, *(self._stamp_key(key) for key in keys
+                      if self._is_local(key))],
+            version=version,
+        )
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version)
+
+    def clear(self):
+        self.lru.clear()
+        self.shared.clear()
+
+    def _shared_timeout(self, timeout):
+        # this cache's TIMEOUT, not the shared cache's one
+        if timeout is DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
+
+
+@contextmanager
+def isolated():
+    """Moves every shared cache to a temporary SQLite file for the block.
+
+    Without it a test run or a benchmark on a checkout shares the cache
+    of a server running from the same checkout: cache.clear() wipes the
+    server's cache and the server may render pages from test data.
+    """
+    from django.test.utils import override_settings
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = {}
+        for alias, params in settings.CACHES.items():
+            if params["BACKEND"] not in PROCESS_LOCAL:
+                params = {
+                    **params,
+                    "BACKEND": "yatube.caches.SQLiteCache",
+                    "LOCATION": os.path.join(directory, f"{alias}.sqlite3"),
+                }
+            config[alias] = params
+        # the LRUs outlive the settings: drop entries of either side
+        for lru in list(_lrus.values()):
+            lru.clear()
+        try:
+            with override_settings(CACHES=config):
+                yield
+        finally:
+            for lru in list(_lrus.values()):
+                lru.clear()
@@ -0,0 +1,128 @@
+"""
+Read replicas with read-your-writes consistency.
+
+``ReplicaRouter`` sends reads made while serving a request to one of
+``DATABASE_REPLICAS`` and writes to ``default``. Reads stay on
+``default`` when:
+
+* there are no replicas;
+* they happen outside a request (management commands, background
+  threads), where a lagging replica could miss a row just written;
+* the query runs inside a transaction on ``default``, so it sees the
+  transaction's writes;
+* the model belongs to an app in ``PRIMARY_APPS`` (sessions must be
+  readable right after login);
+* the request is pinned by ``PinPrimaryMiddleware``.
+
+The middleware pins every request that is not GET/HEAD/OPTIONS. It also
+pins any request that writes, because follow and unfollow are GET views.
+Writes inside ``housekeeping()`` don't pin: a GET that trims a timeline
+or fills in missing counters changed nothing the client asked for.
+After such a request it sets a cookie that pins the next
+``REPLICA_PIN_SECONDS`` of that browser's requests, so users see their
+own posts and comments despite replication lag.
+
+Locally two SQLite files stand in for a primary and a replica. Set
+``YATUBE_SQLITE_REPLICA=1`` and copy the primary over the replica with
+``python manage.py sync_replicas``; until the next sync the replica lags
+behind, like a real one.
+"""
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY_APPS = {"sessions"}
+PIN_COOKIE = "pin_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class _RequestState:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar("replica_state", default=None)
+_housekeeping = ContextVar("replica_housekeeping", default=False)
+
+
+@contextmanager
+def housekeeping():
+    """Writes in the block go to ``default`` but don't pin the request."""
+    token = _housekeeping.set(True)
+    try:
+        yield
+    finally:
+        _housekeeping.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        state = _state.get()
+        if (not replicas or state is None or state.pinned
+                or model._meta.app_label in PRIMARY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and not _housekeeping.get():
+            # later reads of this request must see the write too
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas are copies of the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def _pin_cookie_valid(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class PinPrimaryMiddleware:
+    """Pins the request, and the next few of the same client, to default."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(pinned=(request.method not in SAFE_METHODS
+                                      or _pin_cookie_valid(request)))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds),
+                                max_age=seconds, httponly=True,
+                                samesite="Lax")
+        return response
+
+
+def sync(alias):
+    """Copies the default SQLite database over the replica file."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    replica = connections[alias]
+    replica.close()
+    primary.ensure_connection()
+    target = sqlite3.connect(replica.settings_dict["NAME"])
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
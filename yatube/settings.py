@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -47,27 +48,36 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    "debug_toolbar",
 ]
 
 MIDDLEWARE = [
+    "posts.metrics.MetricsMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    "yatube.replicas.PinPrimaryMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+# The debug toolbar is a development aid: it is enabled only with DEBUG
+# and when the package is installed.
+
+if DEBUG and find_spec("debug_toolbar"):
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 USERS_TEMPLATES_DIR = os.path.join(BASE_DIR, "users/templates")
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to posts.metrics
+        'BACKEND': 'posts.metrics.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR, USERS_TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,13 +97,35 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# yatube.sqlite is the stock SQLite backend with WAL, tuned pragmas,
+# BEGIN IMMEDIATE for atomic() and a separate read-only connection for
+# autocommit reads. Override pragmas with OPTIONS["pragmas"]; disable the
+# read connection with OPTIONS["read_connection"] = False.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# Reads go to one of DATABASE_REPLICAS, writes to "default" (see
+# yatube.replicas). After a write the client reads from "default" for
+# REPLICA_PIN_SECONDS. YATUBE_SQLITE_REPLICA=1 adds a local SQLite
+# replica refreshed by "manage.py sync_replicas".
+
+DATABASE_ROUTERS = ["yatube.replicas.ReplicaRouter"]
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 10
+
+if os.environ.get("YATUBE_SQLITE_REPLICA"):
+    DATABASES["replica"] = {
+        "ENGINE": "yatube.sqlite",
+        "NAME": os.path.join(BASE_DIR, "db.replica.sqlite3"),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append("replica")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,12 +178,135 @@ LOGIN_REDIRECT_URL = "index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Caches are shared by all worker processes (see yatube.caches): an
+# in-process LRU in front of an SQLite file, or Redis when REDIS_URL is
+# set. Entries served from the LRU are re-checked against the shared
+# cache every CHECK_INTERVAL seconds; feed generations always come from
+# the shared cache, so invalidation reaches every process at once.
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'yatube.caches.TwoLevelCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 1000,
+            'MAX_BYTES': 32 * 1024 * 1024,
+            'CHECK_INTERVAL': 1,
+            'SHARED_ONLY': ('feed-gen:',),
+        },
+    },
+    'shared': {
+        'BACKEND': 'yatube.caches.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100_000,
+        },
+    },
 }
+if os.environ.get("REDIS_URL"):
+    CACHES["shared"] = {
+        "BACKEND": "yatube.caches.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
+
+TEST_RUNNER = "yatube.test_runner.IsolatedCacheRunner"
 
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
+
+# Feeds
+
+POSTS_PER_PAGE = 10
+
+# Page counts of feeds without a feed generation are refreshed this often,
+# so they may lag behind by a few posts.
+
+PAGINATOR_COUNT_TIMEOUT = 5 * 60
+
+# Follow feed
+
+TIMELINE_LENGTH = 1000
+TIMELINE_FANOUT_LIMIT = 5000
+TIMELINE_CACHE_TIMEOUT = 60 * 60
+
+# Most authors one bulk follow/unfollow API request may name.
+
+FOLLOW_BATCH_LIMIT = 100
+
+# "Who to follow" (posts.suggestions) is rebuilt by
+# "python manage.py build_suggestions": PER_USER candidates are stored per
+# user and SHOWN of them are displayed. MAX_WALK bounds the neighbours
+# visited from each followed author and group; CHUNK users are written
+# per transaction.
+
+SUGGESTIONS_PER_USER = 20
+SUGGESTIONS_SHOWN = 5
+SUGGESTIONS_MAX_WALK = 200
+SUGGESTIONS_CHUNK = 1000
+
+# Feed caches: keys carry feed generations, so the timeout only bounds
+# memory use; JITTER spreads expiry by +/-10%.
+
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_CACHE_JITTER = 0.1
+PAGE_CACHE_TIMEOUT = 10 * 60
+
+# Post thumbnails are built by a background job after the post is saved.
+# Each size is cropped to the "base" ratio at every width of the ladder.
+# Widths above the base one are built only for large enough uploads.
+# Files under posts/variants/ are named by content hash; serve them with
+# "Cache-Control: public, max-age=31536000, immutable".
+
+POST_THUMBNAIL_SIZES = {
+    "card": {
+        "base": (960, 339),
+        "widths": (320, 640, 960, 1920),
+        "sizes": "(min-width: 1200px) 1110px, 100vw",
+    },
+}
+
+# Background jobs (posts.jobs) live in the posts_job table and are run by
+# "python manage.py run_jobs"; a job is written in the same transaction as
+# the change that needs it. JOBS_EAGER runs them inline instead. A failed
+# job is retried after JOB_RETRY_DELAY * 2 ** (attempt - 1) seconds; a
+# claimed job is handed to another worker if it is not done within
+# JOB_LOCK_TIMEOUT seconds.
+
+JOBS_EAGER = False
+JOB_BATCH_SIZE = 100
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_LOCK_TIMEOUT = 5 * 60
+JOB_POLL_INTERVAL = 1
+
+# Independent queries of a page (author, post, comments, follow check)
+# can run in a thread pool with a connection per thread; 0 runs them one
+# by one. The pool is shared by all requests of a process, and with
+# CONN_MAX_AGE = 0 every pooled call opens a new connection, so it only
+# pays off for a database server with network latency, with persistent
+# connections. On a local SQLite file keep it at 0. Views inside a
+# transaction always run the queries one by one.
+
+VIEW_QUERY_WORKERS = 0
+
+# Request metrics (posts.metrics): per-view histograms of wall time, SQL,
+# template and thumbnail time plus cache hits and misses, exported at
+# /metrics/ in Prometheus text format to METRICS_ALLOWED_IPS. Requests
+# above either budget are logged as warnings by the "posts.metrics"
+# logger.
+
+METRICS_QUERY_BUDGET = 25
+METRICS_TIME_BUDGET = 0.5
+METRICS_ALLOWED_IPS = [
+    "127.0.0.1",
+]
+
+# Uploaded images are downscaled, rotated per EXIF, stripped of metadata
+# and re-encoded before they are stored. WEBP falls back to JPEG when
+# Pillow is built without it.
+
+IMAGE_MAX_SIDE = 1920
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_FORMAT = "WEBP"
@@ -0,0 +1,5 @@
+"""
+SQLite database backend tuned for a site served by several threads.
+
+Use it as ``'ENGINE': 'yatube.sqlite'``; see ``base.DatabaseWrapper``.
+"""
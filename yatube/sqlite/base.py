@@ -0,0 +1,137 @@
+"""
+SQLite backend with WAL, tuned pragmas and a separate read connection.
+
+With the default rollback journal a writer blocks every reader, and a
+transaction that reads before it writes fails at once with "database is
+locked" when another writer got there first: SQLite refuses to wait
+because waiting could deadlock. This backend
+
+* switches file databases to WAL, so readers never wait for the writer;
+* applies PRAGMAS (overridable with ``OPTIONS['pragmas']``) to every
+  connection, including ``busy_timeout`` so writers queue up instead of
+  failing;
+* starts ``atomic()`` blocks with BEGIN IMMEDIATE, taking the write lock
+  up front, so a read-then-write transaction waits its turn instead of
+  deadlocking;
+* sends autocommit SELECTs to a second, read-only connection
+  (``OPTIONS['read_connection']``, on by default), so reads do not queue
+  behind the writer connection. Queries inside a transaction keep using
+  the writer connection and see its uncommitted changes.
+
+In-memory databases (the test database) keep the default journal and a
+single connection.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    # in WAL mode NORMAL is durable against application crashes and
+    # only risks the last transactions on power loss
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    # negative values are KiB; every connection has its own cache
+    "cache_size": -32 * 1024,
+    "temp_store": "MEMORY",
+}
+READ_STATEMENTS = {"SELECT"}
+
+
+class SplitCursor:
+    """Cursor that runs autocommit reads on the read connection."""
+
+    def __init__(self, db, writer):
+        self.db = db
+        self.writer = writer
+        self.reader = None
+        self.active = writer
+
+    def _for(self, query):
+        reading = query.lstrip()[:6].upper() in READ_STATEMENTS
+        if (not reading or self.db.in_atomic_block
+                or not self.db.get_autocommit()):
+            return self.writer
+        if self.reader is None:
+            self.reader = self.db.read_connection().cursor(
+                factory=base.SQLiteCursorWrapper
+            )
+        return self.reader
+
+    def execute(self, query, params=None):
+        self.active = self._for(query)
+        self.active.execute(query, params)
+        return self
+
+    def executemany(self, query, param_list):
+        self.active = self.writer
+        self.writer.executemany(query, param_list)
+        return self
+
+    def close(self):
+        self.writer.close()
+        if self.reader is not None:
+            self.reader.close()
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __getattr__(self, name):
+        return getattr(self.active, name)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._read_connection = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pragmas", None)
+        params.pop("read_connection", None)
+        return params
+
+    def _pragmas(self):
+        pragmas = {**PRAGMAS, **self.settings_dict["OPTIONS"].get(
+            "pragmas", {})}
+        if self.is_in_memory_db():
+            pragmas.pop("journal_mode", None)
+        return pragmas
+
+    def _configure(self, conn):
+        for name, value in self._pragmas().items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def get_new_connection(self, conn_params):
+        return self._configure(super().get_new_connection(conn_params))
+
+    def uses_read_connection(self):
+        return (self.settings_dict["OPTIONS"].get("read_connection", True)
+                and not self.is_in_memory_db())
+
+    def read_connection(self):
+        """Read-only connection to the same file, opened on first use."""
+        if self._read_connection is None:
+            conn = self.get_new_connection(self.get_connection_params())
+            conn.isolation_level = None
+            conn.execute("PRAGMA query_only = ON")
+            self._read_connection = conn
+        return self._read_connection
+
+    def create_cursor(self, name=None):
+        cursor = super().create_cursor(name)
+        if not self.uses_read_connection():
+            return cursor
+        return SplitCursor(self, cursor)
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            if self._read_connection is not None:
+                with self.wrap_database_errors:
+                    self._read_connection.close()
+                self._read_connection = None
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
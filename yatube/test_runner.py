@@ -0,0 +1,22 @@
+from contextlib import ExitStack
+
+from django.test.runner import DiscoverRunner
+
+from yatube.caches import isolated
+
+
+class IsolatedCacheRunner(DiscoverRunner):
+    """DiscoverRunner whose tests use a cache of their own.
+
+    See yatube.caches.isolated(): the cache file of the checkout is left
+    to the servers running from it.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache = ExitStack()
+        self._cache.enter_context(isolated())
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache.close()
+        super().teardown_test_environment(**kwargs)
@@ -19,6 +19,9 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 
+from posts.metrics import metrics_view
+from posts.thumbnails import serve_media
+
 handler404 = "posts.views.page_not_found" # noqa
 handler500 = "posts.views.server_error" # noqa
 
@@ -26,14 +29,19 @@ urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
+    path("api/v1/", include("posts.api_urls", namespace="api")),
+    path("metrics/", metrics_view, name="metrics"),
     path("", include("posts.urls")),
     path("about/", include("about.urls", namespace="about")),
 ]
 
 if settings.DEBUG:
-    import debug_toolbar
     urlpatterns += static(settings.MEDIA_URL,
+                          view=serve_media,
                           document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    import debug_toolbar
     urlpatterns += (path("__debug__/", include(debug_toolbar.urls)),)